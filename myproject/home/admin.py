@@ -1,16 +1,16 @@
 from django.contrib import admin
 from .models import (
-    Destination, FoodItem, TravelVlog, UserProfile,
+    Destination, FoodItem, TravelVlog, VlogLike, UserProfile,
     Trip, TripDay, Review, ContactMessage
 )
 
 
 @admin.register(Destination)
 class DestinationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'tagline', 'budget', 'best_time', 'created_at']
+    list_display = ['name', 'tagline', 'budget', 'best_time', 'average_rating', 'review_count', 'created_at']
     list_filter = ['budget', 'type', 'created_at']
     search_fields = ['name', 'tagline', 'description']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['review_count', 'rating_sum', 'average_rating', 'created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'tagline', 'description', 'type', 'budget')
@@ -21,6 +21,10 @@ class DestinationAdmin(admin.ModelAdmin):
         ('Costs', {
             'fields': ('stay_cost', 'food_cost', 'transport_cost', 'activities_cost')
         }),
+        ('Ratings', {
+            'fields': ('average_rating', 'review_count', 'rating_sum'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -44,6 +48,13 @@ class TravelVlogAdmin(admin.ModelAdmin):
     list_editable = ['featured']
 
 
+@admin.register(VlogLike)
+class VlogLikeAdmin(admin.ModelAdmin):
+    list_display = ['user', 'vlog', 'created_at']
+    search_fields = ['user__username', 'vlog__title']
+    readonly_fields = ['created_at']
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'location', 'preferred_budget', 'trips_taken', 'average_rating']
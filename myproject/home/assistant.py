@@ -0,0 +1,462 @@
+"""Rule-based travel assistant behind the AI guide chat.
+
+Every phrase the assistant understands (destination names, destination
+types, seasons and months, diets and question words such as "cheapest" or
+"how much") is compiled once into a token-level Aho-Corasick automaton, so a
+message is read in a single pass however many destinations there are.
+Overlapping hits keep the longest phrase: "non veg" wins over "veg".
+
+Answers are grounded in a ``Knowledge`` snapshot of per-destination facts
+built with three queries: the destination row (costs, seasons, languages and
+the rating aggregates kept up to date from reviews), its dishes, and the
+budget most of its reviewers recommend. The snapshot and the automaton are
+rebuilt lazily after a Destination, FoodItem or Review changes (see
+``home.signals``) and at least every ``ASSISTANT_MAX_AGE`` seconds, so other
+processes pick up changes too. Replies are memoized per normalized message
+and snapshot generation.
+"""
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Destination, FoodItem, Review
+
+DEFAULT_MAX_AGE = 5 * 60
+MAX_MESSAGE_LENGTH = 500
+TOP_RESULTS = 3
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_DIGIT_GROUP_RE = re.compile(r'(?<=\d),(?=\d{3})')
+_MAX_COST_RE = re.compile(r'\b(?:under|below|less than|within|upto|up to)\s+(?:rs\s+|inr\s+)?(\d+)(k)?\b')
+
+MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('january', 'jan'), ('february', 'feb'), ('march', 'mar'), ('april', 'apr'), ('may',),
+        ('june', 'jun'), ('july', 'jul'), ('august', 'aug'), ('september', 'sep', 'sept'),
+        ('october', 'oct'), ('november', 'nov'), ('december', 'dec'),
+    ), start=1)
+    for name in names
+}
+SEASON_MONTHS = {
+    'winter': {10, 11, 12, 1, 2},
+    'summer': {3, 4, 5, 6},
+    'monsoon': {7, 8, 9},
+}
+SEASON_WORDS = {
+    'winter': 'winter', 'winters': 'winter', 'cold': 'winter',
+    'summer': 'summer', 'summers': 'summer', 'hot': 'summer',
+    'monsoon': 'monsoon', 'monsoons': 'monsoon', 'rainy': 'monsoon', 'rains': 'monsoon', 'rain': 'monsoon',
+}
+TYPE_WORDS = {
+    'beach': 'beach', 'beaches': 'beach', 'sea': 'beach', 'coast': 'beach',
+    'mountain': 'mountain', 'mountains': 'mountain', 'hill': 'mountain', 'hills': 'mountain',
+    'hill station': 'mountain', 'trek': 'mountain', 'trekking': 'mountain',
+    'honeymoon': 'honeymoon', 'romantic': 'honeymoon', 'couple': 'honeymoon', 'couples': 'honeymoon',
+    'wildlife': 'wildlife', 'safari': 'wildlife', 'jungle': 'wildlife',
+    'heritage': 'heritage', 'history': 'heritage', 'historical': 'heritage', 'temples': 'heritage',
+    'family': 'family', 'kids': 'family', 'adventure': 'adventure', 'city': 'city', 'cities': 'city',
+}
+DIET_WORDS = {
+    'veg': 'veg', 'vegetarian': 'veg', 'veggie': 'veg', 'pure veg': 'veg', 'vegan': 'veg',
+    'non veg': 'nonveg', 'nonveg': 'nonveg', 'non vegetarian': 'nonveg', 'meat': 'nonveg',
+    'chicken': 'nonveg', 'fish': 'nonveg', 'seafood': 'nonveg', 'mutton': 'nonveg',
+}
+INTENT_WORDS = {
+    'cheap': ('cheap', 'cheapest', 'affordable', 'inexpensive', 'economical', 'low budget', 'least expensive'),
+    'luxury': ('luxury', 'luxurious', 'costliest', 'most expensive', 'premium', 'high budget'),
+    'budget': ('budget', 'cost', 'costs', 'price', 'prices', 'how much', 'expensive', 'spend', 'money'),
+    'food': ('food', 'foods', 'eat', 'eating', 'dish', 'dishes', 'cuisine', 'restaurant', 'restaurants'),
+    'weather': ('weather', 'climate', 'best time', 'when', 'season', 'temperature'),
+    'rating': ('rating', 'rated', 'top rated', 'best rated', 'reviews', 'popular', 'best'),
+    'language': ('language', 'languages', 'speak', 'spoken'),
+    'safety': ('safe', 'safety', 'secure', 'danger', 'dangerous'),
+    'visa': ('visa', 'passport'),
+}
+
+CANNED = {
+    'budget': "For budget travel, consider staying in guesthouses, using local transport, and eating at local restaurants. Daily costs can be kept under ₹2,000-3,000 depending on the destination.",
+    'food': "Indian cuisine varies by region. Try local specialties like Kerala seafood, Rajasthan dal baati, or Goa pork vindaloo. Most places offer vegetarian options too!",
+    'weather': "Best time to visit depends on the destination. Generally, October-February is good for most places, avoiding monsoon season.",
+    'safety': "Travel safely by staying in well-lit areas, using registered transport, and keeping valuables secure. Most tourist destinations are very safe.",
+    'visa': "Check visa requirements based on your nationality. Most countries offer e-visa or visa-on-arrival for Indians.",
+}
+FALLBACK = "I'm here to help with your travel questions! Ask me about destinations, budgets, food, weather, or safety tips."
+
+DIET_LABELS = {'veg': 'vegetarian', 'nonveg': 'non-vegetarian'}
+
+Dish = namedtuple('Dish', 'name price is_vegetarian')
+
+
+def normalize(text):
+    text = _DIGIT_GROUP_RE.sub('', (text or '').lower()[:MAX_MESSAGE_LENGTH])
+    return ' '.join(_WORD_RE.findall(text))
+
+
+def months_in(text):
+    """Months named in a best/bad time label: seasons, single months and 'October to March' ranges"""
+    words = normalize(text).split()
+    months = set()
+    for word in words:
+        if word in SEASON_WORDS:
+            months |= SEASON_MONTHS[SEASON_WORDS[word]]
+    numbers = [MONTHS[word] for word in words if word in MONTHS]
+    for i, word in enumerate(words):
+        if word in ('to', 'till', 'until') and 0 < i < len(words) - 1 and words[i - 1] in MONTHS and words[i + 1] in MONTHS:
+            first, last = MONTHS[words[i - 1]], MONTHS[words[i + 1]]
+            months |= {(first - 1 + n) % 12 + 1 for n in range((last - first) % 12 + 1)}
+    return months | set(numbers)
+
+
+def seasons_for(months):
+    """Seasons at least half covered by ``months``"""
+    return {season for season, in_season in SEASON_MONTHS.items() if len(months & in_season) * 2 >= len(in_season)}
+
+
+def rupees(amount):
+    return f"₹{amount:,.0f}"
+
+
+class Matcher:
+    """Token-level Aho-Corasick automaton over phrases, each carrying (kind, value) labels"""
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for phrase, labels in phrases.items():
+            tokens = phrase.split()
+            if tokens:
+                self._insert(tokens, labels)
+        self._link()
+
+    def _insert(self, tokens, labels):
+        state = 0
+        for token in tokens:
+            following = self.goto[state].get(token)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][token] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            state = following
+        self.output[state] += tuple((len(tokens), label) for label in labels)
+
+    def _link(self):
+        # Breadth first, so every fail target is final before it is used
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for token, following in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[following] = target if target != following else 0
+                self.output[following] += self.output[self.fail[following]]
+                queue.append(following)
+
+    def find(self, tokens):
+        """Labels of the longest non-overlapping phrases in ``tokens``, left to right"""
+        hits = []
+        state = 0
+        for end, token in enumerate(tokens, start=1):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length, label in self.output[state]:
+                hits.append((end - length, -length, label))
+        hits.sort()
+        labels, covered_to = [], 0
+        for start, negative_length, label in hits:
+            if start >= covered_to or (labels and labels[-1][0] == start and labels[-1][1] == negative_length):
+                labels.append((start, negative_length, label))
+                covered_to = start - negative_length
+        return [label for _, _, label in labels]
+
+
+class DestinationFacts:
+    """What the assistant knows about one destination"""
+
+    def __init__(self, row, dishes, reviewer_budget):
+        (self.pk, self.name, self.tagline, destination_type, self.budget, self.best_time, self.bad_time,
+         languages, stay_cost, food_cost, transport_cost, activities_cost, average_rating, self.review_count) = row
+        self.types = {TYPE_WORDS.get(normalize(t), normalize(t)) for t in destination_type.split(',') if t.strip()}
+        # Some rows hold structured JSON instead of a plain list; better to say nothing than quote it
+        self.languages = [] if languages.lstrip().startswith(('{', '[')) else [
+            language.strip() for language in languages.split(',') if language.strip()
+        ]
+        self.stay_cost = float(stay_cost)
+        self.daily_cost = float(stay_cost + food_cost + transport_cost + activities_cost)
+        self.average_rating = float(average_rating)
+        self.dishes = dishes
+        self.reviewer_budget = reviewer_budget
+        bad_months = months_in(self.bad_time)
+        self.good_seasons = seasons_for(months_in(self.best_time) - bad_months)
+        self.bad_seasons = seasons_for(bad_months)
+
+    def dishes_for(self, diet):
+        if diet is None:
+            return self.dishes
+        return [dish for dish in self.dishes if dish.is_vegetarian == (diet == 'veg')]
+
+    def rating_text(self):
+        if not self.review_count:
+            return f"{self.name} has no reviews yet."
+        reviews = 'review' if self.review_count == 1 else 'reviews'
+        text = f"{self.name} is rated {self.average_rating:.1f}/5 from {self.review_count} {reviews}."
+        if self.reviewer_budget:
+            text += f" Most reviewers recommend a {self.reviewer_budget} budget."
+        return text
+
+    def cost_text(self):
+        return (f"A day in {self.name} costs about {rupees(self.daily_cost)} "
+                f"({self.budget} budget), of which {rupees(self.stay_cost)} is the stay.")
+
+    def season_text(self, season=None):
+        text = f"The best time to visit {self.name} is {self.best_time}"
+        text += f"; avoid {self.bad_time}." if self.bad_time else "."
+        if season in self.bad_seasons:
+            return f"{season.capitalize()} is not a good time for {self.name}. {text}"
+        if season in self.good_seasons:
+            return f"Yes, {season} is a good time for {self.name}. {text}"
+        return text
+
+    def food_text(self, diet=None):
+        dishes = self.dishes_for(diet)
+        label = f"{DIET_LABELS[diet]} dishes" if diet else "dishes"
+        if not dishes:
+            return f"I don't know any {label} in {self.name} yet."
+        listed = ', '.join(f"{dish.name} ({dish.price})" if dish.price else dish.name for dish in dishes[:5])
+        return f"Try these {label} in {self.name}: {listed}."
+
+    def summary_text(self):
+        parts = [f"{self.name}: {self.tagline}." if self.tagline else f"{self.name}."]
+        parts.append(f"About {rupees(self.daily_cost)} a day, best visited {self.best_time}.")
+        if self.review_count:
+            parts.append(f"Rated {self.average_rating:.1f}/5 by {self.review_count} travellers.")
+        return ' '.join(parts)
+
+
+class Knowledge:
+    """Facts about every destination and the matcher over everything they mention"""
+
+    def __init__(self, facts):
+        self.facts = facts
+        self.by_pk = {fact.pk: fact for fact in facts}
+        phrases = {}
+
+        def add(phrase, label):
+            phrase = normalize(phrase)
+            if phrase and label not in phrases.setdefault(phrase, []):
+                phrases[phrase].append(label)
+
+        for fact in facts:
+            add(fact.name, ('destination', fact.pk))
+        for word, destination_type in TYPE_WORDS.items():
+            add(word, ('type', destination_type))
+        for destination_type in {t for fact in facts for t in fact.types}:
+            add(destination_type, ('type', destination_type))
+        for word, season in SEASON_WORDS.items():
+            add(word, ('season', season))
+        for word, number in MONTHS.items():
+            # 'may' and 'march' are too common as plain words to count alone
+            if word not in ('may', 'mar'):
+                add(word, ('season', next(s for s, months in SEASON_MONTHS.items() if number in months)))
+        for word, diet in DIET_WORDS.items():
+            add(word, ('diet', diet))
+        for intent, words in INTENT_WORDS.items():
+            for word in words:
+                add(word, ('intent', intent))
+        self.matcher = Matcher(phrases)
+
+    @classmethod
+    def load(cls):
+        dishes = {}
+        for destination_id, dish, price, is_vegetarian in FoodItem.objects.order_by('id').values_list(
+                'destination_id', 'dish', 'price', 'is_vegetarian').iterator():
+            dishes.setdefault(destination_id, []).append(Dish(dish, price, is_vegetarian))
+        budgets = {}
+        for destination_id, budget, _ in Review.objects.order_by().values_list(
+                'destination_id', 'recommended_budget').annotate(n=Count('id')).order_by('destination_id', '-n', 'recommended_budget'):
+            budgets.setdefault(destination_id, budget)
+        rows = Destination.objects.order_by('name').values_list(
+            'pk', 'name', 'tagline', 'type', 'budget', 'best_time', 'bad_time', 'languages',
+            'stay_cost', 'food_cost', 'transport_cost', 'activities_cost', 'average_rating', 'review_count',
+        )
+        return cls([DestinationFacts(row, dishes.get(row[0], []), budgets.get(row[0], '')) for row in rows.iterator()])
+
+
+Query = namedtuple('Query', 'destinations types seasons diet intents max_cost')
+
+
+def parse(knowledge, message):
+    """What a normalized message asks about"""
+    destinations, types, seasons, intents = [], set(), set(), set()
+    diet = None
+    for kind, value in knowledge.matcher.find(message.split()):
+        if kind == 'destination':
+            if value not in destinations:
+                destinations.append(value)
+        elif kind == 'type':
+            types.add(value)
+        elif kind == 'season':
+            seasons.add(value)
+        elif kind == 'diet':
+            diet = diet or value
+        else:
+            intents.add(value)
+    max_cost = None
+    match = _MAX_COST_RE.search(message)
+    if match:
+        max_cost = int(match.group(1)) * (1000 if match.group(2) else 1)
+    return Query(destinations, types, seasons, diet, intents, max_cost)
+
+
+def _about_destination(fact, query):
+    season = next(iter(sorted(query.seasons)), None)
+    intents = query.intents
+    answers = []
+    if 'food' in intents or query.diet:
+        answers.append(fact.food_text(query.diet))
+    if intents & {'budget', 'cheap', 'luxury'} or query.max_cost:
+        answers.append(fact.cost_text())
+    if 'weather' in intents or season:
+        answers.append(fact.season_text(season))
+    if 'rating' in intents:
+        answers.append(fact.rating_text())
+    if 'language' in intents:
+        if fact.languages:
+            answers.append(f"People in {fact.name} speak {', '.join(fact.languages)}.")
+        else:
+            answers.append(f"I don't know which languages are spoken in {fact.name}.")
+    if 'safety' in intents:
+        answers.append(CANNED['safety'])
+    return ' '.join(answers) or fact.summary_text()
+
+
+def _describe(query):
+    """'vegetarian-friendly beach destinations in winter under ₹5,000 a day'"""
+    words = []
+    if query.diet:
+        words.append(f"{DIET_LABELS[query.diet]}-friendly")
+    words.extend(sorted(query.types))
+    words.append('destinations')
+    if query.seasons:
+        words.append('in ' + ' or '.join(sorted(query.seasons)))
+    if query.max_cost:
+        words.append(f"under {rupees(query.max_cost)} a day")
+    return ' '.join(words)
+
+
+def _ranked(knowledge, query):
+    candidates = [
+        fact for fact in knowledge.facts
+        if query.types <= fact.types
+        and (not query.seasons or query.seasons & fact.good_seasons)
+        and (not query.diet or fact.dishes_for(query.diet))
+        and (not query.max_cost or fact.daily_cost <= query.max_cost)
+    ]
+    described = _describe(query)
+    if 'cheap' in query.intents or ('budget' in query.intents and 'luxury' not in query.intents):
+        candidates.sort(key=lambda fact: (fact.daily_cost, fact.name))
+        heading = f"Cheapest {described}"
+        detail = lambda fact: f"{rupees(fact.daily_cost)}/day"
+    elif 'luxury' in query.intents:
+        candidates.sort(key=lambda fact: (-fact.daily_cost, fact.name))
+        heading = f"Most luxurious {described}"
+        detail = lambda fact: f"{rupees(fact.daily_cost)}/day"
+    elif 'food' in query.intents or query.diet:
+        candidates.sort(key=lambda fact: (-len(fact.dishes_for(query.diet)), fact.name))
+        heading = f"Best {described} for food"
+        detail = lambda fact: ', '.join(dish.name for dish in fact.dishes_for(query.diet)[:3])
+    else:
+        candidates.sort(key=lambda fact: (-fact.average_rating, -fact.review_count, fact.name))
+        heading = f"Top rated {described}"
+        detail = lambda fact: f"{fact.average_rating:.1f}/5" if fact.review_count else "not rated yet"
+    if not candidates:
+        return f"I couldn't find any {described}. Try fewer filters."
+    listed = '; '.join(f"{fact.name} ({detail(fact)})" for fact in candidates[:TOP_RESULTS])
+    return f"{heading[0].upper()}{heading[1:]}: {listed}."
+
+
+def answer(knowledge, message):
+    """Reply to a normalized message from ``knowledge``"""
+    query = parse(knowledge, message)
+    if query.destinations:
+        return ' '.join(_about_destination(knowledge.by_pk[pk], query) for pk in query.destinations[:2])
+    ranking = {'cheap', 'luxury', 'rating'}
+    if query.types or query.seasons or query.diet or query.max_cost or query.intents & ranking:
+        return _ranked(knowledge, query)
+    for intent in ('budget', 'food', 'weather', 'safety', 'visa'):
+        if intent in query.intents:
+            return CANNED[intent]
+    return FALLBACK
+
+
+class Assistant:
+    def __init__(self):
+        self._knowledge = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        # Held for a whole reload; _lock only guards the snapshot and generation
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._knowledge is not None and time.monotonic() - self._loaded_at < self.max_age()
+
+    @staticmethod
+    def max_age():
+        return getattr(settings, 'ASSISTANT_MAX_AGE', DEFAULT_MAX_AGE)
+
+    def knowledge(self):
+        """The current snapshot, rebuilt from the database when missing or too old"""
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    with self._lock:
+                        generation = self._generation
+                    knowledge = Knowledge.load()
+                    with self._lock:
+                        # A change that landed while loading invalidates this snapshot too
+                        if generation == self._generation:
+                            self._knowledge = knowledge
+                            self._loaded_at = time.monotonic()
+                            self._reply.cache_clear()
+                    return knowledge
+        return self._knowledge
+
+    def invalidate(self):
+        # Never waits for a reload in progress, which then sees the new generation
+        with self._lock:
+            self._knowledge = None
+            self._generation += 1
+        self._reply.cache_clear()
+
+    def reply(self, message):
+        """Answer a chat message"""
+        message = normalize(message)
+        if not message:
+            return FALLBACK
+        return self._reply(message, self.knowledge())
+
+    async def areply(self, message):
+        if self.loaded:
+            # Nothing left to read from the database
+            return self.reply(message)
+        return await sync_to_async(self.reply)(message)
+
+    @lru_cache(maxsize=4096)
+    def _reply(self, message, knowledge):
+        return answer(knowledge, message)
+
+
+assistant = Assistant()
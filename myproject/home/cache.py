@@ -0,0 +1,131 @@
+"""Response cache for anonymous page views.
+
+Rendered pages are stored under a key built from the view name, the path, the
+whitelisted query params (sorted, empties dropped) and the current version of
+every tag the page depends on. Model signals bump tag versions (see
+``home.signals``), which orphans exactly the pages built from the changed
+data; orphaned entries simply age out. Writes that bypass the signals with
+``update()`` or raw SQL (likes, rating aggregates, reconcile commands,
+trending scores) call ``invalidate`` themselves; view count flushes do not and
+leave view counts to catch up when pages expire.
+
+Only anonymous GET/HEAD requests that produce a plain 200 response without
+cookies are cached. The backend is the ``VIEW_CACHE_ALIAS`` cache, local
+memory by default; point it at a FileBasedCache to share entries and
+invalidations between worker processes.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+
+DEFAULT_TIMEOUT = 120
+
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_counters_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'VIEW_CACHE_ALIAS', 'default')]
+
+
+def _version_key(tag):
+    return f'viewcache:tag:{tag}'
+
+
+def _tag_versions(tags):
+    cache = get_cache()
+    keys = [_version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Seed with a timestamp so a version lost to eviction never repeats an old one
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*tags):
+    """Bump the version of each tag, orphaning every page that depends on it"""
+    cache = get_cache()
+    for tag in tags:
+        try:
+            cache.incr(_version_key(tag))
+        except ValueError:
+            cache.set(_version_key(tag), time.time_ns(), timeout=None)
+
+
+def _record(view_name, hit):
+    with _counters_lock:
+        _counters[view_name]['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hit/miss counters per cached view for this process"""
+    with _counters_lock:
+        return {name: dict(counts) for name, counts in _counters.items()}
+
+
+def reset_stats():
+    with _counters_lock:
+        _counters.clear()
+
+
+def cache_key(view_name, request, params, tags):
+    normalized = sorted(
+        (name, value)
+        for name in params
+        for value in request.GET.getlist(name)
+        if value
+    )
+    raw = '&'.join(f'{name}={value}' for name, value in normalized)
+    versions = '.'.join(str(version) for version in _tag_versions(tags))
+    digest = hashlib.md5(f'{request.path}?{raw}|{versions}'.encode('utf-8')).hexdigest()
+    return f'viewcache:page:{view_name}:{digest}'
+
+
+def cached_view(view_name, tags=(), params=(), timeout=None):
+    """Cache a view's response for anonymous users.
+
+    ``tags`` are invalidation tags; ``{name}`` placeholders are filled from the
+    view's URL kwargs, e.g. ``'destination:{pk}'``. ``params`` lists the query
+    params that change the response; any others are ignored.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated
+                    or len(messages.get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = cache_key(view_name, request, params, [tag.format(**kwargs) for tag in tags])
+            cached = cache.get(key)
+            if cached is not None:
+                _record(view_name, True)
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _record(view_name, False)
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            if response.status_code == 200 and not response.cookies and not response.streaming:
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    timeout if timeout is not None else getattr(settings, 'VIEW_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+                )
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
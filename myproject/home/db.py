@@ -0,0 +1,54 @@
+"""SQLite connection tuning.
+
+Every new SQLite connection gets a busy timeout, which makes writers queue for
+the lock instead of failing with "database is locked", and a larger page
+cache plus memory mapping, which keeps hot pages out of read() calls.
+
+With ``SQLITE_WAL = True`` connections are also switched to WAL journaling,
+so readers no longer block the writer and the writer no longer blocks
+readers, and to ``synchronous=NORMAL``, which syncs only at checkpoints
+instead of on every commit (crash safe only in WAL mode, hence the pairing).
+WAL mode is stored in the database file itself: the first connection
+converts an existing database, which keeps ``-wal``/``-shm`` files beside it
+from then on. It is opt-in so that routine ``manage.py`` commands never
+rewrite the checked-in development database.
+
+``DEFAULT_PRAGMAS`` and ``WAL_PRAGMAS`` are the single source of the values;
+the ``SQLITE_PRAGMAS`` setting only holds overrides, and a pragma set to
+``None`` is skipped.
+"""
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,           # milliseconds
+    'cache_size': -64000,           # negative means KiB, so ~64 MB per connection
+    'mmap_size': 268435456,         # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+}
+
+
+def get_pragmas(wal=None):
+    """The pragmas to apply; ``wal`` defaults to the ``SQLITE_WAL`` setting"""
+    if wal is None:
+        wal = getattr(settings, 'SQLITE_WAL', False)
+    pragmas = dict(DEFAULT_PRAGMAS, **(WAL_PRAGMAS if wal else {}))
+    pragmas.update(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def pragma_statements(pragmas=None):
+    return [f'PRAGMA {name} = {value}' for name, value in (pragmas or get_pragmas()).items()]
+
+
+def configure_sqlite(connection):
+    """Apply the tuning pragmas to a freshly opened SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in pragma_statements():
+            cursor.execute(sql)
@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import Trip, Review, ContactMessage, UserProfile, TravelVlog
+from .models import Trip, Review, ContactMessage, UserProfile, TravelVlog, VlogUpload
+from .uploads import max_size
 
 
 class TripForm(forms.ModelForm):
@@ -228,6 +229,8 @@ class VlogUploadForm(forms.ModelForm):
         }),
         help_text="Separate tags with commas"
     )
+    # Set by the chunked uploader in place of video_file (see home/uploads.py)
+    upload_token = forms.UUIDField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = TravelVlog
@@ -246,10 +249,27 @@ class VlogUploadForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.video_upload = None
+
+    def clean_upload_token(self):
+        token = self.cleaned_data.get('upload_token')
+        if not token:
+            return None
+        try:
+            self.video_upload = VlogUpload.objects.get(
+                token=token, user=self.user, status='complete', vlog__isnull=True
+            )
+        except VlogUpload.DoesNotExist:
+            raise forms.ValidationError("The uploaded video was not found; please upload it again.")
+        return token
+
     def clean(self):
         cleaned_data = super().clean()
         video_url = cleaned_data.get('video_url')
-        video_file = cleaned_data.get('video_file')
+        video_file = cleaned_data.get('video_file') or self.video_upload
 
         if not video_url and not video_file:
             raise forms.ValidationError("Please provide either a video URL or upload a video file.")
@@ -257,9 +277,9 @@ class VlogUploadForm(forms.ModelForm):
         if video_url and video_file:
             raise forms.ValidationError("Please provide only one video source (URL or file).")
 
-        if video_file:
-            if video_file.size > 500 * 1024 * 1024:
-                raise forms.ValidationError("Video file too large (max 500MB).")
+        if video_file and self.video_upload is None:
+            if video_file.size > max_size():
+                raise forms.ValidationError(f"Video file too large (max {max_size() // (1024 * 1024)}MB).")
             if not video_file.content_type.startswith('video/'):
                 raise forms.ValidationError("Invalid file type. Please upload a video.")
 
@@ -274,7 +294,12 @@ class VlogUploadForm(forms.ModelForm):
     def save(self, commit=True):
         instance = super().save(commit=False)
         instance.tags = self.cleaned_data.get('tags', [])
+        if self.video_upload is not None:
+            # Already assembled in vlog storage; just point the field at it
+            instance.video_file.name = self.video_upload.file
         if commit:
             instance.save()
+            if self.video_upload is not None:
+                VlogUpload.objects.filter(pk=self.video_upload.pk).update(vlog=instance)
         return instance
 
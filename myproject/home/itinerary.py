@@ -0,0 +1,310 @@
+"""Itinerary generation for trips.
+
+``ItineraryEngine`` plans each day of a trip from the destination's cost
+breakdown, its food items and the trip's travel type, interests and daily
+budget. The spend per day is capped at ``Destination.get_total_daily_cost``;
+when the trip budget is lower, the food and activity allowances shrink in the
+same proportion. Activities are scored against the trip, penalised for
+repeats and packed greedily into the day's activity allowance; dishes are
+rotated so the plan does not serve the same food every day.
+
+The per-destination tables (activity costs, parsed dish prices) are cached
+in process and dropped from model signals, so planning a day is pure CPU work
+over a couple of dozen candidates.
+
+Days are built in memory and written with a single ``bulk_create`` inside one
+transaction, and the serialized itinerary is returned straight from those
+objects so callers never have to read the days back. The engine class can be
+swapped with the ``ITINERARY_ENGINE`` setting.
+"""
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Trip, TripDay
+
+ACTIVITIES = {
+    'family': [
+        "Visit local temples and cultural sites",
+        "Enjoy traditional cuisine at local restaurants",
+        "Relax at beaches/resorts",
+        "Shopping at local markets",
+        "Nature walks and sightseeing"
+    ],
+    'solo': [
+        "Explore hidden gems and local spots",
+        "Try adventure activities",
+        "Visit cafes and work remotely",
+        "Cultural immersion activities",
+        "Photography and journaling"
+    ],
+    'couple': [
+        "Romantic dinners and sunsets",
+        "Spa treatments and relaxation",
+        "Private boat rides or tours",
+        "Photography sessions",
+        "Local festival participation"
+    ],
+    'adventure': [
+        "Trekking and hiking",
+        "Water sports and activities",
+        "Wildlife safaris",
+        "Camping experiences",
+        "Extreme sports"
+    ]
+}
+
+Activity = namedtuple('Activity', ['name', 'tags', 'cost_share'])
+
+# Interest tags match the trip planner checkboxes; cost_share is the fraction
+# of the destination's daily activities cost one activity is expected to take.
+ACTIVITY_CATALOG = (
+    Activity("Visit local temples and cultural sites", {'culture'}, 0.15),
+    Activity("Enjoy traditional cuisine at local restaurants", {'food'}, 0.2),
+    Activity("Relax at beaches/resorts", {'relaxation', 'nature'}, 0.1),
+    Activity("Shopping at local markets", {'shopping', 'culture'}, 0.25),
+    Activity("Nature walks and sightseeing", {'nature'}, 0.0),
+    Activity("Explore hidden gems and local spots", {'culture', 'nature'}, 0.05),
+    Activity("Try adventure activities", {'adventure'}, 0.5),
+    Activity("Visit cafes and work remotely", {'food', 'relaxation'}, 0.1),
+    Activity("Cultural immersion activities", {'culture'}, 0.2),
+    Activity("Photography and journaling", {'nature', 'culture'}, 0.0),
+    Activity("Romantic dinners and sunsets", {'food', 'relaxation'}, 0.35),
+    Activity("Spa treatments and relaxation", {'relaxation'}, 0.6),
+    Activity("Private boat rides or tours", {'nature', 'relaxation'}, 0.45),
+    Activity("Photography sessions", {'culture'}, 0.3),
+    Activity("Local festival participation", {'culture', 'food'}, 0.15),
+    Activity("Trekking and hiking", {'adventure', 'nature'}, 0.2),
+    Activity("Water sports and activities", {'adventure'}, 0.55),
+    Activity("Wildlife safaris", {'adventure', 'nature'}, 0.7),
+    Activity("Camping experiences", {'adventure', 'nature'}, 0.4),
+    Activity("Extreme sports", {'adventure'}, 0.9),
+)
+
+VEGETARIAN_INTERESTS = {'veg', 'vegetarian', 'vegan'}
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+BULK_BATCH_SIZE = 500
+
+
+def parse_price(price, default):
+    """Average of the numbers in a price label such as '₹60–120'"""
+    numbers = [float(n) for n in _PRICE_RE.findall((price or '').replace(',', ''))]
+    return sum(numbers) / len(numbers) if numbers else default
+
+
+class DestinationTable:
+    """Everything the engine needs about one destination, precomputed"""
+
+    def __init__(self, destination, food_items):
+        self.name = destination.name
+        self.total_daily_cost = float(destination.get_total_daily_cost())
+        self.food_cost = float(destination.food_cost)
+        self.activities_cost = float(destination.activities_cost)
+        # (activity, expected cost), cheapest first
+        self.activities = sorted(
+            ((activity, self.activities_cost * activity.cost_share) for activity in ACTIVITY_CATALOG),
+            key=lambda item: item[1]
+        )
+        # (dish, price label, expected cost, is_vegetarian), cheapest first
+        self.foods = sorted(
+            (
+                (item.dish, item.price, parse_price(item.price, self.food_cost / 3), item.is_vegetarian)
+                for item in food_items
+            ),
+            key=lambda item: item[2]
+        )
+
+
+class ItineraryEngine:
+    activities_per_day = 3
+    dishes_per_day = 2
+    table_cache_size = 256
+
+    def __init__(self):
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Per-destination tables
+
+    def get_table(self, destination):
+        key = destination.pk
+        with self._lock:
+            cached = self._tables.get(key)
+            if cached is not None and cached[0] == destination.updated_at:
+                self._tables.move_to_end(key)
+                return cached[1]
+        table = DestinationTable(destination, destination.food_items.all())
+        with self._lock:
+            self._tables[key] = (destination.updated_at, table)
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.table_cache_size:
+                self._tables.popitem(last=False)
+        return table
+
+    def invalidate(self, destination_id=None):
+        """Drop the cached table for one destination, or all of them"""
+        with self._lock:
+            if destination_id is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(destination_id, None)
+
+    # Scoring and packing
+
+    def score_activity(self, activity, travel_type_activities, interests):
+        score = 1.0
+        if activity.name in travel_type_activities:
+            score += 1.0
+        score += 1.5 * len(activity.tags & interests)
+        return score
+
+    def pick_activities(self, candidates, uses, allowance):
+        """Greedily pack the best scoring activities into ``allowance``"""
+        ranked = sorted(
+            candidates,
+            key=lambda item: item[1] / (1 + uses.get(item[0].name, 0)),
+            reverse=True
+        )
+        picked, spent = [], 0.0
+        for activity, _, cost in ranked:
+            if spent + cost <= allowance:
+                picked.append(activity)
+                spent += cost
+                if len(picked) == self.activities_per_day:
+                    break
+        return picked, spent
+
+    def pick_dishes(self, foods, uses, allowance, count):
+        """Pick the least used dishes that fit ``allowance``, cheapest first among equals"""
+        ranked = sorted(foods, key=lambda food: uses.get(food[0], 0))
+        picked, spent = [], 0.0
+        for food in ranked:
+            if spent + food[2] <= allowance:
+                picked.append(food)
+                spent += food[2]
+                if len(picked) == count:
+                    break
+        return picked, spent
+
+    def plan_days(self, trip):
+        """Return a list of (title, description, activities) tuples, one per day"""
+        table = self.get_table(trip.destination)
+        interests = {str(interest).strip().lower() for interest in trip.interests or []}
+        travel_type_activities = set(ACTIVITIES.get(trip.travel_type, ACTIVITIES['family']))
+
+        budget = float(trip.daily_budget)
+        ratio = min(1.0, budget / table.total_daily_cost) if table.total_daily_cost else 1.0
+        activity_allowance = table.activities_cost * ratio
+        food_allowance = table.food_cost * ratio
+        fixed_cost = (table.total_daily_cost - table.activities_cost - table.food_cost) * ratio
+
+        candidates = [
+            (activity, self.score_activity(activity, travel_type_activities, interests), cost)
+            for activity, cost in table.activities
+        ]
+        foods = table.foods
+        if interests & VEGETARIAN_INTERESTS:
+            foods = [food for food in foods if food[3]]
+        dish_count = self.dishes_per_day + (1 if 'food' in interests else 0)
+
+        activity_uses, dish_uses = {}, {}
+        days = []
+        for day in range(1, trip.duration_days + 1):
+            activities, activity_spend = self.pick_activities(candidates, activity_uses, activity_allowance)
+            dishes, food_spend = self.pick_dishes(foods, dish_uses, food_allowance, dish_count)
+            for activity in activities:
+                activity_uses[activity.name] = activity_uses.get(activity.name, 0) + 1
+            for dish in dishes:
+                dish_uses[dish[0]] = dish_uses.get(dish[0], 0) + 1
+
+            spend = fixed_cost + activity_spend + food_spend
+            days.append((
+                f"Day {day} in {table.name}",
+                f"Explore the beauty of {table.name}. Estimated spend ₹{spend:,.0f} of ₹{budget:,.0f}.",
+                [activity.name for activity in activities]
+                + [f"Try {dish} ({price})" for dish, price, _, _ in dishes]
+            ))
+        return days
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the configured itinerary engine instance"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine_class = import_string(
+                    getattr(settings, 'ITINERARY_ENGINE', 'home.itinerary.ItineraryEngine')
+                )
+                _engine = engine_class()
+    return _engine
+
+
+def build_trip_days(trip):
+    """Build unsaved TripDay rows for every day of a trip"""
+    return [
+        TripDay(
+            trip=trip,
+            day_number=day,
+            title=title,
+            description=description,
+            activities=activities
+        )
+        for day, (title, description, activities) in enumerate(get_engine().plan_days(trip), start=1)
+    ]
+
+
+def serialize_days(days):
+    """Serialize TripDay rows for the frontend"""
+    return [
+        {
+            'day': day.day_number,
+            'title': day.title,
+            'description': day.description,
+            'activities': day.activities
+        }
+        for day in days
+    ]
+
+
+def generate_trip_days(trip):
+    """Create the itinerary for one trip and return it serialized"""
+    days = build_trip_days(trip)
+    with transaction.atomic():
+        TripDay.objects.bulk_create(days, batch_size=BULK_BATCH_SIZE)
+    return serialize_days(days)
+
+
+def create_trip_with_days(**fields):
+    """Save a new trip and its itinerary together; returns the trip and the serialized days"""
+    trip = Trip(**fields)
+    # Plan first so the transaction, and SQLite's write lock, only covers the inserts
+    days = build_trip_days(trip)
+    with transaction.atomic():
+        trip.save()
+        TripDay.objects.bulk_create(days, batch_size=BULK_BATCH_SIZE)
+    return trip, serialize_days(days)
+
+
+def generate_itineraries(trips, batch_size=BULK_BATCH_SIZE):
+    """Create itineraries for many trips at once, e.g. when seeding or load testing.
+
+    ``trips`` should have their destinations loaded (``select_related('destination')``).
+    Returns a dict mapping trip id to its serialized days.
+    """
+    days_by_trip = {trip.pk: build_trip_days(trip) for trip in trips}
+    with transaction.atomic():
+        TripDay.objects.bulk_create(
+            [day for days in days_by_trip.values() for day in days],
+            batch_size=batch_size
+        )
+    return {trip_id: serialize_days(days) for trip_id, days in days_by_trip.items()}
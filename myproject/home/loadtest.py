@@ -0,0 +1,563 @@
+"""Offline load generator for the Safar app.
+
+Replays a weighted mix of requests (home page, destination pages, filtered
+vlog lists, search, likes, itinerary generation) against the real Django
+application, with every middleware, and reports throughput, latency
+percentiles and database queries per endpoint.
+
+Three drivers, none of which touch the network beyond the loopback:
+
+* ``wsgi``: calls the WSGI application in-process from N client threads.
+* ``asgi``: calls the ASGI application in-process from N asyncio tasks.
+* ``socket``: serves the WSGI application on an ephemeral 127.0.0.1 port with
+  the threaded server ``runserver`` uses and sends real HTTP requests to it.
+
+Queries are counted with a database execute wrapper that reports into a
+context variable, so they are attributed to the request that ran them even
+when ASGI runs the view in a worker thread. Run it against a seeded database
+(see ``seed_data``): likes and generated trips are written for real.
+"""
+import asyncio
+import contextvars
+import http.client
+import io
+import importlib
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .models import Destination, TravelVlog
+from .seeding import TAGS, TRAVEL_TYPES, INTERESTS, VLOG_TYPES, zipf_rank
+
+HOST = '127.0.0.1'
+QUERY_HEADER = 'X-Loadtest-Queries'
+
+# Endpoints that need a logged-in user
+LOGIN_ENDPOINTS = {'like', 'itinerary'}
+
+DEFAULT_MIX = {
+    'index': 25,
+    'destination': 20,
+    'vlogs': 25,
+    'search': 15,
+    'like': 10,
+    'itinerary': 5,
+}
+
+# The JSON endpoints, for comparing the sync and async paths (see benchmark_async)
+JSON_MIX = {
+    'destination_data': 40,
+    'ai_chat': 30,
+    'like': 20,
+    'itinerary': 10,
+}
+
+CHAT_MESSAGES = (
+    "What should my budget be?",
+    "Which food should I try?",
+    "How is the weather in winter?",
+    "Is it safe to travel alone?",
+    "Do I need a visa?",
+    "Where should I go next?",
+    "Cheapest destination in winter",
+    "Veg food options for a beach trip",
+    "Top rated honeymoon places under 8000",
+)
+
+# Candidate ids kept per model; popular rows are drawn most often
+SAMPLE_SIZE = 5000
+
+Request = namedtuple('Request', ['endpoint', 'method', 'path', 'params', 'login'])
+
+
+# Query counting
+
+_query_counter = contextvars.ContextVar('loadtest_query_counter', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _query_counter.get()
+    # Connection setup pragmas (see home.db) are not queries of the request
+    if counter is not None and not sql.startswith('PRAGMA'):
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    connection_created.connect(_install_wrapper, dispatch_uid='loadtest_query_counter')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(None, connection)
+
+
+class CountingApp:
+    """WSGI wrapper that reports the queries of each request in a response header"""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        counter = [0]
+        token = _query_counter.set(counter)
+
+        def counting_start_response(status, headers, exc_info=None):
+            # Django builds the whole response before calling start_response
+            return start_response(status, headers + [(QUERY_HEADER, str(counter[0]))], exc_info)
+
+        try:
+            return self.application(environ, counting_start_response)
+        finally:
+            _query_counter.reset(token)
+
+
+# Traffic
+
+class Traffic:
+    """Draws requests from the weighted mix, with Zipf-skewed popular rows"""
+
+    def __init__(self, mix, seed=None):
+        self.endpoints = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.endpoints]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.destination_ids = list(
+            Destination.objects.order_by('-review_count', 'id').values_list('id', flat=True)[:SAMPLE_SIZE]
+        )
+        self.vlog_ids = list(
+            TravelVlog.objects.order_by('-views', '-id').values_list('id', flat=True)[:SAMPLE_SIZE]
+        )
+        self.terms = list(TAGS) + list(
+            Destination.objects.values_list('name', flat=True)[:200]
+        )
+        if not self.destination_ids or not self.vlog_ids:
+            raise ValueError("The load test needs destinations and vlogs; run seed_data first.")
+
+    def popular(self, ids):
+        return ids[zipf_rank(self.rng, len(ids))]
+
+    def next(self):
+        with self.lock:
+            endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+            return getattr(self, f'build_{endpoint}')()
+
+    def build_index(self):
+        return Request('index', 'GET', reverse('home:index'), {}, False)
+
+    def build_destination(self):
+        return Request('destination', 'GET',
+                       reverse('home:destination_detail', args=[self.popular(self.destination_ids)]), {}, False)
+
+    def build_vlogs(self):
+        params = {'sort': self.rng.choice(('latest', 'popular', 'liked', 'oldest'))}
+        if self.rng.random() < 0.4:
+            params['type'] = self.rng.choice(VLOG_TYPES)
+        if self.rng.random() < 0.2:
+            params['q'] = self.rng.choice(TAGS)
+        return Request('vlogs', 'GET', reverse('home:vlogs'), params, False)
+
+    def build_search(self):
+        term = self.rng.choice(self.terms)
+        # Half the searches are still being typed
+        if self.rng.random() < 0.5:
+            return Request('search', 'GET', reverse('home:search_suggest'),
+                           {'q': term[:self.rng.randint(2, max(2, len(term)))]}, False)
+        return Request('search', 'GET', reverse('home:search'), {'q': term}, False)
+
+    def build_destination_data(self):
+        return Request('destination_data', 'GET',
+                       reverse('home:destination_data', args=[self.popular(self.destination_ids)]), {}, False)
+
+    def build_ai_chat(self):
+        return Request('ai_chat', 'POST', reverse('home:ai_chat'),
+                       {'message': self.rng.choice(CHAT_MESSAGES)}, False)
+
+    def build_like(self):
+        return Request('like', 'POST', reverse('home:like_vlog', args=[self.popular(self.vlog_ids)]),
+                       {'action': 'toggle'}, True)
+
+    def build_itinerary(self):
+        return Request('itinerary', 'POST', reverse('home:generate_itinerary'), {
+            'destination': self.popular(self.destination_ids),
+            'duration': self.rng.randint(2, 7),
+            'travel_type': self.rng.choice(TRAVEL_TYPES),
+            'budget': self.rng.choice(('Low', 'Medium', 'High')),
+            'interests[]': self.rng.sample(INTERESTS, 2),
+        }, True)
+
+
+class Sessions:
+    """Logged-in sessions for existing users, plus a CSRF token; ``close`` deletes them"""
+
+    def __init__(self, count):
+        self.engine = importlib.import_module(settings.SESSION_ENGINE)
+        self.cookies = []
+        for user in User.objects.filter(is_active=True).order_by('id')[:count]:
+            session = self.engine.SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            self.cookies.append(session.session_key)
+        self.csrf_token = get_random_string(32)
+
+    def close(self):
+        """Delete the sessions, so repeated runs do not grow the session store"""
+        store = self.engine.SessionStore()
+        for session_key in self.cookies:
+            store.delete(session_key)
+        self.cookies = []
+
+    def headers(self, request, rng):
+        """Cookie and CSRF headers for ``request``"""
+        cookies = {settings.CSRF_COOKIE_NAME: self.csrf_token}
+        if request.login and self.cookies:
+            cookies[settings.SESSION_COOKIE_NAME] = rng.choice(self.cookies)
+        headers = {'Cookie': '; '.join(f'{name}={value}' for name, value in cookies.items())}
+        if request.method == 'POST':
+            headers['X-CSRFToken'] = self.csrf_token
+        return headers
+
+
+def encode(request):
+    """(query string, body) for ``request``"""
+    data = urlencode(request.params, doseq=True)
+    if request.method == 'GET':
+        return data, b''
+    return '', data.encode('utf-8')
+
+
+# Drivers. Each returns (status, query count) for one request.
+
+class WsgiDriver:
+    name = 'wsgi'
+
+    def __init__(self):
+        self.application = CountingApp(get_wsgi_application())
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def environ(self, request, headers):
+        query, body = encode(request)
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'PATH_INFO': request.path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': HOST,
+            'HTTP_HOST': HOST,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        return environ
+
+    def call(self, request, headers):
+        result = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            result['status'] = int(status.split()[0])
+            result['queries'] = int(dict(response_headers).get(QUERY_HEADER, 0))
+
+        response = self.application(self.environ(request, headers), start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return result['status'], result['queries']
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class SocketDriver:
+    name = 'socket'
+
+    def __init__(self):
+        self.application = CountingApp(get_wsgi_application())
+        self.server = None
+        self.local = threading.local()
+
+    def start(self):
+        self.server = ThreadedWSGIServer((HOST, 0), _QuietHandler, allow_reuse_address=True)
+        self.server.set_app(self.application)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def call(self, request, headers):
+        query, body = encode(request)
+        path = f'{request.path}?{query}' if query else request.path
+        conn = http.client.HTTPConnection(HOST, self.port, timeout=60)
+        try:
+            headers = dict(headers, **{'Content-Type': 'application/x-www-form-urlencoded'})
+            conn.request(request.method, path, body=body or None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status, int(response.getheader(QUERY_HEADER, 0))
+        finally:
+            conn.close()
+
+
+class AsgiDriver:
+    name = 'asgi'
+
+    def __init__(self):
+        self.application = get_asgi_application()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    async def call(self, request, headers):
+        query, body = encode(request)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': request.method,
+            'scheme': 'http',
+            'path': request.path,
+            'raw_path': request.path.encode('utf-8'),
+            'query_string': query.encode('utf-8'),
+            'root_path': '',
+            'headers': [(b'host', HOST.encode())]
+            + [(b'content-type', b'application/x-www-form-urlencoded'),
+               (b'content-length', str(len(body)).encode())]
+            + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            'client': (HOST, 50000),
+            'server': (HOST, 80),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        result = {}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Block like a client that keeps the connection open
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                result['status'] = message['status']
+
+        counter = [0]
+        token = _query_counter.set(counter)
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            _query_counter.reset(token)
+        return result.get('status', 500), counter[0]
+
+
+DRIVERS = {'wsgi': WsgiDriver, 'asgi': AsgiDriver, 'socket': SocketDriver}
+
+
+# Results
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.elapsed = 0.0
+
+    def record(self, endpoint, seconds, status, queries):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.queries[endpoint] += queries
+            if status is None or status >= 400:
+                self.errors[endpoint] += 1
+
+    def summary(self):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            endpoints[endpoint] = {
+                'requests': len(ordered),
+                'errors': self.errors[endpoint],
+                'rps': len(ordered) / self.elapsed if self.elapsed else 0.0,
+                'mean_ms': sum(ordered) / len(ordered) * 1000,
+                'p50_ms': percentile(ordered, 0.50) * 1000,
+                'p90_ms': percentile(ordered, 0.90) * 1000,
+                'p99_ms': percentile(ordered, 0.99) * 1000,
+                'max_ms': ordered[-1] * 1000,
+                'queries_per_request': self.queries[endpoint] / len(ordered),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            'elapsed_s': self.elapsed,
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'rps': total / self.elapsed if self.elapsed else 0.0,
+            'endpoints': endpoints,
+        }
+
+
+# Runner
+
+class LoadTest:
+    def __init__(self, driver='wsgi', mix=None, concurrency=8, requests=1000, duration=None,
+                 warmup=50, logged_in=0.2, users=20, seed=None):
+        install_query_counter()
+        self.driver = DRIVERS[driver]()
+        self.sessions = Sessions(users)
+        mix = dict(mix or DEFAULT_MIX)
+        if not self.sessions.cookies:
+            for name in LOGIN_ENDPOINTS:
+                mix[name] = 0
+        try:
+            self.traffic = Traffic(mix, seed)
+        except ValueError:
+            self.sessions.close()
+            raise
+        self.concurrency = concurrency
+        self.requests = requests
+        self.duration = duration
+        self.warmup = warmup
+        self.logged_in = logged_in
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _next(self):
+        request = self.traffic.next()
+        with self.lock:
+            if not request.login and self.rng.random() < self.logged_in:
+                request = request._replace(login=True)
+            return request, self.sessions.headers(request, self.rng)
+
+    def _budget(self):
+        """Shared countdown of requests left, or a deadline"""
+        lock = threading.Lock()
+        state = {'left': self.requests}
+        deadline = time.perf_counter() + self.duration if self.duration else None
+
+        def take():
+            if deadline is not None:
+                return time.perf_counter() < deadline
+            with lock:
+                if state['left'] <= 0:
+                    return False
+                state['left'] -= 1
+                return True
+        return take
+
+    def run(self):
+        results = Results()
+        self.driver.start()
+        try:
+            if isinstance(self.driver, AsgiDriver):
+                asyncio.run(self._run_async(self._warmup_budget(), Results()))
+                started = time.perf_counter()
+                asyncio.run(self._run_async(self._budget(), results))
+            else:
+                self._run_threads(self._warmup_budget(), Results())
+                started = time.perf_counter()
+                self._run_threads(self._budget(), results)
+            results.elapsed = time.perf_counter() - started
+        finally:
+            self.driver.stop()
+            self.sessions.close()
+            connections.close_all()
+        return results
+
+    def _warmup_budget(self):
+        left = [self.warmup]
+        lock = threading.Lock()
+
+        def take():
+            with lock:
+                left[0] -= 1
+                return left[0] >= 0
+        return take
+
+    def _run_threads(self, take, results):
+        def worker():
+            while take():
+                request, headers = self._next()
+                started = time.perf_counter()
+                try:
+                    status, queries = self.driver.call(request, headers)
+                except Exception:
+                    status, queries = None, 0
+                results.record(request.endpoint, time.perf_counter() - started, status, queries)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    async def _run_async(self, take, results):
+        async def worker():
+            while take():
+                request, headers = self._next()
+                started = time.perf_counter()
+                try:
+                    status, queries = await self.driver.call(request, headers)
+                except Exception:
+                    status, queries = None, 0
+                results.record(request.endpoint, time.perf_counter() - started, status, queries)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+
+def parse_mix(text, endpoints=DEFAULT_MIX):
+    """'index=30,search=10' -> mix dict; unknown endpoints raise ValueError"""
+    mix = {name: 0 for name in endpoints}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in endpoints:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(endpoints)}")
+        mix[name] = float(weight or 1)
+    return mix
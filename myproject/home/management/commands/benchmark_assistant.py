@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.assistant import SEASON_WORDS, TYPE_WORDS, Knowledge, answer, assistant, normalize
+
+TEMPLATES = (
+    "cheapest {type} destination in {season}",
+    "veg food in {name}",
+    "what non veg dishes should I eat in {name}?",
+    "is {name} good in {season}",
+    "how much does a trip to {name} cost",
+    "top rated {type} places",
+    "{type} trip under {amount}",
+    "best time to visit {name}",
+    "what should my budget be?",
+    "hello there",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the AI guide chat on generated questions about the current destinations: "
+        "phrase matching against a linear scan, and replies with and without memoization"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=20000, help="Messages per measurement")
+        parser.add_argument('--distinct', type=int, default=500, help="Distinct messages they are drawn from")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['messages'], options['distinct']) < 1:
+            raise CommandError("--messages and --distinct must be positive.")
+        started = time.perf_counter()
+        knowledge = Knowledge.load()
+        load_ms = (time.perf_counter() - started) * 1000
+        if not knowledge.facts:
+            raise CommandError("No destinations to ask about; run seed_data first.")
+
+        rng = random.Random(options['seed'])
+        names = [fact.name for fact in knowledge.facts]
+        distinct = [
+            rng.choice(TEMPLATES).format(
+                name=rng.choice(names), type=rng.choice(list(TYPE_WORDS)),
+                season=rng.choice(list(SEASON_WORDS)), amount=rng.randrange(2000, 15000, 500),
+            )
+            for _ in range(options['distinct'])
+        ]
+        # Popular questions come up far more often than the rest
+        weights = [1 / (rank + 1) for rank in range(len(distinct))]
+        messages = rng.choices(distinct, weights, k=options['messages'])
+        normalized = [normalize(message) for message in messages]
+
+        # The phrases a linear scan would try one by one, as ai_chat used to
+        phrases = [f' {phrase} ' for phrase in self.phrases(knowledge)]
+
+        rows = [
+            ('aho-corasick match', self.rate(lambda m: knowledge.matcher.find(m.split()), normalized)),
+            ('linear scan match', self.rate(lambda m: [p for p in phrases if p in f' {m} '], normalized)),
+            ('reply, no memo', self.rate(lambda m: answer(knowledge, m), normalized)),
+        ]
+        assistant.invalidate()
+        assistant.reply(messages[0])
+        rows.append(('reply, memoized', self.rate(assistant.reply, messages)))
+
+        self.stdout.write(f"{'measurement':<22}{'msgs/s':>12}{'us/msg':>10}")
+        for name, rate in rows:
+            self.stdout.write(f"{name:<22}{rate:>12,.0f}{1e6 / rate:>10.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['messages']} messages ({len(set(messages))} distinct) over {len(names)} destinations "
+            f"and {len(phrases)} phrases; facts loaded in {load_ms:.1f} ms"
+        ))
+
+    def phrases(self, knowledge):
+        """Every phrase in the automaton, spelled out from its states"""
+        found, stack = [], [(0, [])]
+        while stack:
+            state, tokens = stack.pop()
+            if tokens and any(length == len(tokens) for length, _ in knowledge.matcher.output[state]):
+                found.append(' '.join(tokens))
+            stack.extend((following, tokens + [token]) for token, following in knowledge.matcher.goto[state].items())
+        return found
+
+    def rate(self, function, messages):
+        started = time.perf_counter()
+        for message in messages:
+            function(message)
+        return len(messages) / (time.perf_counter() - started)
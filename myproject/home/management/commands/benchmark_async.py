@@ -0,0 +1,167 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from home.loadtest import JSON_MIX, LOGIN_ENDPOINTS, AsgiDriver, Sessions, Traffic, WsgiDriver, parse_mix, percentile
+
+
+class Gauge:
+    """Requests inside the application right now, the peak, and the time spent there"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        self.busy = 0.0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        return time.perf_counter()
+
+    def exit(self, started):
+        with self.lock:
+            self.current -= 1
+            self.busy += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the JSON endpoints increasing numbers of concurrent requests and compare how many "
+        "one worker keeps in flight, and at what latency, on the WSGI sync path and the ASGI async path"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32,128',
+                            help="Comma separated numbers of concurrent clients to try")
+        parser.add_argument('--requests', type=int, default=400, help="Requests per concurrency level")
+        parser.add_argument('--threads', type=int, default=4,
+                            help="Threads of the WSGI worker, like gunicorn --threads")
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in JSON_MIX.items()),
+                            help="Endpoint weights, e.g. 'destination_data=50,ai_chat=50'")
+        parser.add_argument('--users', type=int, default=20, help="Users to create sessions for")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--report', help="Also write the results as JSON to this path")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+            mix = parse_mix(options['mix'], JSON_MIX)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if not levels or min(levels) < 1 or options['threads'] < 1:
+            raise CommandError("--concurrency levels and --threads must be positive.")
+
+        self.sessions = Sessions(options['users'])
+        try:
+            if not self.sessions.cookies:
+                for name in LOGIN_ENDPOINTS:
+                    mix[name] = 0
+            try:
+                self.traffic = Traffic(mix, options['seed'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.rng = random.Random(options['seed'])
+            self.options = options
+            wsgi, asgi = WsgiDriver(), AsgiDriver()
+
+            self.stdout.write(
+                f"{'path':<6}{'clients':>8}{'in flight':>11}{'peak':>6}{'req/s':>9}"
+                f"{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+            )
+            rows = []
+            for concurrency in levels:
+                for name, serve in (('wsgi', self.wsgi_path(wsgi)), ('asgi', self.asgi_path(asgi))):
+                    # A few unrecorded requests load the URLconf, templates and caches
+                    asyncio.run(self.run_level(serve, min(concurrency, 8), 20))
+                    row = dict(path=name, clients=concurrency,
+                               **asyncio.run(self.run_level(serve, concurrency, options['requests'])))
+                    rows.append(row)
+                    self.stdout.write(
+                        f"{name:<6}{concurrency:>8}{row['mean_in_flight']:>11.1f}{row['peak_in_flight']:>6}"
+                        f"{row['rps']:>9.1f}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['errors']:>8}"
+                    )
+        finally:
+            self.sessions.close()
+            connections.close_all()
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                json.dump({'threads': options['threads'], 'mix': mix, 'results': rows}, report, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Compared a {options['threads']}-thread WSGI worker with one ASGI event loop "
+            f"at {len(levels)} concurrency levels"
+        ))
+
+    def wsgi_path(self, driver):
+        """One sync worker: requests queue for one of --threads threads"""
+        def serve(gauge):
+            pool = ThreadPoolExecutor(self.options['threads'])
+
+            def handle(request, headers):
+                started = gauge.enter()
+                try:
+                    return driver.call(request, headers)
+                finally:
+                    gauge.exit(started)
+
+            async def call(request, headers):
+                return await asyncio.get_running_loop().run_in_executor(pool, handle, request, headers)
+            return call, pool.shutdown
+        return serve
+
+    def asgi_path(self, driver):
+        """One event loop: every request is accepted at once and awaits the ORM"""
+        def serve(gauge):
+            async def call(request, headers):
+                started = gauge.enter()
+                try:
+                    return await driver.call(request, headers)
+                finally:
+                    gauge.exit(started)
+            return call, lambda: None
+        return serve
+
+    async def run_level(self, serve, concurrency, requests):
+        gauge = Gauge()
+        call, close = serve(gauge)
+        latencies, errors, left = [], [0], [requests]
+
+        async def client():
+            while left[0] > 0:
+                left[0] -= 1
+                request = self.traffic.next()
+                headers = self.sessions.headers(request, self.rng)
+                started = time.perf_counter()
+                try:
+                    status, _ = await call(request, headers)
+                except Exception:
+                    status = None
+                latencies.append(time.perf_counter() - started)
+                if status is None or status >= 400:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+        finally:
+            close()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            # Little's law: average requests inside the application
+            'mean_in_flight': gauge.busy / elapsed,
+            'peak_in_flight': gauge.peak,
+        }
@@ -0,0 +1,145 @@
+import http.client
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from home.loadtest import HOST, _QuietHandler, percentile
+
+MODES = ('range', 'no-range', 'revalidate')
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a scratch video over a loopback socket and time concurrent clients seeking "
+        "in it with Range requests, without them, and revalidating with If-None-Match"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=64, help="Size of the scratch video")
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent players")
+        parser.add_argument('--seeks', type=int, default=50, help="Seeks per player and mode")
+        parser.add_argument('--chunk-kb', type=int, default=512,
+                            help="Bytes a player needs after each seek")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['size_mb'], options['clients'], options['seeks'], options['chunk_kb']) < 1:
+            raise CommandError("All sizes and counts must be positive.")
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                self.size = self.write_video(media_root, options['size_mb'] * 1024 * 1024)
+                self.path = reverse('home:serve_media', args=['vlogs/benchmark.mp4'])
+                self.benchmark(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def write_video(self, media_root, size):
+        os.makedirs(os.path.join(media_root, 'vlogs'))
+        with open(os.path.join(media_root, 'vlogs', 'benchmark.mp4'), 'wb') as video:
+            for _ in range(size // (1024 * 1024)):
+                video.write(os.urandom(1024 * 1024))
+        return size
+
+    def benchmark(self, options):
+        server = ThreadedWSGIServer((HOST, 0), _QuietHandler, allow_reuse_address=True)
+        server.set_app(get_wsgi_application())
+        # Players that hang up early are expected here, not worth a broken pipe warning each
+        logging.getLogger('django.server').setLevel(logging.ERROR)
+        self.port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.etag = self.request('HEAD', {})[2]
+            self.stdout.write(
+                f"{'mode':<12}{'seeks':>7}{'errors':>8}{'MB read':>10}{'seeks/s':>10}"
+                f"{'MB/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+            )
+            for mode in MODES:
+                row = self.run_mode(mode, options)
+                self.stdout.write(
+                    f"{mode:<12}{row['seeks']:>7}{row['errors']:>8}{row['mb']:>10.1f}"
+                    f"{row['seeks_per_s']:>10.1f}{row['mb_per_s']:>9.1f}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['clients']} players x {options['seeks']} seeks of {options['chunk_kb']}KB "
+            f"in a {options['size_mb']}MB video per mode"
+        ))
+
+    def request(self, method, headers, needed=None):
+        """(status, bytes read, ETag); reads at most ``needed`` bytes of the body"""
+        conn = http.client.HTTPConnection(HOST, self.port, timeout=60)
+        try:
+            conn.request(method, self.path, headers=headers)
+            response = conn.getresponse()
+            read = 0
+            while needed is None or read < needed:
+                block = response.read(min(256 * 1024, needed - read) if needed else 256 * 1024)
+                if not block:
+                    break
+                read += len(block)
+            return response.status, read, response.getheader('ETag')
+        finally:
+            # A player without Range support drops the connection once it has what it needs
+            conn.close()
+
+    def seek(self, mode, offset, chunk):
+        if mode == 'range':
+            status, read, _ = self.request('GET', {'Range': f'bytes={offset}-{offset + chunk - 1}'})
+            return status == 206, read
+        if mode == 'no-range':
+            # The whole file again, from the start up to the end of the wanted chunk
+            status, read, _ = self.request('GET', {}, needed=offset + chunk)
+            return status == 200, read
+        status, read, _ = self.request('GET', {'If-None-Match': self.etag})
+        return status == 304, read
+
+    def run_mode(self, mode, options):
+        chunk = min(options['chunk_kb'] * 1024, self.size)
+        latencies, totals, lock = [], {'bytes': 0, 'errors': 0}, threading.Lock()
+
+        def player(number):
+            rng = random.Random(options['seed'] * 1000 + number)
+            for _ in range(options['seeks']):
+                offset = rng.randrange(0, self.size - chunk + 1)
+                started = time.perf_counter()
+                try:
+                    ok, read = self.seek(mode, offset, chunk)
+                except OSError:
+                    ok, read = False, 0
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    totals['bytes'] += read
+                    totals['errors'] += not ok
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=player, args=(n,)) for n in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        mb = totals['bytes'] / (1024 * 1024)
+        return {
+            'seeks': len(latencies),
+            'errors': totals['errors'],
+            'mb': mb,
+            'seeks_per_s': len(latencies) / elapsed,
+            'mb_per_s': mb / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
@@ -0,0 +1,137 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from home import db
+
+BASELINE_PRAGMAS = {}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure read and write throughput of concurrent threads on a scratch SQLite "
+        "database, with the default settings and with the tuning pragmas, WAL included"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help="sqlite3 connect timeout for the baseline run, as Django's default")
+
+    def handle(self, *args, **options):
+        results = [
+            ('baseline', self.run(BASELINE_PRAGMAS, options)),
+            ('tuned', self.run(db.get_pragmas(wal=True), options)),
+        ]
+        self.stdout.write(
+            f"{'config':<10}{'reads/s':>12}{'writes/s':>12}{'locked':>10}{'p99 write ms':>15}"
+        )
+        for name, result in results:
+            self.stdout.write(
+                f"{name:<10}{result['reads'] / result['elapsed']:>12.0f}"
+                f"{result['writes'] / result['elapsed']:>12.0f}"
+                f"{result['locked']:>10}{result['p99_write_ms']:>15.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {options['readers']} readers and {options['writers']} writers "
+            f"for {options['seconds']}s per config"
+        ))
+
+    def setup(self, path, rows):
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE vlog (id INTEGER PRIMARY KEY, title TEXT NOT NULL, "
+            "views INTEGER NOT NULL, likes INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX vlog_views ON vlog (views)")
+        conn.executemany(
+            "INSERT INTO vlog (id, title, views, likes) VALUES (?, ?, 0, 0)",
+            ((i, f"Vlog {i}") for i in range(1, rows + 1))
+        )
+        conn.commit()
+        conn.close()
+
+    def connect(self, path, pragmas, timeout):
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for sql in db.pragma_statements(pragmas) if pragmas else []:
+            conn.execute(sql)
+        return conn
+
+    def run(self, pragmas, options):
+        rows = options['rows']
+        # A busy_timeout pragma, when present, replaces the connect timeout
+        timeout = options['timeout']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            self.setup(path, rows)
+
+            stop = threading.Event()
+            lock = threading.Lock()
+            totals = {'reads': 0, 'writes': 0, 'locked': 0}
+            write_times = []
+
+            def reader(seed):
+                rng = random.Random(seed)
+                conn = self.connect(path, pragmas, timeout)
+                reads = locked = 0
+                while not stop.is_set():
+                    try:
+                        conn.execute("SELECT id, title, views FROM vlog WHERE id = ?",
+                                     (rng.randint(1, rows),)).fetchone()
+                        conn.execute("SELECT id, title FROM vlog ORDER BY views DESC LIMIT 12").fetchall()
+                        reads += 1
+                    except sqlite3.OperationalError:
+                        locked += 1
+                conn.close()
+                with lock:
+                    totals['reads'] += reads
+                    totals['locked'] += locked
+
+            def writer(seed):
+                rng = random.Random(seed)
+                conn = self.connect(path, pragmas, timeout)
+                writes = locked = 0
+                times = []
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        conn.execute("BEGIN IMMEDIATE")
+                        conn.execute("UPDATE vlog SET views = views + 1 WHERE id = ?", (rng.randint(1, rows),))
+                        conn.execute("COMMIT")
+                        writes += 1
+                        times.append(time.perf_counter() - started)
+                    except sqlite3.OperationalError:
+                        locked += 1
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                conn.close()
+                with lock:
+                    totals['writes'] += writes
+                    totals['locked'] += locked
+                    write_times.extend(times)
+
+            threads = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+            threads += [threading.Thread(target=writer, args=(-i - 1,)) for i in range(options['writers'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(options['seconds'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+            totals['elapsed'] = time.perf_counter() - started
+
+        write_times.sort()
+        totals['p99_write_ms'] = (
+            write_times[min(len(write_times) - 1, int(len(write_times) * 0.99))] * 1000
+            if write_times else 0.0
+        )
+        return totals
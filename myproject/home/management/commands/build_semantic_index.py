@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home import semantic
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed new and changed destinations, vlogs and reviews into the semantic search index; "
+        "run it after data changes, e.g. from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Re-embed everything into a fresh index")
+
+    def handle(self, *args, **options):
+        if not semantic.available():
+            raise CommandError("Semantic search needs NumPy: pip install numpy")
+        started = time.perf_counter()
+        counts = semantic.semantic_index.build(full=options['full'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Semantic index at {semantic.semantic_index.path}: {counts['added']} added, "
+            f"{counts['updated']} updated, {counts['removed']} removed, "
+            f"{counts['unchanged']} unchanged in {elapsed:.2f}s"
+        ))
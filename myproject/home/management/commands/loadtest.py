@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.loadtest import DEFAULT_MIX, DRIVERS, LoadTest, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted traffic mix against the app in-process or over a loopback socket "
+        "and report requests/sec, latency percentiles and DB queries per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--driver', choices=sorted(DRIVERS), default='wsgi')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help="Endpoint weights, e.g. 'index=30,vlogs=20,like=5'")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Client threads, or asyncio tasks with the asgi driver")
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=None,
+                            help="Run for this many seconds instead of a fixed number of requests")
+        parser.add_argument('--warmup', type=int, default=50, help="Unrecorded requests sent first")
+        parser.add_argument('--logged-in', type=float, default=0.2,
+                            help="Share of page requests sent with a session")
+        parser.add_argument('--users', type=int, default=20, help="Users to create sessions for")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--report', help="Also write the results as JSON to this path")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            load_test = LoadTest(
+                driver=options['driver'], mix=mix, concurrency=options['concurrency'],
+                requests=options['requests'], duration=options['duration'], warmup=options['warmup'],
+                logged_in=options['logged_in'], users=options['users'], seed=options['seed'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        summary = load_test.run().summary()
+        summary.update(driver=options['driver'], concurrency=options['concurrency'], mix=mix)
+
+        self.stdout.write(
+            f"{'endpoint':<12}{'reqs':>7}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}"
+            f"{'p90':>9}{'p99':>9}{'max':>9}{'queries':>9}"
+        )
+        for endpoint, row in summary['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<12}{row['requests']:>7}{row['errors']:>8}{row['rps']:>9.1f}"
+                f"{row['mean_ms']:>9.1f}{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}"
+                f"{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}{row['queries_per_request']:>9.1f}"
+            )
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                json.dump(summary, report, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s "
+            f"({summary['rps']:.1f} req/s, {summary['errors']} errors) with the {options['driver']} driver"
+        ))
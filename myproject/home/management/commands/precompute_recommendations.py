@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home import recommend
+
+
+class Command(BaseCommand):
+    help = "Score every user against every destination in batches and cache their home page recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=recommend.BATCH_SIZE, help="Users scored per pass")
+
+    def handle(self, *args, **options):
+        if not recommend.available():
+            raise CommandError("Recommendations need NumPy: pip install numpy")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        recommend.recommender.invalidate()
+        user_ids = list(User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        started = time.perf_counter()
+        done = recommend.recommender.precompute(user_ids, options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached recommendations for {done} users in {elapsed:.2f}s "
+            f"({done / elapsed if elapsed else 0:,.0f} users/s)"
+        ))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked vlog uploads that were abandoned, with their partial or unused files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24,
+                            help="Remove uploads untouched for this many hours")
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} stale uploads."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from home import search
+
+
+class Command(BaseCommand):
+    help = "Drop and rebuild the full-text search index from the current data"
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            raise CommandError("Full-text search needs the SQLite backend with FTS5.")
+
+        with transaction.atomic():
+            search.rebuild_indexes()
+
+        tables = ', '.join(index.fts_table for index in search.INDEXES)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index: {tables}"))
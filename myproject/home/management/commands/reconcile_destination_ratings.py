@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from home import cache as view_cache
+from home.models import Destination, Review
+
+
+class Command(BaseCommand):
+    help = "Recompute Destination review_count, rating_sum and average_rating from reviews in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of destinations to reconcile per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            batch = list(
+                Destination.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'review_count', 'rating_sum')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            totals = {
+                row['destination_id']: (row['count'], row['total'])
+                for row in Review.objects.filter(destination_id__in=[pk for pk, _, _ in batch])
+                .values('destination_id')
+                .annotate(count=Count('id'), total=Sum('rating'))
+            }
+            drifted = [
+                Destination(pk=pk, review_count=totals.get(pk, (0, 0))[0], rating_sum=totals.get(pk, (0, 0))[1])
+                for pk, review_count, rating_sum in batch
+                if (review_count, rating_sum) != totals.get(pk, (0, 0))
+            ]
+            if drifted:
+                with transaction.atomic():
+                    Destination.objects.bulk_update(drifted, ['review_count', 'rating_sum'])
+                    Destination.objects.filter(pk__in=[d.pk for d in drifted]).update(
+                        average_rating=Destination.average_rating_expression()
+                    )
+                # Neither write sends signals; the same pages as Destination.adjust_rating
+                view_cache.invalidate(
+                    'index', 'destinations', *(f'destination:{destination.pk}' for destination in drifted)
+                )
+
+            checked += len(batch)
+            fixed += len(drifted)
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} destinations, fixed {fixed} rating aggregates."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from home.models import UserProfile
+
+STAT_FIELDS = ['trips_taken', 'total_reviews', 'rating_sum', 'average_rating']
+
+
+class Command(BaseCommand):
+    help = "Recompute UserProfile trip and review stats from the source tables; run periodically to repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of profiles to reconcile per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            batch = list(UserProfile.objects.filter(pk__gt=last_id).order_by('pk').only('user_id', *STAT_FIELDS)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].pk
+
+            drifted = []
+            for user_profile in batch:
+                stored = [getattr(user_profile, field) for field in STAT_FIELDS]
+                user_profile.compute_stats()
+                if stored != [getattr(user_profile, field) for field in STAT_FIELDS]:
+                    drifted.append(user_profile)
+            if drifted:
+                with transaction.atomic():
+                    UserProfile.objects.bulk_update(drifted, STAT_FIELDS)
+
+            checked += len(batch)
+            fixed += len(drifted)
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} profiles, fixed {fixed} stat rows."))
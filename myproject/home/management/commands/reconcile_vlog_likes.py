@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from home import cache as view_cache
+from home.models import TravelVlog, VlogLike
+from home.stats import invalidate_vlog_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute TravelVlog.likes from the VlogLike relation in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of vlogs to reconcile per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            batch = list(
+                TravelVlog.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'likes', 'destination_id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            counts = dict(
+                VlogLike.objects.filter(vlog_id__in=[pk for pk, _, _ in batch])
+                .values('vlog_id')
+                .annotate(total=Count('id'))
+                .values_list('vlog_id', 'total')
+            )
+            drifted = [
+                TravelVlog(pk=pk, likes=counts.get(pk, 0), destination_id=destination_id)
+                for pk, likes, destination_id in batch
+                if likes != counts.get(pk, 0)
+            ]
+            if drifted:
+                with transaction.atomic():
+                    TravelVlog.objects.bulk_update(drifted, ['likes'])
+                # bulk_update sends no signals; the same pages as a like (see TravelVlog._likes_changed)
+                view_cache.invalidate(
+                    'index', 'vlogs', *{f'destination:{vlog.destination_id}' for vlog in drifted}
+                )
+
+            checked += len(batch)
+            fixed += len(drifted)
+
+        if fixed:
+            invalidate_vlog_totals()
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} vlogs, fixed {fixed} like counters."))
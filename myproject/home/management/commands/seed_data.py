@@ -0,0 +1,114 @@
+import multiprocessing
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from home import cache as view_cache
+from home.models import Destination, FoodItem, TravelVlog, Trip, TripDay, Review, VlogLike
+from home.seeding import Seeder, IdRange, max_pk
+from home.stats import invalidate_vlog_totals
+
+# Rows handed to one worker task; each chunk has its own random generator
+CHUNK_SIZE = 5000
+
+_seeder = None
+
+
+def _init_worker(seeder):
+    global _seeder
+    _seeder = seeder
+
+
+def _run_chunk(task):
+    method, chunk, start, stop = task
+    return getattr(_seeder, method)(chunk, start, stop)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, destinations, food items, vlogs, trips with itineraries "
+        "and reviews for load and scale testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--destinations', type=int, default=500)
+        parser.add_argument('--vlogs', type=int, default=20000)
+        parser.add_argument('--trips', type=int, default=5000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed; the same seed generates the same rows")
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help="Zipf exponent of destination and user popularity")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows per bulk_create")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Worker processes. On SQLite only generation runs in parallel; commits take turns")
+        parser.add_argument('--prefix', default='Seed',
+                            help="Prefix of generated destination names and usernames")
+        parser.add_argument('--password', default=None,
+                            help="Password for the generated users; unusable if omitted")
+        parser.add_argument('--skip-reconcile', action='store_true',
+                            help="Do not recompute rating and profile aggregates afterwards")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be positive.")
+        self.options = options
+        seeder = Seeder(
+            seed=options['seed'], prefix=options['prefix'], zipf_s=options['zipf'],
+            batch_size=options['batch_size'], password=options['password'],
+        )
+
+        seeder.users = self.phase(seeder, User, 'users_chunk', options['users'])
+        seeder.destinations = self.phase(seeder, Destination, 'destinations_chunk', options['destinations'])
+        if seeder.users is None or seeder.destinations is None:
+            raise CommandError("Seeding needs at least one user and one destination.")
+        self.phase(seeder, FoodItem, 'food_items_chunk', len(seeder.destinations))
+        likes_before = max_pk(VlogLike)
+        self.phase(seeder, TravelVlog, 'vlogs_chunk', options['vlogs'])
+        self.stdout.write(f"  vloglike: {VlogLike.objects.filter(pk__gt=likes_before).count()} rows")
+        days_before = max_pk(TripDay)
+        self.phase(seeder, Trip, 'trips_chunk', options['trips'])
+        self.stdout.write(f"  tripday: {TripDay.objects.filter(pk__gt=days_before).count()} rows")
+        self.phase(seeder, Review, 'reviews_chunk', options['reviews'])
+
+        # bulk_create skips the model signals that keep aggregates and caches current
+        if not options['skip_reconcile']:
+            call_command('reconcile_destination_ratings', stdout=self.stdout)
+            call_command('reconcile_profile_stats', stdout=self.stdout)
+        invalidate_vlog_totals()
+        view_cache.invalidate('index', 'destinations', 'vlogs')
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded synthetic data with seed {options['seed']}."))
+
+    def phase(self, seeder, model, method, total):
+        """Run one phase in chunks and return the id range it inserted"""
+        previous_max = max_pk(model)
+        tasks = [
+            (method, chunk, start, min(start + CHUNK_SIZE, total))
+            for chunk, start in enumerate(range(0, total, CHUNK_SIZE))
+        ]
+        started = time.perf_counter()
+        if self.options['workers'] == 1 or len(tasks) == 1:
+            _init_worker(seeder)
+            for task in tasks:
+                _run_chunk(task)
+        else:
+            # Forked workers must open their own connections, never share the parent's
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(self.options['workers'], initializer=_init_worker, initargs=(seeder,)) as pool:
+                for _ in pool.imap_unordered(_run_chunk, tasks):
+                    pass
+        elapsed = time.perf_counter() - started
+
+        inserted = IdRange.after(model, previous_max)
+        count = len(inserted) if inserted else 0
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f"  {model._meta.model_name}: {count} rows in {elapsed:.1f}s ({rate:,.0f}/s)")
+        return inserted
+
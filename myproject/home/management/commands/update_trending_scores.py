@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.trending import BATCH_SIZE, update_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Decay and recompute the trending score of every vlog behind sort=trending; "
+        "run it every few minutes from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Number of vlogs to rescore per transaction")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        started = time.perf_counter()
+        scored = update_scores(options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} vlogs in {elapsed:.2f}s."))
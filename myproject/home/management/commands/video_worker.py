@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from home.video import WorkerPool, binary
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued vlog videos: duration, poster, thumbnail sprite and lower-bitrate "
+        "renditions, using ffmpeg from the PATH"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help="Jobs processed at the same time")
+        parser.add_argument('--poll', type=float, default=5.0, help="Seconds between polls of an empty queue")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1:
+            raise CommandError("--threads must be positive.")
+        if not binary('ffmpeg') or not binary('ffprobe'):
+            self.stderr.write("ffmpeg and ffprobe were not found; queued jobs will be marked skipped.")
+        pool = WorkerPool(threads=options['threads'], poll_interval=options['poll'], burst=options['burst'])
+        processed = pool.run()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} video jobs."))
@@ -0,0 +1,149 @@
+"""Serving uploaded media with byte ranges.
+
+``media_response`` answers ``Range: bytes=...`` requests with ``206 Partial
+Content``, so a video player can seek without downloading the file from the
+start. Responses carry an ``ETag`` built from the file size and modification
+time and a ``Last-Modified`` date, and conditional requests
+(``If-None-Match``, ``If-Modified-Since``, ``If-Range``) are answered from
+``os.stat`` alone without opening the file.
+
+Bodies are ``FileResponse`` objects over a ``FileRange``: the file is
+positioned at the start of the range and exposes ``fileno()``, so WSGI
+servers with a ``wsgi.file_wrapper`` that uses ``sendfile`` (gunicorn, for
+example) copy the range from the page cache to the socket without passing it
+through Python. Other servers read it in ``STREAM_BLOCK_SIZE`` blocks.
+
+Partial files of chunked uploads (see ``home.uploads``) are never served.
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from .uploads import upload_dir
+
+STREAM_BLOCK_SIZE = 256 * 1024
+DEFAULT_MAX_AGE = 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of an open file, from its current position"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return (start, end) of a single ``bytes=`` range, None to send the whole file.
+
+    Raises ValueError when the range cannot be satisfied. Multiple ranges are
+    answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range only applies if If-Range, when sent, still names this version of the file"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def resolve(path):
+    """The file under MEDIA_ROOT for a media URL path, or Http404"""
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except Exception:
+        raise Http404("Invalid media path")
+    if full_path.is_relative_to(os.path.abspath(upload_dir())) or not full_path.is_file():
+        raise Http404("Media file not found")
+    return full_path
+
+
+def media_response(request, path):
+    """Full, ranged or not-modified response to a GET or HEAD of one media file"""
+    full_path = resolve(path)
+    stat = full_path.stat()
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        size = stat.st_size
+        byte_range = None
+        if _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        if request.method == 'HEAD':
+            response = HttpResponse(status=206 if byte_range else 200)
+        else:
+            file = open(full_path, 'rb')
+            file.seek(start)
+            response = FileResponse(FileRange(file, length), status=206 if byte_range else 200)
+            response.block_size = STREAM_BLOCK_SIZE
+        content_type, encoding = mimetypes.guess_type(full_path.name)
+        if encoding or not content_type:
+            # Compressed files are sent as stored, not decoded by the browser
+            content_type = 'application/octet-stream'
+        response['Content-Type'] = content_type
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE))
+    return response
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_alter_destination_languages'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VlogLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vlog_likes', to=settings.AUTH_USER_MODEL)),
+                ('vlog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vlog_likes', to='home.travelvlog')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='liked_by',
+            field=models.ManyToManyField(blank=True, related_name='liked_vlogs', through='home.VlogLike', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='vloglike',
+            constraint=models.UniqueConstraint(fields=('user', 'vlog'), name='unique_vlog_like'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+import sqlite3
+
+from django.db import migrations
+
+# The SQL as of this migration, so later changes to home/search.py cannot rewrite history
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS home_destination_fts USING fts5(name, tagline, description, content='home_destination', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS home_destination_fts_ai AFTER INSERT ON home_destination BEGIN '
+    'INSERT INTO home_destination_fts(rowid, name, tagline, description) VALUES (new.id, new.name, new.tagline, new.description); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_destination_fts_ad AFTER DELETE ON home_destination BEGIN '
+    "INSERT INTO home_destination_fts(home_destination_fts, rowid, name, tagline, description) VALUES ('delete', old.id, old.name, old.tagline, old.description); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_destination_fts_au AFTER UPDATE OF name, tagline, description ON home_destination BEGIN '
+    "INSERT INTO home_destination_fts(home_destination_fts, rowid, name, tagline, description) VALUES ('delete', old.id, old.name, old.tagline, old.description); "
+    'INSERT INTO home_destination_fts(rowid, name, tagline, description) VALUES (new.id, new.name, new.tagline, new.description); '
+    'END',
+    "INSERT INTO home_destination_fts(home_destination_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS home_travelvlog_fts USING fts5(title, description, tags, content='home_travelvlog', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS home_travelvlog_fts_ai AFTER INSERT ON home_travelvlog BEGIN '
+    'INSERT INTO home_travelvlog_fts(rowid, title, description, tags) VALUES (new.id, new.title, new.description, new.tags); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_travelvlog_fts_ad AFTER DELETE ON home_travelvlog BEGIN '
+    "INSERT INTO home_travelvlog_fts(home_travelvlog_fts, rowid, title, description, tags) VALUES ('delete', old.id, old.title, old.description, old.tags); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_travelvlog_fts_au AFTER UPDATE OF title, description, tags ON home_travelvlog BEGIN '
+    "INSERT INTO home_travelvlog_fts(home_travelvlog_fts, rowid, title, description, tags) VALUES ('delete', old.id, old.title, old.description, old.tags); "
+    'INSERT INTO home_travelvlog_fts(rowid, title, description, tags) VALUES (new.id, new.title, new.description, new.tags); '
+    'END',
+    "INSERT INTO home_travelvlog_fts(home_travelvlog_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS home_review_fts USING fts5(title, content, content='home_review', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS home_review_fts_ai AFTER INSERT ON home_review BEGIN '
+    'INSERT INTO home_review_fts(rowid, title, content) VALUES (new.id, new.title, new.content); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_review_fts_ad AFTER DELETE ON home_review BEGIN '
+    "INSERT INTO home_review_fts(home_review_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS home_review_fts_au AFTER UPDATE OF title, content ON home_review BEGIN '
+    "INSERT INTO home_review_fts(home_review_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    'INSERT INTO home_review_fts(rowid, title, content) VALUES (new.id, new.title, new.content); '
+    'END',
+    "INSERT INTO home_review_fts(home_review_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS home_destination_fts_ai',
+    'DROP TRIGGER IF EXISTS home_destination_fts_ad',
+    'DROP TRIGGER IF EXISTS home_destination_fts_au',
+    'DROP TABLE IF EXISTS home_destination_fts',
+    'DROP TRIGGER IF EXISTS home_travelvlog_fts_ai',
+    'DROP TRIGGER IF EXISTS home_travelvlog_fts_ad',
+    'DROP TRIGGER IF EXISTS home_travelvlog_fts_au',
+    'DROP TABLE IF EXISTS home_travelvlog_fts',
+    'DROP TRIGGER IF EXISTS home_review_fts_ai',
+    'DROP TRIGGER IF EXISTS home_review_fts_ad',
+    'DROP TRIGGER IF EXISTS home_review_fts_au',
+    'DROP TABLE IF EXISTS home_review_fts',
+]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def run(schema_editor, statements):
+    if fts5_available(schema_editor.connection):
+        with schema_editor.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    run(schema_editor, DROP_SQL + CREATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    run(schema_editor, DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_vloglike'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:54
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Destination = apps.get_model('home', 'Destination')
+    Review = apps.get_model('home', 'Review')
+    totals = Review.objects.values('destination_id').annotate(count=Count('id'), total=Sum('rating'))
+    for row in totals:
+        Destination.objects.filter(pk=row['destination_id']).update(
+            review_count=row['count'],
+            rating_sum=row['total'],
+            average_rating=round(row['total'] / row['count'], 2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destination',
+            name='average_rating',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, max_digits=3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
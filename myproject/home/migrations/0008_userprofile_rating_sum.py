@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_profile_stats(apps, schema_editor):
+    UserProfile = apps.get_model('home', 'UserProfile')
+    Trip = apps.get_model('home', 'Trip')
+    Review = apps.get_model('home', 'Review')
+    for user_profile in UserProfile.objects.all():
+        reviews = Review.objects.filter(user_id=user_profile.user_id).aggregate(count=Count('id'), total=Sum('rating'))
+        user_profile.trips_taken = Trip.objects.filter(user_id=user_profile.user_id, status='completed').count()
+        user_profile.total_reviews = reviews['count']
+        user_profile.rating_sum = reviews['total'] or 0
+        user_profile.average_rating = (
+            round(user_profile.rating_sum / user_profile.total_reviews, 2) if user_profile.total_reviews else 0
+        )
+        user_profile.save(update_fields=['trips_taken', 'total_reviews', 'rating_sum', 'average_rating'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_destination_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_profile_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_userprofile_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['budget', 'name'], name='destination_budget_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['-average_rating', '-review_count', 'name'], name='destination_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['destination', 'created_at'], name='review_destination_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['featured', 'upload_date'], name='vlog_featured_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['destination', 'upload_date'], name='vlog_destination_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['upload_date'], name='vlog_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['views'], name='vlog_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['likes'], name='vlog_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['type', 'views', 'likes'], name='vlog_type_totals_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='trip_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['user', 'created_at'], name='trip_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:23
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VlogUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(help_text='Total size in bytes')),
+                ('chunk_size', models.PositiveIntegerField(help_text='Largest chunk accepted, in bytes')),
+                ('received', models.PositiveBigIntegerField(default=0, help_text='Bytes stored so far, in order')),
+                ('sha256', models.CharField(blank=True, help_text='Optional checksum of the whole file', max_length=64)),
+                ('status', models.CharField(choices=[('open', 'Receiving chunks'), ('complete', 'Complete')], default='open', max_length=20)),
+                ('file', models.CharField(blank=True, help_text='Storage name once assembled', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vlog_uploads', to=settings.AUTH_USER_MODEL)),
+                ('vlog', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='home.travelvlog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='vlogupload_status_updated_idx')],
+            },
+        ),
+    ]
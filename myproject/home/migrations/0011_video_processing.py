@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_vlogupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelvlog',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, help_text='Lower-bitrate copies, height -> storage name'),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='sprite',
+            field=models.CharField(blank=True, help_text='Storage name of the thumbnail sprite sheet', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='VideoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='The video file the job was queued for', max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('skipped', 'Skipped, no ffmpeg')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('vlog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_jobs', to='home.travelvlog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status'], name='videojob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0011_video_processing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_likes',
+            field=models.FloatField(default=0, help_text='Likes with older ones decayed'),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_seen_likes',
+            field=models.PositiveIntegerField(default=0, help_text='likes at the last update'),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_seen_views',
+            field=models.PositiveIntegerField(default=0, help_text='views at the last update'),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='travelvlog',
+            name='trending_views',
+            field=models.FloatField(default=0, help_text='Views with older ones decayed'),
+        ),
+        migrations.AddIndex(
+            model_name='travelvlog',
+            index=models.Index(fields=['trending_score'], name='vlog_trending_idx'),
+        ),
+    ]
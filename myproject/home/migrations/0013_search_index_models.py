@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:00
+
+import django.db.models.deletion
+import home.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0012_vlog_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DestinationSearch',
+            fields=[
+                ('destination', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='home.destination')),
+                ('document', home.search.SearchDocumentField(db_column='home_destination_fts')),
+            ],
+            options={
+                'db_table': 'home_destination_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewSearch',
+            fields=[
+                ('review', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='home.review')),
+                ('document', home.search.SearchDocumentField(db_column='home_review_fts')),
+            ],
+            options={
+                'db_table': 'home_review_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='VlogSearch',
+            fields=[
+                ('vlog', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='home.travelvlog')),
+                ('document', home.search.SearchDocumentField(db_column='home_travelvlog_fts')),
+            ],
+            options={
+                'db_table': 'home_travelvlog_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,8 +1,17 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Case, When, Value, Count, Sum
+from django.db.models.functions import Cast, Greatest, Round
 import re
+import uuid
+from decimal import Decimal
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from . import cache as view_cache
+from .search import SearchDocumentField
+
 
 class Destination(models.Model):
     """Model for travel destinations"""
@@ -59,11 +68,23 @@ class Destination(models.Model):
     transport_cost = models.DecimalField(max_digits=8, decimal_places=2, help_text="Average transport cost")
     activities_cost = models.DecimalField(max_digits=8, decimal_places=2, help_text="Average activities cost")
 
+    # Rating aggregates, maintained from Review hooks
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00, db_index=True,
+                                         validators=[MinValueValidator(0), MaxValueValidator(5)])
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Budget filter on the destination list, already in name order
+            models.Index(fields=['budget', 'name'], name='destination_budget_name_idx'),
+            # sort=rating
+            models.Index(fields=['-average_rating', '-review_count', 'name'], name='destination_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -72,6 +93,27 @@ class Destination(models.Model):
         """Calculate total daily cost"""
         return self.stay_cost + self.food_cost + self.transport_cost + self.activities_cost
 
+    @classmethod
+    def adjust_rating(cls, destination_id, count_delta, rating_delta):
+        """Apply a review count/rating change and refresh the average, atomically"""
+        with transaction.atomic():
+            cls.objects.filter(pk=destination_id).update(
+                review_count=Greatest(F('review_count') + count_delta, 0),
+                rating_sum=Greatest(F('rating_sum') + rating_delta, 0),
+            )
+            cls.objects.filter(pk=destination_id).update(average_rating=cls.average_rating_expression())
+        # update() sends no signals; drop the cached pages that show the rating
+        view_cache.invalidate('index', 'destinations', f'destination:{destination_id}')
+
+    @staticmethod
+    def average_rating_expression():
+        """SQL expression computing average_rating from review_count and rating_sum"""
+        return Case(
+            When(review_count__gt=0, then=Round(Cast(F('rating_sum'), models.FloatField()) / F('review_count'), 2)),
+            default=Value(0.0),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        )
+
 
 class FoodItem(models.Model):
     """Model for food items at destinations"""
@@ -107,22 +149,109 @@ class TravelVlog(models.Model):
     video_url = models.URLField(blank=True, null=True, help_text="YouTube or Vimeo URL")
     video_file = models.FileField(upload_to='vlogs/', blank=True, null=True, help_text="Upload video file")
     duration = models.CharField(max_length=10, blank=True, null=True, help_text="e.g., 12:34")
+    # Filled in by the video worker (see home/video.py)
+    sprite = models.CharField(max_length=255, blank=True, help_text="Storage name of the thumbnail sprite sheet")
+    renditions = models.JSONField(default=dict, blank=True, help_text="Lower-bitrate copies, height -> storage name")
 
     # Stats
     views = models.PositiveIntegerField(default=0)
     likes = models.PositiveIntegerField(default=0)
     upload_date = models.DateField(auto_now_add=True)
+    # Time-decayed ranking, refreshed by manage.py update_trending_scores (see home/trending.py)
+    trending_score = models.FloatField(default=0)
+    trending_views = models.FloatField(default=0, help_text="Views with older ones decayed")
+    trending_likes = models.FloatField(default=0, help_text="Likes with older ones decayed")
+    trending_seen_views = models.PositiveIntegerField(default=0, help_text="views at the last update")
+    trending_seen_likes = models.PositiveIntegerField(default=0, help_text="likes at the last update")
+    trending_updated_at = models.DateTimeField(blank=True, null=True)
 
     # Metadata
     tags = models.JSONField(default=list, help_text="List of tags")
     featured = models.BooleanField(default=False)
 
+    liked_by = models.ManyToManyField(User, through='VlogLike', related_name='liked_vlogs', blank=True)
+
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            # Featured vlogs on the home page
+            models.Index(fields=['featured', 'upload_date'], name='vlog_featured_upload_idx'),
+            # A destination's vlogs, newest first
+            models.Index(fields=['destination', 'upload_date'], name='vlog_destination_upload_idx'),
+            # Vlog list orderings. Ascending indexes end in the rowid, so a backward
+            # scan yields (-field, -id) and a forward one (field, id) without a sort step
+            models.Index(fields=['upload_date'], name='vlog_upload_idx'),
+            models.Index(fields=['views'], name='vlog_views_idx'),
+            models.Index(fields=['likes'], name='vlog_likes_idx'),
+            models.Index(fields=['trending_score'], name='vlog_trending_idx'),
+            # Covers the count/views/likes totals, overall and per type
+            models.Index(fields=['type', 'views', 'likes'], name='vlog_type_totals_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def like(self, user):
+        """Like the vlog as ``user``; liking twice is a no-op. Returns True if a like was added"""
+        try:
+            with transaction.atomic():
+                VlogLike.objects.create(user=user, vlog=self)
+                TravelVlog.objects.filter(pk=self.pk).update(likes=F('likes') + 1)
+        except IntegrityError:
+            added = False
+        else:
+            added = True
+            self._likes_changed()
+        self.refresh_from_db(fields=['likes'])
+        return added
+
+    def unlike(self, user):
+        """Remove ``user``'s like; unliking twice is a no-op. Returns True if a like was removed"""
+        with transaction.atomic():
+            deleted, _ = VlogLike.objects.filter(user=user, vlog=self).delete()
+            if deleted:
+                TravelVlog.objects.filter(pk=self.pk, likes__gt=0).update(likes=F('likes') - 1)
+        if deleted:
+            self._likes_changed()
+        self.refresh_from_db(fields=['likes'])
+        return bool(deleted)
+
+    def _likes_changed(self):
+        # The counter moved with update(), which sends no signals; same pages as vlog_changed_pages
+        view_cache.invalidate('index', 'vlogs', f'destination:{self.destination_id}')
+
+    def toggle_like(self, user):
+        """Flip ``user``'s like on the vlog. Returns True if the vlog is now liked"""
+        if self.unlike(user):
+            return False
+        self.like(user)
+        return True
+
+    # Async versions for async views. The like count and the like row change in one
+    # transaction, which the async ORM cannot open, so they run in a worker thread.
+
+    async def alike(self, user):
+        return await sync_to_async(self.like)(user)
+
+    async def aunlike(self, user):
+        return await sync_to_async(self.unlike)(user)
+
+    async def atoggle_like(self, user):
+        if await self.aunlike(user):
+            return False
+        await self.alike(user)
+        return True
+
+    def get_video_sources(self):
+        """(url, height) pairs for the player: renditions, highest first, then the original"""
+        sources = [
+            (default_storage.url(name), int(height))
+            for height, name in sorted(self.renditions.items(), key=lambda item: -int(item[0]))
+        ]
+        if self.video_file:
+            sources.append((self.video_file.url, None))
+        return sources
+
     def get_embed_url(self):
         """Convert YouTube URL to embed URL"""
         if not self.video_url:
@@ -136,6 +265,83 @@ class TravelVlog(models.Model):
         return self.video_url
 
 
+class VlogLike(models.Model):
+    """A single user's like on a vlog"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vlog_likes')
+    vlog = models.ForeignKey(TravelVlog, on_delete=models.CASCADE, related_name='vlog_likes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'vlog'], name='unique_vlog_like'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} likes {self.vlog.title}"
+
+
+class VlogUpload(models.Model):
+    """A chunked, resumable upload of a vlog video (see home/uploads.py)"""
+    STATUS_CHOICES = [
+        ('open', 'Receiving chunks'),
+        ('complete', 'Complete'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vlog_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Total size in bytes")
+    chunk_size = models.PositiveIntegerField(help_text="Largest chunk accepted, in bytes")
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes stored so far, in order")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Optional checksum of the whole file")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    file = models.CharField(max_length=255, blank=True, help_text="Storage name once assembled")
+    vlog = models.ForeignKey(TravelVlog, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Stale session cleanup
+            models.Index(fields=['status', 'updated_at'], name='vlogupload_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
+class VideoJob(models.Model):
+    """A queued processing run over a vlog's video file (see home/video.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped, no ffmpeg'),
+    ]
+
+    vlog = models.ForeignKey(TravelVlog, on_delete=models.CASCADE, related_name='video_jobs')
+    source = models.CharField(max_length=255, help_text="The video file the job was queued for")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job; ascending indexes end in the rowid
+            models.Index(fields=['status'], name='videojob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
+
+
 class UserProfile(models.Model):
     """Extended user profile for travel preferences"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -153,9 +359,10 @@ class UserProfile(models.Model):
     travel_types = models.JSONField(default=list, help_text="Preferred travel types")
     favorite_destinations = models.ManyToManyField(Destination, blank=True)
 
-    # Stats
+    # Stats, maintained from Trip and Review hooks
     trips_taken = models.PositiveIntegerField(default=0)
     total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00,
                                        validators=[MinValueValidator(0), MaxValueValidator(5)])
 
@@ -164,6 +371,37 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    @classmethod
+    def adjust_stats(cls, user_id, trips_delta=0, reviews_delta=0, rating_delta=0):
+        """Apply trip/review count changes to a user's profile and refresh the average, atomically"""
+        with transaction.atomic():
+            cls.objects.filter(user_id=user_id).update(
+                trips_taken=Greatest(F('trips_taken') + trips_delta, 0),
+                total_reviews=Greatest(F('total_reviews') + reviews_delta, 0),
+                rating_sum=Greatest(F('rating_sum') + rating_delta, 0),
+            )
+            if reviews_delta or rating_delta:
+                cls.objects.filter(user_id=user_id).update(average_rating=cls.average_rating_expression())
+
+    @staticmethod
+    def average_rating_expression():
+        """SQL expression computing average_rating from total_reviews and rating_sum"""
+        return Case(
+            When(total_reviews__gt=0, then=Round(Cast(F('rating_sum'), models.FloatField()) / F('total_reviews'), 2)),
+            default=Value(0.0),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        )
+
+    def compute_stats(self):
+        """Recompute the stats from the user's trips and reviews (without saving)"""
+        reviews = Review.objects.filter(user_id=self.user_id).aggregate(count=Count('id'), total=Sum('rating'))
+        self.trips_taken = Trip.objects.filter(user_id=self.user_id, status='completed').count()
+        self.total_reviews = reviews['count']
+        self.rating_sum = reviews['total'] or 0
+        self.average_rating = (
+            round(Decimal(self.rating_sum) / self.total_reviews, 2) if self.total_reviews else Decimal('0.00')
+        )
+
 
 class Trip(models.Model):
     """Model for planned trips"""
@@ -203,6 +441,12 @@ class Trip(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Planned / completed trips on the trip planner
+            models.Index(fields=['user', 'status', 'created_at'], name='trip_user_status_created_idx'),
+            # My trips and the profile page
+            models.Index(fields=['user', 'created_at'], name='trip_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -212,7 +456,13 @@ class Trip(models.Model):
         if self.start_date and self.end_date:
             self.duration_days = (self.end_date - self.start_date).days + 1
             self.total_budget = self.daily_budget * self.duration_days
-        super().save(*args, **kwargs)
+        # Keep the profile stats hooks in the same transaction as the write
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
 
 
 class TripDay(models.Model):
@@ -262,10 +512,61 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'destination']  # One review per user per destination
+        indexes = [
+            # Reviews on a destination page, newest first
+            models.Index(fields=['destination', 'created_at'], name='review_destination_created_idx'),
+            # Recent reviews on the home page
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s review of {self.destination.name}"
 
+    def save(self, *args, **kwargs):
+        # Keep the rating aggregate and profile stats hooks in the same transaction as the write
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+# FTS5 index tables (see home/search.py). Created and kept in sync by SQL, never
+# written through the ORM; mapped only so searches can join and rank them.
+
+class DestinationSearch(models.Model):
+    destination = models.OneToOneField(
+        Destination, models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='home_destination_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'home_destination_fts'
+
+
+class VlogSearch(models.Model):
+    vlog = models.OneToOneField(
+        TravelVlog, models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='home_travelvlog_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'home_travelvlog_fts'
+
+
+class ReviewSearch(models.Model):
+    review = models.OneToOneField(
+        Review, models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='home_review_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'home_review_fts'
+
 
 class ContactMessage(models.Model):
     """Model for contact form messages"""
@@ -0,0 +1,199 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by an opaque cursor holding the sort key of the last (or
+first) row of the previous page instead of an OFFSET, so every page costs the
+same index range scan however deep the reader scrolls, and no ``COUNT(*)`` is
+needed to render it. The ordering must end in a unique column (``id``) so
+rows with equal sort values are never skipped or repeated, and ordering
+fields must not be nullable.
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+
+CURSOR_PARAM = 'cursor'
+APPROXIMATE_COUNT_LIMIT = 1000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _encode_value(value):
+    # Full precision on purpose: DjangoJSONEncoder drops microseconds, which
+    # would make keyset comparisons skip or repeat rows
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+class CursorPage:
+    def __init__(self, paginator, object_list, next_values, previous_values):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.next_cursor = paginator.encode_cursor(next_values, 'n') if next_values else None
+        self.previous_cursor = paginator.encode_cursor(previous_values, 'p') if previous_values else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginate ``queryset`` by ``ordering``, e.g. ``['-views', '-id']``"""
+
+    def __init__(self, queryset, ordering, per_page, approximate_count=False):
+        self.queryset = queryset
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.per_page = int(per_page)
+        self.approximate_count = approximate_count
+        self._count = None
+
+    # Cursors
+
+    def _field(self, name):
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, values, direction):
+        payload = json.dumps({'v': values, 'd': direction}, default=_encode_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values, direction = payload['v'], payload['d']
+            if direction not in ('n', 'p') or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            return [
+                self._field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ], direction
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _values_of(self, obj):
+        return [getattr(obj, self._field(name).attname) for name, _ in self.ordering]
+
+    # Queries
+
+    def _order_by(self, reverse):
+        return [
+            f"{'-' if descending != reverse else ''}{name}"
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for (previous_name, _), previous_value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{previous_name: previous_value})
+            condition |= term
+        return condition
+
+    def page(self, cursor=None):
+        if not cursor:
+            values, direction = None, 'n'
+        else:
+            values, direction = self.decode_cursor(cursor)
+        reverse = direction == 'p'
+
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            self,
+            rows,
+            self._values_of(rows[-1]) if rows and has_next else None,
+            self._values_of(rows[0]) if rows and has_previous else None,
+        )
+
+    # Counting
+
+    @property
+    def count(self):
+        """Number of rows; capped at APPROXIMATE_COUNT_LIMIT in approximate mode"""
+        if self._count is None:
+            if self.approximate_count:
+                self._count = self.queryset.order_by()[:APPROXIMATE_COUNT_LIMIT + 1].count()
+            else:
+                self._count = self.queryset.order_by().count()
+        return self._count
+
+    @property
+    def count_is_exact(self):
+        return not self.approximate_count or self.count <= APPROXIMATE_COUNT_LIMIT
+
+
+class CursorPaginationMixin:
+    """Swap a ListView's OFFSET paginator for CursorPaginator.
+
+    Views set ``cursor_ordering`` or override ``get_cursor_ordering``. With
+    ``json_feed=True`` (``as_view(json_feed=True)``) the view answers with a
+    JSON page for infinite scroll instead of rendering its template.
+    """
+    cursor_ordering = None
+    approximate_count = False
+    json_feed = False
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, self.get_cursor_ordering(), page_size, approximate_count=self.approximate_count
+        )
+        try:
+            page = paginator.page(self.request.GET.get(CURSOR_PARAM))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def serialize_object(self, obj):
+        return {'id': obj.pk}
+
+    def render_to_response(self, context, **response_kwargs):
+        if not self.json_feed:
+            return super().render_to_response(context, **response_kwargs)
+        page = context['page_obj']
+        data = {
+            'success': True,
+            'results': [self.serialize_object(obj) for obj in page.object_list],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+        # Counting is opt-in so scrolling never pays for it
+        if self.request.GET.get('count'):
+            data['count'] = page.paginator.count
+            data['count_is_exact'] = page.paginator.count_is_exact
+        return JsonResponse(data)
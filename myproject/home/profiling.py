@@ -0,0 +1,344 @@
+"""Opt-in request profiling.
+
+``ProfilingMiddleware`` times every request and breaks it down into database
+time (with a query count and duplicate detection), template rendering time
+and the rest. The breakdown is sent back in a ``Server-Timing`` header, which
+browser dev tools display, and folded into rolling per-route histograms over
+the last ``PROFILING_WINDOW`` requests of each route. The middleware is
+sync and async capable, so async views keep running on the event loop.
+
+A sample of requests (``PROFILING_SAMPLE_RATE``), and any staff request with
+``?_profile=1``, also runs under cProfile; the formatted stats are kept in a
+bounded ring of captures. Both the histograms and the captures are served to
+staff from ``api/profiling/``.
+
+With ``PROFILING_ENABLED = False`` the middleware removes itself from the
+chain at startup and the template hook is never installed, so there is no
+per-request cost at all.
+"""
+import contextvars
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_MAX_CAPTURES = 50
+DEFAULT_WINDOW = 1000
+PROFILE_PARAM = '_profile'
+CAPTURE_STATS_LINES = 60
+
+# Upper bounds, in milliseconds, of the histogram buckets
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class RequestRecord:
+    """What one request spent, filled in while it runs"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.seen = {}
+
+    def query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            key = (sql, repr(params))
+            self.seen[key] = self.seen.get(key, 0) + 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier one with the same SQL and params"""
+        return sum(count - 1 for count in self.seen.values())
+
+    def repeated_sql(self, limit=3):
+        """The most repeated SQL shapes, whatever their params, N+1 style"""
+        shapes = {}
+        for (sql, _), count in self.seen.items():
+            shapes[sql] = shapes.get(sql, 0) + count
+        return sorted(
+            ((count, sql) for sql, count in shapes.items() if count > 1), reverse=True
+        )[:limit]
+
+
+_current_record = contextvars.ContextVar('profiling_record', default=None)
+_capture_lock = threading.Lock()
+
+
+class RouteStats:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+        self.repeated_sql = []
+
+    def add(self, wall_ms, db_ms, template_ms, queries, duplicates, repeated_sql):
+        self.samples.append((wall_ms, db_ms, template_ms, queries, duplicates))
+        self.total += 1
+        if repeated_sql:
+            self.repeated_sql = repeated_sql
+
+    def summary(self):
+        walls = sorted(sample[0] for sample in self.samples)
+        count = len(self.samples)
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        for wall in walls:
+            for i, bound in enumerate(BUCKETS_MS):
+                if wall <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[-1] += 1
+        return {
+            'requests': self.total,
+            'window': count,
+            'wall_ms': {
+                'mean': sum(walls) / count if count else 0.0,
+                'p50': _percentile(walls, 0.5),
+                'p90': _percentile(walls, 0.9),
+                'p99': _percentile(walls, 0.99),
+                'max': walls[-1] if walls else 0.0,
+            },
+            'db_ms_mean': sum(sample[1] for sample in self.samples) / count if count else 0.0,
+            'template_ms_mean': sum(sample[2] for sample in self.samples) / count if count else 0.0,
+            'queries_mean': sum(sample[3] for sample in self.samples) / count if count else 0.0,
+            'duplicates_mean': sum(sample[4] for sample in self.samples) / count if count else 0.0,
+            'histogram': {
+                **{f'le_{bound}ms': n for bound, n in zip(BUCKETS_MS, histogram)},
+                'slower': histogram[-1],
+            },
+            'repeated_sql': [{'count': n, 'sql': sql[:300]} for n, sql in self.repeated_sql],
+        }
+
+
+class Profiler:
+    """Per-route stats and sampled cProfile captures for this process"""
+
+    def __init__(self):
+        self._routes = {}
+        self._captures = OrderedDict()
+        self._next_capture = 1
+        self._lock = threading.Lock()
+
+    def record(self, route, record, wall_ms):
+        window = getattr(settings, 'PROFILING_WINDOW', DEFAULT_WINDOW)
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats(window)
+            stats.add(
+                wall_ms, record.db_time * 1000, record.template_time * 1000,
+                record.queries, record.duplicates, record.repeated_sql(),
+            )
+
+    def add_capture(self, route, path, wall_ms, text):
+        limit = getattr(settings, 'PROFILING_MAX_CAPTURES', DEFAULT_MAX_CAPTURES)
+        with self._lock:
+            capture_id = self._next_capture
+            self._next_capture += 1
+            self._captures[capture_id] = {
+                'id': capture_id,
+                'route': route,
+                'path': path,
+                'wall_ms': wall_ms,
+                'captured_at': time.time(),
+                'stats': text,
+            }
+            while len(self._captures) > limit:
+                self._captures.popitem(last=False)
+        return capture_id
+
+    def get_capture(self, capture_id):
+        with self._lock:
+            return self._captures.get(capture_id)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'routes': {route: stats.summary() for route, stats in sorted(self._routes.items())},
+                'captures': [
+                    {key: value for key, value in capture.items() if key != 'stats'}
+                    for capture in reversed(self._captures.values())
+                ],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._captures.clear()
+
+
+profiler = Profiler()
+
+
+# Template rendering hook
+
+_template_hook_lock = threading.Lock()
+_template_hook_installed = False
+
+
+def install_template_hook():
+    """Time Template.render of the Django backend; installed once, only when enabled"""
+    global _template_hook_installed
+    from django.template.backends.django import Template
+
+    with _template_hook_lock:
+        if _template_hook_installed:
+            return
+        original = Template.render
+
+        def timed_render(self, context=None, request=None):
+            record = _current_record.get()
+            if record is None:
+                return original(self, context, request)
+            started, db_before = time.perf_counter(), record.db_time
+            try:
+                return original(self, context, request)
+            finally:
+                # Queries run by lazy querysets in the template count as DB time only
+                record.template_time += time.perf_counter() - started - (record.db_time - db_before)
+
+        Template.render = timed_render
+        _template_hook_installed = True
+
+
+def _route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def _needs_render(response):
+    return hasattr(response, 'render') and callable(response.render) and not response.is_rendered
+
+
+def _format_stats(profile):
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(CAPTURE_STATS_LINES)
+    return out.getvalue()
+
+
+def _record_query(execute, sql, params, many, context):
+    record = _current_record.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record.query(execute, sql, params, many, context)
+
+
+def install_query_wrapper():
+    """Report the queries of this thread's connections to the request being recorded"""
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_record_query)
+
+
+class ProfilingMiddleware:
+    """See the module docstring; place it after AuthenticationMiddleware
+
+    Runs natively under WSGI and ASGI. Queries are attributed through the
+    request's context, which Django carries into the thread that runs the ORM
+    for async requests; the wrapper is installed from that thread. On the async
+    path a cProfile capture only sees the event loop thread, so a sync view
+    shows up as the time spent awaiting it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_template_hook()
+
+    def should_capture(self, forced):
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start_capture(self, forced):
+        """``forced`` by a staff ``?_profile=1``"""
+        # One capture at a time: newer Pythons allow a single active profiler
+        if self.should_capture(forced) and _capture_lock.acquire(blocking=False):
+            return cProfile.Profile()
+        return None
+
+    @contextmanager
+    def measure(self, record, profile):
+        token = _current_record.set(record)
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                _capture_lock.release()
+            _current_record.reset(token)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_query_wrapper()
+        record = RequestRecord()
+        profile = self.start_capture(bool(request.GET.get(PROFILE_PARAM)) and request.user.is_staff)
+        started = time.perf_counter()
+        with self.measure(record, profile):
+            response = self.get_response(request)
+            # Lazy responses render on the way out; count that as template time
+            if _needs_render(response):
+                response.render()
+        return self.finish(request, response, record, profile, started)
+
+    async def __acall__(self, request):
+        await sync_to_async(install_query_wrapper)()
+        record = RequestRecord()
+        # Only look the user up when asked to; auser() may query the session
+        forced = bool(request.GET.get(PROFILE_PARAM)) and (await request.auser()).is_staff
+        profile = self.start_capture(forced)
+        started = time.perf_counter()
+        with self.measure(record, profile):
+            response = await self.get_response(request)
+            if _needs_render(response):
+                await sync_to_async(response.render)()
+        return self.finish(request, response, record, profile, started)
+
+    def finish(self, request, response, record, profile, started):
+        """Record the request and add its ``Server-Timing`` header"""
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        route = _route_name(request)
+        profiler.record(route, record, wall_ms)
+        if profile is not None:
+            capture_id = profiler.add_capture(route, request.get_full_path(), wall_ms, _format_stats(profile))
+            response['X-Profile-Capture'] = str(capture_id)
+
+        db_ms = record.db_time * 1000
+        template_ms = record.template_time * 1000
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={wall_ms:.1f}',
+            f'db;dur={db_ms:.1f};desc="{record.queries} queries, {record.duplicates} duplicates"',
+            f'tpl;dur={template_ms:.1f}',
+            f'app;dur={max(wall_ms - db_ms - template_ms, 0):.1f}',
+        ])
+        return response
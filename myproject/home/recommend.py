@@ -0,0 +1,262 @@
+"""Personalized destination recommendations for the home page.
+
+A ``RecommendationModel`` holds what is shared by every user as NumPy
+arrays over the destinations: a row-normalized destination x type matrix,
+each destination's budget level, a smoothed rating score, and an item x item
+co-favorite similarity (cosine over the users who favorited both). Users are
+turned into a type-preference vector (travel types, plus the types of their
+favorites and of destinations they reviewed, weighted by the rating), a
+budget level and a favorites row. Scoring a batch of users is then a few
+matrix products:
+
+    score = w_type * (U @ A.T) + w_budget * budget_fit + w_co_favorite * (F @ C) + w_rating * quality
+
+with destinations the user already favorited or reviewed masked out and
+the top N picked with ``argpartition``. ``precompute_recommendations``
+scores every user this way in batches.
+
+Per-user results are cached under a versioned key. Saving a profile,
+changing favorites or writing a review drops only that user's entry, which
+is recomputed from three small queries on their next visit. Destination
+changes bump the version; the shared arrays are rebuilt after that and at
+least every ``RECOMMENDATION_MODEL_TIMEOUT`` seconds, which is also how new
+ratings and other users' favorites reach everyone. Without NumPy the home
+page keeps its plain destination list.
+"""
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Destination, Review, UserProfile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+VERSION_KEY = 'recommend:version'
+DEFAULT_TIMEOUT = 60 * 10
+DEFAULT_MODEL_TIMEOUT = 60 * 10
+DEFAULT_WEIGHTS = {'type': 0.4, 'budget': 0.25, 'co_favorite': 0.2, 'rating': 0.15}
+CACHED_COUNT = 12
+BATCH_SIZE = 500
+# Reviews a destination needs before its own average outweighs the overall one
+RATING_PRIOR_REVIEWS = 5
+
+BUDGET_LEVELS = {'Low': 0, 'Medium': 1, 'High': 2}
+
+# Profile travel types -> destination types they suggest
+TRAVEL_TYPE_TAGS = {
+    'solo': ('adventure', 'city', 'mountain'),
+    'family': ('family',),
+    'couple': ('honeymoon', 'beach'),
+    'adventure': ('adventure', 'mountain', 'wildlife'),
+    'cultural': ('heritage', 'city'),
+    'luxury': ('honeymoon', 'beach'),
+}
+
+UserSignals = namedtuple('UserSignals', 'user_id budget travel_types favorites ratings')
+
+
+def available():
+    return np is not None
+
+
+def _tags(destination_type):
+    return {tag.strip().lower() for tag in (destination_type or '').split(',') if tag.strip()}
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, so a cleared cache never brings back a version some process still holds
+        cache.add(VERSION_KEY, int(time.time()), timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def user_key(user_id, version=None):
+    return f'recommend:v{version or _version()}:user:{user_id}'
+
+
+def load_signals(user_ids):
+    """Profile preferences, favorites and review ratings of several users, in three queries"""
+    signals = {user_id: UserSignals(user_id, 'Medium', [], set(), {}) for user_id in user_ids}
+    for user_id, budget, travel_types in UserProfile.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'preferred_budget', 'travel_types'):
+        signals[user_id] = signals[user_id]._replace(
+            budget=budget, travel_types=[t for t in travel_types or [] if isinstance(t, str)],
+        )
+    for user_id, destination_id in UserProfile.favorite_destinations.through.objects.filter(
+            userprofile__user_id__in=user_ids).values_list('userprofile__user_id', 'destination_id'):
+        signals[user_id].favorites.add(destination_id)
+    for user_id, destination_id, rating in Review.objects.filter(user_id__in=user_ids).order_by().values_list(
+            'user_id', 'destination_id', 'rating'):
+        signals[user_id].ratings[destination_id] = rating
+    return [signals[user_id] for user_id in user_ids]
+
+
+class RecommendationModel:
+    """Destination-side arrays shared by every user"""
+
+    def __init__(self, destinations, favorite_lists):
+        self.ids = np.array([pk for pk, _, _, _, _ in destinations], dtype=np.int64)
+        self.position = {pk: i for i, pk in enumerate(self.ids.tolist())}
+        tags = [_tags(destination_type) for _, destination_type, _, _, _ in destinations]
+        self.tags = {tag: i for i, tag in enumerate(sorted(set().union(*tags)))}
+        count = len(self.ids)
+
+        self.types = np.zeros((count, len(self.tags)), dtype=np.float32)
+        for row, destination_tags in enumerate(tags):
+            for tag in destination_tags:
+                self.types[row, self.tags[tag]] = 1
+        lengths = np.linalg.norm(self.types, axis=1, keepdims=True)
+        np.divide(self.types, lengths, out=self.types, where=lengths > 0)
+
+        self.budget = np.array([BUDGET_LEVELS.get(budget, 1) for _, _, budget, _, _ in destinations], dtype=np.float32)
+
+        ratings = np.array([float(rating) for _, _, _, rating, _ in destinations], dtype=np.float32)
+        reviews = np.array([reviews for _, _, _, _, reviews in destinations], dtype=np.float32)
+        overall = float((ratings * reviews).sum() / reviews.sum()) if reviews.sum() else 3.0
+        self.quality = (ratings * reviews + overall * RATING_PRIOR_REVIEWS) / (reviews + RATING_PRIOR_REVIEWS) / 5
+
+        self.co_favorite = np.zeros((count, count), dtype=np.float32)
+        for favorites in favorite_lists:
+            rows = [self.position[pk] for pk in favorites if pk in self.position]
+            if len(rows) > 1:
+                self.co_favorite[np.ix_(rows, rows)] += 1
+        # Diagonal: how many users favorited each destination; cosine-normalize by it
+        popularity = np.sqrt(np.maximum(np.diag(self.co_favorite), 1))
+        np.fill_diagonal(self.co_favorite, 0)
+        self.co_favorite /= np.outer(popularity, popularity)
+
+    @classmethod
+    def load(cls):
+        destinations = list(Destination.objects.order_by('pk').values_list(
+            'pk', 'type', 'budget', 'average_rating', 'review_count'))
+        favorites = defaultdict(list)
+        for profile_id, destination_id in UserProfile.favorite_destinations.through.objects.values_list(
+                'userprofile_id', 'destination_id').iterator():
+            favorites[profile_id].append(destination_id)
+        return cls(destinations, favorites.values())
+
+    def user_matrices(self, users):
+        """Type preferences, budget levels, favorites and already-seen masks for a batch of users"""
+        preferences = np.zeros((len(users), len(self.tags)), dtype=np.float32)
+        favorites = np.zeros((len(users), len(self.ids)), dtype=np.float32)
+        seen = np.zeros((len(users), len(self.ids)), dtype=bool)
+        budgets = np.array([BUDGET_LEVELS.get(user.budget, 1) for user in users], dtype=np.float32)
+        for row, user in enumerate(users):
+            for travel_type in user.travel_types:
+                for tag in TRAVEL_TYPE_TAGS.get(travel_type, (travel_type,)):
+                    if tag in self.tags:
+                        preferences[row, self.tags[tag]] += 1
+            for pk in user.favorites:
+                if pk in self.position:
+                    favorites[row, self.position[pk]] = 1
+                    preferences[row] += self.types[self.position[pk]]
+            for pk, rating in user.ratings.items():
+                if pk in self.position:
+                    seen[row, self.position[pk]] = True
+                    # 5 stars pulls towards a destination's types, 1 star pushes away
+                    preferences[row] += self.types[self.position[pk]] * (rating - 3) / 2
+        lengths = np.linalg.norm(preferences, axis=1, keepdims=True)
+        np.divide(preferences, lengths, out=preferences, where=lengths > 0)
+        return preferences, budgets, favorites, seen | (favorites > 0)
+
+    def scores(self, users):
+        """users x destinations scores, in one vectorized pass"""
+        weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'RECOMMENDATION_WEIGHTS', {})}
+        preferences, budgets, favorites, seen = self.user_matrices(users)
+        co_favorite = favorites @ self.co_favorite
+        strongest = co_favorite.max(axis=1, keepdims=True)
+        np.divide(co_favorite, strongest, out=co_favorite, where=strongest > 0)
+        scores = (
+            weights['type'] * (preferences @ self.types.T)
+            + weights['budget'] * (1 - np.abs(budgets[:, None] - self.budget[None, :]) / 2)
+            + weights['co_favorite'] * co_favorite
+            + weights['rating'] * self.quality[None, :]
+        )
+        scores[seen] = -np.inf
+        return scores
+
+    def top(self, users, count):
+        """Best ``count`` destination ids for each user, best first"""
+        if not len(self.ids):
+            return [[] for _ in users]
+        scores = self.scores(users)
+        count = min(count, len(self.ids))
+        best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        return [
+            [int(self.ids[column]) for column in row if np.isfinite(scores[i, column])]
+            for i, row in enumerate(best)
+        ]
+
+
+class Recommender:
+    def __init__(self):
+        self._model = None
+        self._model_version = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def model(self, version):
+        """The shared arrays for ``version``, rebuilt when it moved on or they grew old"""
+        max_age = getattr(settings, 'RECOMMENDATION_MODEL_TIMEOUT', DEFAULT_MODEL_TIMEOUT)
+        if self._model_version != version or time.monotonic() - self._built_at > max_age:
+            with self._lock:
+                if self._model_version != version or time.monotonic() - self._built_at > max_age:
+                    self._model = RecommendationModel.load()
+                    self._model_version = version
+                    self._built_at = time.monotonic()
+        return self._model
+
+    def for_user(self, user_id, count=6):
+        """Recommended destination ids for one user, from the cache or a one-row pass"""
+        if not available():
+            return []
+        version = _version()
+        key = user_key(user_id, version)
+        ids = cache.get(key)
+        if ids is None:
+            ids = self.model(version).top(load_signals([user_id]), CACHED_COUNT)[0]
+            cache.set(key, ids, getattr(settings, 'RECOMMENDATION_TIMEOUT', DEFAULT_TIMEOUT))
+        return ids[:count]
+
+    def destinations_for(self, user_id, count=6):
+        """``for_user`` as Destination objects, in recommendation order"""
+        ids = self.for_user(user_id, count)
+        destinations = Destination.objects.in_bulk(ids) if ids else {}
+        return [destinations[pk] for pk in ids if pk in destinations]
+
+    def precompute(self, user_ids, batch_size=BATCH_SIZE):
+        """Score and cache ``user_ids`` in batches; returns how many were cached"""
+        version = _version()
+        model = self.model(version)
+        timeout = getattr(settings, 'RECOMMENDATION_TIMEOUT', DEFAULT_TIMEOUT)
+        done = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            results = model.top(load_signals(batch), CACHED_COUNT)
+            cache.set_many({user_key(user_id, version): ids for user_id, ids in zip(batch, results)}, timeout)
+            done += len(batch)
+        return done
+
+    def forget_user(self, user_id):
+        """Drop one user's cached recommendations after their profile, favorites or reviews changed"""
+        cache.delete(user_key(user_id))
+
+    def invalidate(self):
+        """Drop everyone's recommendations and the shared arrays"""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, int(time.time()), timeout=None)
+
+
+recommender = Recommender()
@@ -0,0 +1,211 @@
+"""Full-text search backed by SQLite FTS5.
+
+Each searchable model gets an external-content FTS5 table that mirrors the
+text columns of its base table. SQL triggers keep the index in sync on insert,
+update and delete, so rows written through ``update()``, ``bulk_create()`` or
+raw SQL are indexed too. Updates that only touch counters such as ``views``
+or ``likes`` do not fire the triggers.
+
+Each FTS table is also mapped as an unmanaged model (``DestinationSearch``
+and friends in ``home/models.py``) whose primary key is the FTS rowid and
+whose ``document`` field is the table's hidden column of the same name, the
+one ``MATCH`` and ``bm25()`` take. Ranked queries are then a plain ORM join,
+``filter(search_entry__document__match=...)`` ordered by ``BM25``, and
+unranked filters an ``id IN (SELECT rowid ...)`` subquery that leaves the
+queryset's own ordering and index use alone. On databases without FTS5 the
+helpers fall back to the old ``icontains`` filters.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connection, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden column named after an FTS5 table, standing for the whole row"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class BM25(models.Func):
+    """bm25() rank of a matched FTS5 row; lower is better"""
+    function = 'bm25'
+    output_field = models.FloatField()
+
+
+class FullTextIndex:
+    """FTS5 index mirroring some text columns of a model's table"""
+
+    def __init__(self, table, columns, relation='search_entry'):
+        self.table = table
+        self.columns = columns
+        self.fts_table = f'{table}_fts'
+        # Reverse one-to-one from the content model to its FTS model
+        self.document = f'{relation}__document'
+
+    def create_sql(self):
+        cols = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{c}' for c in self.columns)
+        old_values = ', '.join(f'old.{c}' for c in self.columns)
+        fts = self.fts_table
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{self.table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {self.table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        ]
+
+    def drop_sql(self):
+        fts = self.fts_table
+        return [
+            f'DROP TRIGGER IF EXISTS {fts}_ai',
+            f'DROP TRIGGER IF EXISTS {fts}_ad',
+            f'DROP TRIGGER IF EXISTS {fts}_au',
+            f'DROP TABLE IF EXISTS {fts}',
+        ]
+
+    def rebuild_sql(self):
+        return [f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"]
+
+    def search(self, queryset, match):
+        """Restrict ``queryset`` to rows matching ``match``, best bm25 rank first"""
+        return (
+            queryset.filter(**{f'{self.document}__match': match})
+            .annotate(search_rank=BM25(self.document))
+            .order_by('search_rank')
+        )
+
+    def filter(self, queryset, match):
+        """Restrict ``queryset`` to rows matching ``match``, keeping its ordering"""
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s', [match])
+        )
+
+
+DESTINATION_INDEX = FullTextIndex('home_destination', ('name', 'tagline', 'description'))
+VLOG_INDEX = FullTextIndex('home_travelvlog', ('title', 'description', 'tags'))
+REVIEW_INDEX = FullTextIndex('home_review', ('title', 'content'))
+
+INDEXES = [DESTINATION_INDEX, VLOG_INDEX, REVIEW_INDEX]
+
+# icontains fallbacks used when FTS5 is not available
+_FALLBACK_FIELDS = {
+    DESTINATION_INDEX: ('name', 'description', 'tagline'),
+    VLOG_INDEX: ('title', 'description', 'tags'),
+    REVIEW_INDEX: ('title', 'content'),
+}
+
+
+@lru_cache(maxsize=None)
+def sqlite_has_fts5():
+    """Whether the SQLite library Python links against was built with FTS5"""
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def fts_enabled(conn=None):
+    """Whether the database supports the FTS5 indexes"""
+    return (conn or connection).vendor == 'sqlite' and sqlite_has_fts5()
+
+
+def create_indexes(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for index in INDEXES:
+            for sql in index.create_sql():
+                cursor.execute(sql)
+
+
+def ensure_triggers(conn=None):
+    """Recreate missing sync triggers for indexes that already exist.
+
+    SQLite drops a table's triggers when a migration rebuilds the table, so
+    this runs after every migrate.
+    """
+    conn = conn or connection
+    existing = set(conn.introspection.table_names())
+    with conn.cursor() as cursor:
+        for index in INDEXES:
+            if index.fts_table in existing:
+                for sql in index.create_sql():
+                    cursor.execute(sql)
+
+
+def drop_indexes(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for index in INDEXES:
+            for sql in index.drop_sql():
+                cursor.execute(sql)
+
+
+def rebuild_indexes(conn=None):
+    """Recreate every index and repopulate it from its content table"""
+    conn = conn or connection
+    drop_indexes(conn)
+    create_indexes(conn)
+    with conn.cursor() as cursor:
+        for index in INDEXES:
+            for sql in index.rebuild_sql():
+                cursor.execute(sql)
+
+
+def build_match(query):
+    """Turn free text into a safe FTS5 query: every word must match as a prefix"""
+    tokens = _TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _fallback(index, queryset, query):
+    condition = Q()
+    for field in _FALLBACK_FIELDS[index]:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+def _run(index, queryset, query, ranked):
+    if not fts_enabled():
+        return _fallback(index, queryset, query)
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    if ranked:
+        return index.search(queryset, match)
+    return index.filter(queryset, match)
+
+
+def search_destinations(queryset, query, ranked=True):
+    return _run(DESTINATION_INDEX, queryset, query, ranked)
+
+
+def search_vlogs(queryset, query, ranked=True):
+    return _run(VLOG_INDEX, queryset, query, ranked)
+
+
+def search_reviews(queryset, query, ranked=True):
+    return _run(REVIEW_INDEX, queryset, query, ranked)
@@ -0,0 +1,335 @@
+"""Synthetic data for load and scale testing.
+
+Rows are generated lazily and written with batched ``bulk_create``, so memory
+stays flat however many rows are asked for. Popularity is Zipf-skewed: a few
+destinations get most vlogs, trips and reviews, and a few users write most of
+them, as on a real site. Foreign keys are drawn from the id range each phase
+inserted, so nothing but two integers is kept per model.
+
+Work is split into fixed-size chunks, each with its own random generator
+derived from the seed, the model and the chunk number. The generated rows are
+therefore the same for a given seed and day whatever the number of workers;
+only the order in which parallel workers commit them (and so their ids) can
+vary.
+"""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .itinerary import ACTIVITY_CATALOG, build_trip_days
+from .models import Destination, FoodItem, TravelVlog, Trip, TripDay, Review, VlogLike
+
+PLACES = (
+    'Coast', 'Hills', 'Valley', 'Lake', 'Fort', 'Delta', 'Backwaters', 'Desert', 'Island', 'Ghats',
+    'Plateau', 'Harbour', 'Gorge', 'Meadows', 'Bay', 'Sands', 'Peaks', 'Falls', 'Grove', 'Terraces',
+)
+DESTINATION_TYPES = ('Beach', 'Mountain', 'City', 'Heritage', 'Family', 'Honeymoon', 'Adventure', 'Wildlife')
+BUDGETS = ('Low', 'Medium', 'High')
+DAILY_BUDGETS = {'Low': 2000, 'Medium': 5000, 'High': 10000}
+DISHES = (
+    ('Masala Dosa', True), ('Fish Curry', False), ('Dal Baati', True), ('Momos', False), ('Thali', True),
+    ('Biryani', False), ('Pav Bhaji', True), ('Rogan Josh', False), ('Idli Sambar', True), ('Vada Pav', True),
+    ('Prawn Balchao', False), ('Chole Bhature', True), ('Thukpa', False), ('Appam with Stew', False),
+)
+TAGS = (
+    'beach', 'food', 'trek', 'budget', 'culture', 'sunset', 'roadtrip', 'temple', 'monsoon', 'wildlife',
+    'camping', 'street food', 'heritage', 'solo', 'family', 'luxury', 'snow', 'island', 'market', 'festival',
+)
+VLOG_TYPES = tuple(value for value, _ in TravelVlog.VLOG_TYPES)
+TRAVEL_TYPES = ('family', 'solo', 'couple', 'adventure')
+INTERESTS = sorted({tag for activity in ACTIVITY_CATALOG for tag in activity.tags} | {'food', 'shopping'})
+TRIP_STATUSES = (('planned', 0.45), ('ongoing', 0.05), ('completed', 0.45), ('cancelled', 0.05))
+RATING_WEIGHTS = (0.05, 0.07, 0.15, 0.33, 0.40)
+
+# Days of history spread over the generated timestamps
+HISTORY_DAYS = 730
+
+
+def zipf_rank(rng, n, s=1.1):
+    """Draw a 0-based rank in ``range(n)``, rank 0 being the most popular.
+
+    Inverts the CDF of the continuous Zipf (bounded Pareto) distribution, so
+    no table of ``n`` weights is needed.
+    """
+    if n <= 1:
+        return 0
+    u = rng.random()
+    if s == 1:
+        rank = n ** u
+    else:
+        rank = ((n ** (1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return min(int(rank) - 1, n - 1)
+
+
+class IdRange:
+    """The ids one seeding phase inserted; picks them by Zipf rank"""
+
+    def __init__(self, first, last, ids=None):
+        self.first = first
+        self.last = last
+        # Only materialized when the inserted ids are not contiguous
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids) if self.ids is not None else self.last - self.first + 1
+
+    def _at(self, index):
+        return self.ids[index] if self.ids is not None else self.first + index
+
+    def pick(self, rng, s):
+        return self._at(zipf_rank(rng, len(self), s))
+
+    def pick_uniform(self, rng):
+        return self._at(rng.randrange(len(self)))
+
+    def pick_distinct(self, rng, k):
+        """``k`` different ids, at most all of them"""
+        return [self._at(index) for index in rng.sample(range(len(self)), min(k, len(self)))]
+
+    @classmethod
+    def after(cls, model, previous_max):
+        rows = model.objects.filter(pk__gt=previous_max)
+        bounds = rows.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return None
+        if rows.count() == bounds['last'] - bounds['first'] + 1:
+            return cls(bounds['first'], bounds['last'])
+        return cls(bounds['first'], bounds['last'], list(rows.order_by('pk').values_list('pk', flat=True)))
+
+
+def max_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _past_datetime(rng, now):
+    # Recent activity is more common than old
+    days = HISTORY_DAYS * rng.random() ** 2
+    return now - datetime.timedelta(days=days, seconds=rng.randrange(86400))
+
+
+def restore_timestamps(model, objs, field_name, values, key=('id',)):
+    """Put the generated ``values`` back into an auto_now_add column after bulk_create
+
+    bulk_create stamps such a column with the current time. Rows are matched on
+    ``key`` and the stamp they were given, so a row skipped as a conflict leaves
+    the one already stored alone.
+    """
+    field = model._meta.get_field(field_name)
+    key_fields = [model._meta.get_field(name) for name in key]
+    quote = connection.ops.quote_name
+    where = ' AND '.join(f'{quote(f.column)} = %s' for f in (*key_fields, field))
+    statement = f'UPDATE {quote(model._meta.db_table)} SET {quote(field.column)} = %s WHERE {where}'
+    rows = [
+        [field.get_db_prep_save(value, connection)]
+        + [getattr(obj, f.attname) for f in key_fields]
+        + [field.get_db_prep_save(getattr(obj, field.attname), connection)]
+        for obj, value in zip(objs, values)
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(statement, rows)
+
+
+class Seeder:
+    """Generate one chunk of rows for one model; see ``seed_data``"""
+
+    def __init__(self, seed, prefix, zipf_s, batch_size, users=None, destinations=None, password=None):
+        self.seed = seed
+        self.prefix = prefix
+        self.zipf_s = zipf_s
+        self.batch_size = batch_size
+        self.users = users
+        self.destinations = destinations
+        self.password = password
+        # Timestamps count back from midnight so a seed gives the same rows all day
+        self.now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def rng(self, phase, chunk):
+        return random.Random(f'{self.seed}:{phase}:{chunk}')
+
+    def write(self, model, rows, timestamp=None, key=('id',), **kwargs):
+        """bulk_create ``rows`` in batches; returns the number written
+
+        ``timestamp`` names an auto_now_add field whose generated values are kept,
+        matching rows on ``key``; see ``restore_timestamps``.
+        """
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                written += self._flush(model, batch, timestamp, key, **kwargs)
+                batch = []
+        if batch:
+            written += self._flush(model, batch, timestamp, key, **kwargs)
+        return written
+
+    def _flush(self, model, batch, timestamp, key, **kwargs):
+        values = [getattr(obj, timestamp) for obj in batch] if timestamp else None
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=self.batch_size, **kwargs)
+            if timestamp:
+                restore_timestamps(model, batch, timestamp, values, key)
+        return len(batch)
+
+    # Phases. Each takes the chunk number and the [start, stop) row numbers.
+
+    def users_chunk(self, chunk, start, stop):
+        password = make_password(self.password)
+        return self.write(User, (
+            User(username=f'{self.prefix}_user_{self.seed}_{n}', password=password,
+                 date_joined=_past_datetime(self.rng('users', chunk), self.now))
+            for n in range(start, stop)
+        ))
+
+    def destinations_chunk(self, chunk, start, stop):
+        rng = self.rng('destinations', chunk)
+
+        def rows():
+            for n in range(start, stop):
+                budget = rng.choice(BUDGETS)
+                scale = {'Low': 0.6, 'Medium': 1.0, 'High': 2.2}[budget] * rng.uniform(0.8, 1.25)
+                place = rng.choice(PLACES)
+                name = f'{self.prefix} {place} {self.seed}-{n}'
+                yield Destination(
+                    name=name,
+                    tagline=f'{place} views and {rng.choice(TAGS)}',
+                    description=f'{name} is known for its {rng.choice(TAGS)}, {rng.choice(TAGS)} and {rng.choice(TAGS)}.',
+                    type=', '.join(rng.sample(DESTINATION_TYPES, rng.randint(1, 3))),
+                    budget=budget,
+                    best_time='October to March',
+                    state_image=f'https://picsum.photos/seed/{self.seed}-{n}/800/600',
+                    languages='Hindi, English',
+                    stay_cost=round(2000 * scale),
+                    food_cost=round(800 * scale),
+                    transport_cost=round(500 * scale),
+                    activities_cost=round(1200 * scale),
+                )
+        return self.write(Destination, rows())
+
+    def food_items_chunk(self, chunk, start, stop):
+        """``start``/``stop`` are offsets into the destination id range"""
+        rng = self.rng('food', chunk)
+        destination_ids = self.destinations.ids or range(self.destinations.first, self.destinations.last + 1)
+
+        def rows():
+            for destination_id in destination_ids[start:stop]:
+                for dish, vegetarian in rng.sample(DISHES, rng.randint(2, 6)):
+                    low = rng.randrange(40, 300, 10)
+                    yield FoodItem(
+                        destination_id=destination_id, dish=dish, is_vegetarian=vegetarian,
+                        price=f'₹{low}–{low + rng.randrange(20, 200, 10)}',
+                    )
+        return self.write(FoodItem, rows())
+
+    def vlogs_chunk(self, chunk, start, stop):
+        """Vlogs plus one VlogLike row, from a different seeded user, per like they count"""
+        rng = self.rng('vlogs', chunk)
+        written = 0
+        for batch_start in range(start, stop, self.batch_size):
+            vlogs = []
+            likers = []
+            for n in range(batch_start, min(batch_start + self.batch_size, stop)):
+                # Heavy-tailed views; likes a small, noisy share of them
+                views = int(rng.paretovariate(1.16) * 40)
+                tags = rng.sample(TAGS, rng.randint(1, 4))
+                likers.append(self.users.pick_distinct(rng, int(views * rng.betavariate(2, 30))))
+                vlogs.append(TravelVlog(
+                    title=f'{tags[0].title()} diaries #{n}',
+                    description=f'Exploring {", ".join(tags)} on a {rng.choice(TRAVEL_TYPES)} trip.',
+                    destination_id=self.destinations.pick(rng, self.zipf_s),
+                    author_id=self.users.pick(rng, self.zipf_s),
+                    type=rng.choice(VLOG_TYPES),
+                    thumbnail=f'https://picsum.photos/seed/vlog-{self.seed}-{n}/640/360',
+                    duration=f'{rng.randint(3, 40)}:{rng.randrange(60):02d}',
+                    views=views,
+                    likes=len(likers[-1]),
+                    upload_date=_past_datetime(rng, self.now).date(),
+                    tags=tags,
+                    featured=rng.random() < 0.02,
+                ))
+            uploaded = [vlog.upload_date for vlog in vlogs]
+            with transaction.atomic():
+                TravelVlog.objects.bulk_create(vlogs, batch_size=self.batch_size)
+                restore_timestamps(TravelVlog, vlogs, 'upload_date', uploaded)
+                # TravelVlog.likes counts these rows; like/unlike and reconcile_vlog_likes rely on it
+                VlogLike.objects.bulk_create([
+                    VlogLike(user_id=user_id, vlog_id=vlog.pk)
+                    for vlog, user_ids in zip(vlogs, likers) for user_id in user_ids
+                ], batch_size=self.batch_size)
+            written += len(vlogs)
+        return written
+
+    def trips_chunk(self, chunk, start, stop):
+        """Trips plus their itinerary days, planned by the itinerary engine"""
+        rng = self.rng('trips', chunk)
+        statuses, weights = zip(*TRIP_STATUSES)
+        written = 0
+        for batch_start in range(start, stop, self.batch_size):
+            trips = []
+            for n in range(batch_start, min(batch_start + self.batch_size, stop)):
+                created_at = _past_datetime(rng, self.now)
+                start_date = created_at.date() + datetime.timedelta(days=rng.randint(3, 90))
+                # Most trips are a long weekend or a week, a few run for weeks
+                duration = min(1 + int(rng.expovariate(1 / 4)), 21)
+                daily_budget = DAILY_BUDGETS[rng.choice(BUDGETS)] * rng.choice((0.8, 1, 1.2))
+                travel_type = rng.choice(TRAVEL_TYPES)
+                trips.append(Trip(
+                    user_id=self.users.pick(rng, self.zipf_s),
+                    destination_id=self.destinations.pick(rng, self.zipf_s),
+                    title=f'{travel_type.title()} trip #{n}',
+                    start_date=start_date,
+                    end_date=start_date + datetime.timedelta(days=duration - 1),
+                    duration_days=duration,
+                    travelers_count=rng.randint(1, 5),
+                    daily_budget=daily_budget,
+                    total_budget=daily_budget * duration,
+                    travel_type=travel_type,
+                    interests=rng.sample(INTERESTS, rng.randint(0, 3)),
+                    status=rng.choices(statuses, weights)[0],
+                    created_at=created_at,
+                ))
+            # Plan before taking the write lock; bulk_create fills in the trip ids
+            destinations = Destination.objects.in_bulk({trip.destination_id for trip in trips})
+            for trip in trips:
+                trip.destination = destinations[trip.destination_id]
+            days = [day for trip in trips for day in build_trip_days(trip)]
+            created = [trip.created_at for trip in trips]
+            with transaction.atomic():
+                Trip.objects.bulk_create(trips, batch_size=self.batch_size)
+                restore_timestamps(Trip, trips, 'created_at', created)
+                TripDay.objects.bulk_create(days, batch_size=self.batch_size)
+            written += len(trips)
+        return written
+
+    def reviews_chunk(self, chunk, start, stop):
+        """Reviews; a repeated (user, destination) pair is skipped, so fewer may be written"""
+        rng = self.rng('reviews', chunk)
+
+        def rows():
+            for n in range(start, stop):
+                rating = rng.choices((1, 2, 3, 4, 5), RATING_WEIGHTS)[0]
+                tags = rng.sample(TAGS, 2)
+                created_at = _past_datetime(rng, self.now)
+                yield Review(
+                    # Reviewers are spread evenly, which keeps (user, destination) repeats rare
+                    user_id=self.users.pick_uniform(rng),
+                    destination_id=self.destinations.pick(rng, self.zipf_s),
+                    rating=rating,
+                    title=f'{"Loved" if rating >= 4 else "Okay" if rating == 3 else "Disappointing"}: {tags[0]}',
+                    content=f'Came for the {tags[0]}, stayed for the {tags[1]}.',
+                    visit_date=(created_at - datetime.timedelta(days=rng.randint(1, 60))).date(),
+                    travel_type=rng.choice(TRAVEL_TYPES).title(),
+                    recommended_budget=rng.choice(BUDGETS),
+                    helpful_votes=int(rng.paretovariate(1.5)) - 1,
+                    is_verified=rng.random() < 0.3,
+                    created_at=created_at,
+                )
+        # Conflicting rows get no id, so match on the (user, destination) pair instead
+        return self.write(
+            Review, rows(), timestamp='created_at', key=('user', 'destination'), ignore_conflicts=True,
+        )
@@ -0,0 +1,384 @@
+"""Offline semantic search over destinations, vlogs and reviews.
+
+Documents are embedded without any model download or network call: words
+are stemmed, stop words dropped, and every word that belongs to one of the
+travel ``CONCEPTS`` also emits a shared concept feature, so "quiet beach
+for couples" lands next to "secluded shore, honeymoon". Features are
+counted with sublinear TF and folded into ``SEMANTIC_SEARCH_DIMENSIONS``
+buckets with the signed hashing trick.
+
+The index lives in ``SEMANTIC_INDEX_DIR`` as NumPy files: ``vectors.f32``,
+a memory-mapped ``(capacity, dimensions)`` float32 matrix of raw TF rows,
+and ``rows.npy`` with each row's kind, primary key and text fingerprint.
+IDF weights and row norms are recomputed after each build, so cosine
+scores are TF-IDF scores even though rows are never rewritten when the
+collection grows. ``manage.py build_semantic_index`` is incremental: only
+rows whose text fingerprint changed are embedded again, deleted objects
+free their row for reuse, and the file only grows when it is full. Edits
+are picked up by the next build.
+
+Queries are embedded the same way and scored in batches against blocks of
+rows, so memory stays flat however large the file gets. ``hybrid_search``
+blends these scores with the keyword (FTS5) ranking from ``home.search``.
+NumPy is optional: without it, or before the first build, search falls
+back to keyword results alone.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+DEFAULT_DIMENSIONS = 1024
+DEFAULT_WEIGHT = 0.5
+DEFAULT_MIN_SCORE = 0.1
+BLOCK_ROWS = 8192
+CANDIDATES = 20
+FORMAT_VERSION = 1
+
+DESTINATION = 'destination'
+VLOG = 'vlog'
+REVIEW = 'review'
+KIND_CODES = {DESTINATION: 1, VLOG: 2, REVIEW: 3}
+
+_WORD_RE = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its my of on or our so that the their them
+there they this to was we were with you your very can will just also into over more most some than
+""".split())
+
+# Words travellers use for the same thing; each group becomes one shared feature
+CONCEPTS = {
+    'calm': 'quiet peaceful calm serene secluded tranquil relaxing relax offbeat isolated untouched hidden',
+    'beach': 'beach shore coast coastal sea seaside sand sandy ocean island bay',
+    'romance': 'couple romantic romance honeymoon honeymooners sunset',
+    'mountain': 'mountain hill hills himalaya himalayan peak peaks snow valley alpine ghats',
+    'trek': 'trek trekking hike hiking trail climb camping',
+    'wildlife': 'wildlife safari jungle forest tiger tigers elephant elephants bird birds birding national park',
+    'heritage': 'heritage history historic historical fort forts palace palaces temple temples monument ruins',
+    'food': 'food cuisine dish dishes eat eating street snack snacks thali curry restaurant cafe',
+    'budget': 'cheap budget affordable inexpensive backpacker backpacking hostel economical',
+    'luxury': 'luxury luxurious premium resort resorts spa villa boutique',
+    'family': 'family families kid kids children child',
+    'adventure': 'adventure rafting paragliding diving scuba surfing thrill thrilling',
+    'water': 'lake lakes river rivers backwater backwaters waterfall waterfalls houseboat',
+    'city': 'city cities urban nightlife shopping market markets mall',
+    'culture': 'culture cultural festival festivals local tradition traditional art craft crafts',
+    'desert': 'desert dunes dune camel',
+    'crowd': 'crowded busy touristy crowds packed',
+    'scenic': 'scenic beautiful view views stunning breathtaking picturesque landscape',
+}
+CONCEPT_OF = {word: concept for concept, words in CONCEPTS.items() for word in words.split()}
+CONCEPT_WEIGHT = 1.5
+
+
+def available():
+    return np is not None
+
+
+def dimensions():
+    return getattr(settings, 'SEMANTIC_SEARCH_DIMENSIONS', DEFAULT_DIMENSIONS)
+
+
+def index_dir():
+    return Path(getattr(settings, 'SEMANTIC_INDEX_DIR', Path(settings.BASE_DIR) / 'semantic_index'))
+
+
+def stem(word):
+    """Crude plural and -ing folding, enough to line up 'beaches' with 'beach'"""
+    for suffix, replacement in (('ies', 'y'), ('ches', 'ch'), ('shes', 'sh'), ('ing', ''), ('s', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def features(text):
+    """Weighted features of a text: stemmed words plus the concepts they belong to"""
+    counts = Counter()
+    for word in _WORD_RE.findall((text or '').lower()):
+        if word in STOP_WORDS or len(word) < 2:
+            continue
+        stemmed = stem(word)
+        counts['w:' + stemmed] += 1
+        concept = CONCEPT_OF.get(word) or CONCEPT_OF.get(stemmed)
+        if concept:
+            counts['c:' + concept] += 1
+    return {
+        feature: (1 + math.log(count)) * (CONCEPT_WEIGHT if feature.startswith('c:') else 1)
+        for feature, count in counts.items()
+    }
+
+
+def embed(text, dim):
+    """Signed feature-hashed TF vector of ``text``"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features(text).items():
+        digest = zlib.crc32(feature.encode('utf-8'))
+        vector[digest % dim] += weight if digest & 0x80000000 else -weight
+    return vector
+
+
+def fingerprint(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def documents():
+    """(kind, pk, text) for everything that is searched"""
+    from .models import Destination, Review, TravelVlog
+
+    for pk, name, tagline, description in Destination.objects.order_by('pk').values_list(
+            'pk', 'name', 'tagline', 'description').iterator():
+        yield DESTINATION, pk, f'{name}\n{tagline}\n{description}'
+    for pk, title, description, tags in TravelVlog.objects.order_by('pk').values_list(
+            'pk', 'title', 'description', 'tags').iterator():
+        tags = ' '.join(tag for tag in tags or [] if isinstance(tag, str))
+        yield VLOG, pk, f'{title}\n{description}\n{tags}'
+    for pk, title, content in Review.objects.order_by('pk').values_list('pk', 'title', 'content').iterator():
+        yield REVIEW, pk, f'{title}\n{content}'
+
+
+class SemanticIndex:
+    """The on-disk index; builds write it, searches map it read-only and reload it when it changes"""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded_stamp = None
+        self._state = None
+
+    @property
+    def path(self):
+        return Path(self._path) if self._path else index_dir()
+
+    def _files(self):
+        path = self.path
+        return path / 'meta.json', path / 'vectors.f32', path / 'rows.npy', path / 'weights.npz'
+
+    def _read_meta(self):
+        meta_path = self._files()[0]
+        try:
+            with open(meta_path, encoding='utf-8') as meta:
+                return json.load(meta)
+        except (OSError, ValueError):
+            return None
+
+    # Building
+
+    def build(self, full=False):
+        """Bring the index up to date with the database; returns counts of what changed"""
+        if not available():
+            raise RuntimeError("Semantic search needs NumPy.")
+        meta_path, vectors_path, rows_path, weights_path = self._files()
+        self.path.mkdir(parents=True, exist_ok=True)
+        dim = dimensions()
+        meta = None if full else self._read_meta()
+        if meta and (meta.get('format') != FORMAT_VERSION or meta.get('dimensions') != dim
+                     or not vectors_path.exists() or not rows_path.exists()):
+            meta = None
+
+        if meta:
+            capacity, used = meta['capacity'], meta['rows']
+            rows = np.load(rows_path)
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(capacity, dim))
+        else:
+            capacity, used = 0, 0
+            rows = np.zeros((0, 3), dtype=np.int64)
+            vectors = None
+
+        slots = {(int(kind), int(pk)): row for row, (kind, pk, _) in enumerate(rows[:used]) if kind}
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        pending = []
+        seen = set()
+        for kind, pk, text in documents():
+            key = (KIND_CODES[kind], pk)
+            seen.add(key)
+            stamp = fingerprint(text)
+            row = slots.get(key)
+            if row is not None and rows[row, 2] == stamp:
+                counts['unchanged'] += 1
+                continue
+            counts['updated' if row is not None else 'added'] += 1
+            pending.append((key, row, stamp, embed(text, dim)))
+
+        for key, row in slots.items():
+            if key not in seen:
+                rows[row] = 0
+                vectors[row] = 0
+                counts['removed'] += 1
+        # Rows freed by this or earlier builds are reused before the file grows
+        free = [int(row) for row in np.flatnonzero(rows[:used, 0] == 0)[::-1]]
+
+        needed = used + max(sum(row is None for _, row, _, _ in pending) - len(free), 0)
+        if needed > capacity:
+            # Double into a new file, so appends stay amortized
+            capacity = max(needed, capacity * 2, 1024)
+            grown_path = vectors_path.with_suffix('.tmp')
+            grown = np.memmap(grown_path, dtype=np.float32, mode='w+', shape=(capacity, dim))
+            for start in range(0, used, BLOCK_ROWS):
+                grown[start:min(start + BLOCK_ROWS, used)] = vectors[start:min(start + BLOCK_ROWS, used)]
+            grown.flush()
+            del grown, vectors
+            os.replace(grown_path, vectors_path)
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(capacity, dim))
+            rows = np.concatenate([rows, np.zeros((capacity - len(rows), 3), dtype=np.int64)])
+
+        for key, row, stamp, vector in pending:
+            if row is None:
+                if free:
+                    row = free.pop()
+                else:
+                    row, used = used, used + 1
+            vectors[row] = vector
+            rows[row] = (*key, stamp)
+        if vectors is not None:
+            vectors.flush()
+
+        # TF-IDF weights over the rows in use, and each row's norm under them
+        live = rows[:used, 0] != 0
+        document_frequency = np.zeros(dim, dtype=np.float64)
+        for start in range(0, used, BLOCK_ROWS):
+            block = np.asarray(vectors[start:min(start + BLOCK_ROWS, used)])
+            document_frequency += (block != 0).sum(axis=0)
+        idf = (np.log((live.sum() + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        squared_idf = idf ** 2
+        norms = np.zeros(used, dtype=np.float32)
+        for start in range(0, used, BLOCK_ROWS):
+            block = np.asarray(vectors[start:min(start + BLOCK_ROWS, used)])
+            norms[start:start + len(block)] = np.sqrt((block ** 2) @ squared_idf)
+
+        rows_tmp = rows_path.with_suffix('.tmp.npy')
+        np.save(rows_tmp, rows)
+        os.replace(rows_tmp, rows_path)
+        weights_tmp = weights_path.with_suffix('.tmp.npz')
+        np.savez(weights_tmp, idf=idf, norms=norms)
+        os.replace(weights_tmp, weights_path)
+        meta_tmp = meta_path.with_suffix('.tmp')
+        with open(meta_tmp, 'w', encoding='utf-8') as meta_file:
+            json.dump({'format': FORMAT_VERSION, 'dimensions': dim, 'capacity': capacity,
+                       'rows': used, 'documents': int(live.sum())}, meta_file)
+        os.replace(meta_tmp, meta_path)
+        return counts
+
+    # Searching
+
+    def _load(self):
+        """Current index state, remapped when a build replaced meta.json"""
+        meta_path, vectors_path, rows_path, weights_path = self._files()
+        try:
+            stat = meta_path.stat()
+        except OSError:
+            return None
+        stamp = (str(meta_path), stat.st_mtime_ns, stat.st_size)
+        if stamp == self._loaded_stamp:
+            return self._state
+        with self._lock:
+            if stamp != self._loaded_stamp:
+                meta = self._read_meta()
+                state = None
+                if meta and meta.get('format') == FORMAT_VERSION and meta['rows']:
+                    weights = np.load(weights_path)
+                    state = {
+                        'dim': meta['dimensions'],
+                        'rows': np.load(rows_path),
+                        'vectors': np.memmap(vectors_path, dtype=np.float32, mode='r',
+                                             shape=(meta['capacity'], meta['dimensions'])),
+                        'idf': weights['idf'],
+                        'norms': weights['norms'],
+                    }
+                self._state, self._loaded_stamp = state, stamp
+        return self._state
+
+    def ready(self):
+        return available() and self._load() is not None
+
+    def _scores(self, queries):
+        """(cosine of every row for each query, row table) in one pass over the vectors"""
+        state = self._load() if available() else None
+        if state is None or not queries:
+            return None, None
+        dim, rows, vectors, idf, norms = state['dim'], state['rows'], state['vectors'], state['idf'], state['norms']
+        weighted = np.stack([embed(query, dim) for query in queries]) * idf
+        query_norms = np.linalg.norm(weighted, axis=1)
+        query_norms[query_norms == 0] = 1
+        # Rows hold raw TF, so the query carries both IDF factors of the dot product
+        weighted = (weighted * idf) / query_norms[:, None]
+
+        used = len(norms)
+        scores = np.empty((len(queries), used), dtype=np.float32)
+        for start in range(0, used, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, used)
+            scores[:, start:end] = weighted @ np.asarray(vectors[start:end]).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores /= norms
+        scores[:, norms == 0] = -1
+        return scores, rows[:used]
+
+    @staticmethod
+    def _top(row_scores, rows, kind, k):
+        candidates = np.flatnonzero((rows[:, 0] == KIND_CODES[kind]) if kind else (rows[:, 0] != 0))
+        if not len(candidates):
+            return []
+        kind_scores = row_scores[candidates]
+        top = min(k, len(candidates))
+        best = np.argpartition(-kind_scores, top - 1)[:top]
+        best = best[np.argsort(-kind_scores[best], kind='stable')]
+        return [(int(rows[candidates[i], 1]), float(kind_scores[i])) for i in best if kind_scores[i] > 0]
+
+    def search_many(self, queries, kind=None, k=CANDIDATES):
+        """Top ``k`` (pk, cosine) pairs of ``kind`` (any kind when None) for each query"""
+        scores, rows = self._scores(queries)
+        if scores is None:
+            return [[] for _ in queries]
+        return [self._top(row_scores, rows, kind, k) for row_scores in scores]
+
+    def search(self, query, kind=None, k=CANDIDATES):
+        return self.search_many([query], kind, k)[0]
+
+    def search_kinds(self, query, kinds, k=CANDIDATES):
+        """{kind: top ``k`` (pk, cosine) pairs} for several kinds from one scoring pass"""
+        scores, rows = self._scores([query])
+        if scores is None:
+            return {kind: [] for kind in kinds}
+        return {kind: self._top(scores[0], rows, kind, k) for kind in kinds}
+
+
+semantic_index = SemanticIndex()
+
+
+def hybrid_search(queryset, keyword_results, semantic_hits, limit):
+    """Blend keyword hits (best first) with semantic (pk, cosine) hits into the top ``limit`` objects.
+
+    Keyword hits score ``1 / (rank + 1)`` and semantic hits their cosine; the
+    two are mixed by ``SEMANTIC_SEARCH_WEIGHT``. Semantic hits the keyword
+    search missed are fetched from ``queryset`` in one query. Without
+    semantic hits this is just the first ``limit`` keyword results.
+    """
+    min_score = getattr(settings, 'SEMANTIC_SEARCH_MIN_SCORE', DEFAULT_MIN_SCORE)
+    semantic_hits = [(pk, similarity) for pk, similarity in semantic_hits if similarity >= min_score]
+    if not semantic_hits:
+        return list(keyword_results[:limit])
+    weight = getattr(settings, 'SEMANTIC_SEARCH_WEIGHT', DEFAULT_WEIGHT)
+    keyword = list(keyword_results[:CANDIDATES])
+    objects = {obj.pk: obj for obj in keyword}
+    scores = {obj.pk: (1 - weight) / (rank + 1) for rank, obj in enumerate(keyword)}
+    for pk, similarity in semantic_hits:
+        scores[pk] = scores.get(pk, 0) + weight * similarity
+
+    ranked = sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+    missing = [pk for pk in ranked if pk not in objects]
+    if missing:
+        objects.update(queryset.in_bulk(missing))
+    # Objects deleted since the last build simply drop out
+    return [objects[pk] for pk in ranked if pk in objects]
@@ -0,0 +1,241 @@
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate, m2m_changed
+from django.dispatch import receiver
+
+from .models import Destination, FoodItem, TravelVlog, Review, Trip, UserProfile
+from . import db, stats, search, video, cache as view_cache
+from .itinerary import get_engine
+from .assistant import assistant
+from .recommend import recommender
+from .suggest import suggest_index, DESTINATION, VLOG
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    db.configure_sqlite(connection)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using='default', **kwargs):
+    """Table rebuilds during migrate drop the FTS sync triggers; put them back"""
+    if sender.name != 'home':
+        return
+    connection = connections[using]
+    if search.fts_enabled(connection):
+        search.ensure_triggers(connection)
+
+
+@receiver(post_save, sender=TravelVlog)
+@receiver(post_delete, sender=TravelVlog)
+def vlog_changed(sender, instance, **kwargs):
+    """Drop cached vlog totals whenever a vlog is saved or deleted"""
+    stats.invalidate_vlog_totals()
+
+
+@receiver(pre_save, sender=TravelVlog)
+def vlog_stash_previous_video(sender, instance, raw=False, **kwargs):
+    """Remember the stored video file so post_save can tell whether it changed"""
+    instance._previous_video = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_video = TravelVlog.objects.filter(pk=instance.pk).values_list('video_file', flat=True).first()
+
+
+@receiver(post_save, sender=TravelVlog)
+def vlog_queue_video_processing(sender, instance, created, raw=False, **kwargs):
+    """Queue thumbnails, duration and renditions for a new or replaced video file"""
+    if raw or not instance.video_file:
+        return
+    if created or instance.video_file.name != getattr(instance, '_previous_video', None):
+        transaction.on_commit(lambda: video.enqueue(instance))
+
+
+@receiver(post_save, sender=Destination)
+def destination_saved_suggest(sender, instance, **kwargs):
+    suggest_index.update(DESTINATION, instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Destination)
+def destination_deleted_suggest(sender, instance, **kwargs):
+    suggest_index.remove(DESTINATION, instance.pk)
+
+
+@receiver(post_save, sender=TravelVlog)
+def vlog_saved_suggest(sender, instance, **kwargs):
+    suggest_index.update(VLOG, instance.pk, instance.title, instance.tags)
+
+
+@receiver(post_delete, sender=TravelVlog)
+def vlog_deleted_suggest(sender, instance, **kwargs):
+    suggest_index.remove(VLOG, instance.pk)
+
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+def destination_changed_itinerary(sender, instance, **kwargs):
+    get_engine().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def food_item_changed_itinerary(sender, instance, **kwargs):
+    get_engine().invalidate(instance.destination_id)
+
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def destination_facts_changed_assistant(sender, instance, **kwargs):
+    assistant.invalidate()
+
+
+@receiver(pre_save, sender=Review)
+def review_stash_previous(sender, instance, raw=False, **kwargs):
+    """Remember the stored user, destination and rating so post_save can apply the difference"""
+    instance._previous_rating = None
+    if raw or instance.pk is None:
+        return
+    previous = Review.objects.filter(pk=instance.pk).values_list('user_id', 'destination_id', 'rating').first()
+    instance._previous_rating = previous
+
+
+@receiver(post_save, sender=Review)
+def review_saved_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        Destination.adjust_rating(instance.destination_id, 1, instance.rating)
+        UserProfile.adjust_stats(instance.user_id, reviews_delta=1, rating_delta=instance.rating)
+        return
+    previous_user_id, previous_destination_id, previous_rating = previous
+
+    if previous_destination_id != instance.destination_id:
+        Destination.adjust_rating(previous_destination_id, -1, -previous_rating)
+        Destination.adjust_rating(instance.destination_id, 1, instance.rating)
+    elif previous_rating != instance.rating:
+        Destination.adjust_rating(instance.destination_id, 0, instance.rating - previous_rating)
+
+    if previous_user_id != instance.user_id:
+        UserProfile.adjust_stats(previous_user_id, reviews_delta=-1, rating_delta=-previous_rating)
+        UserProfile.adjust_stats(instance.user_id, reviews_delta=1, rating_delta=instance.rating)
+    elif previous_rating != instance.rating:
+        UserProfile.adjust_stats(instance.user_id, rating_delta=instance.rating - previous_rating)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted_rating(sender, instance, **kwargs):
+    Destination.adjust_rating(instance.destination_id, -1, -instance.rating)
+    UserProfile.adjust_stats(instance.user_id, reviews_delta=-1, rating_delta=-instance.rating)
+
+
+@receiver(pre_save, sender=Trip)
+def trip_stash_previous(sender, instance, raw=False, **kwargs):
+    """Remember the stored user and status so post_save can detect completion changes"""
+    instance._previous_status = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_status = Trip.objects.filter(pk=instance.pk).values_list('user_id', 'status').first()
+
+
+@receiver(post_save, sender=Trip)
+def trip_saved_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_status', None)
+    was_completed = previous is not None and previous[1] == 'completed'
+    is_completed = instance.status == 'completed'
+    if previous is not None and previous[0] != instance.user_id:
+        if was_completed:
+            UserProfile.adjust_stats(previous[0], trips_delta=-1)
+        if is_completed:
+            UserProfile.adjust_stats(instance.user_id, trips_delta=1)
+    elif is_completed != was_completed:
+        UserProfile.adjust_stats(instance.user_id, trips_delta=1 if is_completed else -1)
+
+
+@receiver(post_delete, sender=Trip)
+def trip_deleted_stats(sender, instance, **kwargs):
+    if instance.status == 'completed':
+        UserProfile.adjust_stats(instance.user_id, trips_delta=-1)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_created_stats(sender, instance, created, raw=False, **kwargs):
+    """A new profile starts from the user's existing trips and reviews"""
+    if created and not raw:
+        instance.compute_stats()
+        UserProfile.objects.filter(pk=instance.pk).update(
+            trips_taken=instance.trips_taken,
+            total_reviews=instance.total_reviews,
+            rating_sum=instance.rating_sum,
+            average_rating=instance.average_rating,
+        )
+
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+def destination_changed_recommendations(sender, instance, **kwargs):
+    recommender.invalidate()
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_saved_recommendations(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recommender.forget_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserProfile.favorite_destinations.through)
+def favorites_changed_recommendations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recommender.forget_user(instance.user_id)
+        return
+    # Changed from the destination side: every affected profile
+    profiles = UserProfile.objects.filter(pk__in=pk_set) if pk_set else UserProfile.objects.all()
+    for user_id in profiles.values_list('user_id', flat=True):
+        recommender.forget_user(user_id)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed_recommendations(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recommender.forget_user(instance.user_id)
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is not None and previous[0] != instance.user_id:
+        recommender.forget_user(previous[0])
+
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+def destination_changed_pages(sender, instance, **kwargs):
+    view_cache.invalidate('index', 'destinations', 'vlogs', f'destination:{instance.pk}')
+
+
+@receiver(post_save, sender=TravelVlog)
+@receiver(post_delete, sender=TravelVlog)
+def vlog_changed_pages(sender, instance, **kwargs):
+    view_cache.invalidate('index', 'vlogs', f'destination:{instance.destination_id}')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed_pages(sender, instance, **kwargs):
+    tags = ['index', 'destinations', f'destination:{instance.destination_id}']
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is not None and previous[1] != instance.destination_id:
+        tags.append(f'destination:{previous[1]}')
+    view_cache.invalidate(*tags)
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def food_item_changed_pages(sender, instance, **kwargs):
+    view_cache.invalidate(f'destination:{instance.destination_id}')
@@ -0,0 +1,63 @@
+"""Aggregate statistics for list pages.
+
+Totals are computed with a single aggregate query per filter combination and
+cached under a versioned key. Bumping the version (see ``invalidate_vlog_totals``)
+drops every cached combination at once without having to enumerate them. A
+missing version is seeded from the clock, so one evicted from the cache never
+goes back to a number whose totals may still be cached.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+VLOG_TOTALS_VERSION_KEY = 'stats:vlog_totals:version'
+VLOG_TOTALS_TIMEOUT = 60 * 10
+
+
+def _vlog_totals_version():
+    """Return the current generation of the vlog totals cache"""
+    version = cache.get(VLOG_TOTALS_VERSION_KEY)
+    if version is None:
+        cache.add(VLOG_TOTALS_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VLOG_TOTALS_VERSION_KEY, 0)
+    return version
+
+
+def vlog_totals_key(search_query='', type_filter='', destination_filter=''):
+    """Build the cache key for one (q, type, destination) combination"""
+    raw = '\x1f'.join([search_query or '', type_filter or '', destination_filter or ''])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'stats:vlog_totals:v{_vlog_totals_version()}:{digest}'
+
+
+def get_vlog_totals(queryset, search_query='', type_filter='', destination_filter=''):
+    """Return total vlogs, views and likes for an already filtered queryset"""
+    key = vlog_totals_key(search_query, type_filter, destination_filter)
+    totals = cache.get(key)
+    if totals is None:
+        totals = queryset.order_by().aggregate(
+            total_vlogs=Count('id'),
+            total_views=Coalesce(Sum('views'), 0),
+            total_likes=Coalesce(Sum('likes'), 0),
+        )
+        cache.set(key, totals, VLOG_TOTALS_TIMEOUT)
+    return totals
+
+
+def invalidate_vlog_totals():
+    """Drop every cached vlog totals combination"""
+    try:
+        cache.incr(VLOG_TOTALS_VERSION_KEY)
+    except ValueError:
+        cache.set(VLOG_TOTALS_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+async def ainvalidate_vlog_totals():
+    """Async version of ``invalidate_vlog_totals``"""
+    try:
+        await cache.aincr(VLOG_TOTALS_VERSION_KEY)
+    except ValueError:
+        await cache.aset(VLOG_TOTALS_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,170 @@
+"""In-memory prefix index for search-as-you-type suggestions.
+
+Destination names, vlog titles and vlog tags are kept in one sorted list of
+``(key, kind, id)`` entries, so a prefix lookup is two bisections and a short
+slice. Names and titles are indexed once per word so "hop" finds
+"Beach hopping". The index is built from the database on first use and
+patched in place from model signals. Answers are memoized in an LRU dict
+that is only read, filled and cleared under the index lock, so a lookup
+racing a change can never store an answer from before it.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+DESTINATION = 'destination'
+VLOG = 'vlog'
+TAG = 'tag'
+
+DEFAULT_LIMIT = 8
+MAX_PREFIX_LENGTH = 100
+CACHE_SIZE = 2048
+
+
+def normalize(text):
+    return ' '.join(_WORD_RE.findall((text or '').lower()))
+
+
+def _word_suffixes(text):
+    """'Beach hopping' -> ['beach hopping', 'hopping']"""
+    words = normalize(text).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._entries = []
+        self._keys_by_object = {}
+        self._labels = {}
+        self._tag_refs = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        # (prefix, limit) -> suggestions, least recently used first
+        self._cache = OrderedDict()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """(Re)build the whole index from the database"""
+        from .models import Destination, TravelVlog
+
+        with self._lock:
+            self._entries = []
+            self._keys_by_object = {}
+            self._labels = {}
+            self._tag_refs = {}
+            for pk, name in Destination.objects.values_list('pk', 'name').iterator():
+                self._add_object(DESTINATION, pk, name, [])
+            for pk, title, tags in TravelVlog.objects.values_list('pk', 'title', 'tags').iterator():
+                self._add_object(VLOG, pk, title, tags)
+            self._entries.sort()
+            self._loaded = True
+            self._cache.clear()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _add_object(self, kind, pk, label, tags, keep_sorted=False):
+        add = insort if keep_sorted else list.append
+        keys = [(key, kind, pk) for key in _word_suffixes(label)]
+        for entry in keys:
+            add(self._entries, entry)
+        tag_labels = []
+        for tag in tags or []:
+            if not isinstance(tag, str):
+                continue
+            tag_key = normalize(tag)
+            if not tag_key:
+                continue
+            tag_labels.append(tag_key)
+            if self._tag_refs.get(tag_key, 0) == 0:
+                add(self._entries, (tag_key, TAG, tag_key))
+                self._labels[(TAG, tag_key)] = tag.strip()
+            self._tag_refs[tag_key] = self._tag_refs.get(tag_key, 0) + 1
+        self._keys_by_object[(kind, pk)] = (keys, tag_labels)
+        self._labels[(kind, pk)] = label
+
+    def _remove_object(self, kind, pk):
+        keys, tag_labels = self._keys_by_object.pop((kind, pk), ([], []))
+        self._labels.pop((kind, pk), None)
+        for entry in keys:
+            self._discard(entry)
+        for tag_key in tag_labels:
+            self._tag_refs[tag_key] -= 1
+            if self._tag_refs[tag_key] == 0:
+                del self._tag_refs[tag_key]
+                self._labels.pop((TAG, tag_key), None)
+                self._discard((tag_key, TAG, tag_key))
+
+    def _discard(self, entry):
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def update(self, kind, pk, label, tags=None):
+        """Insert or replace one object; a no-op until the index is loaded"""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove_object(kind, pk)
+            self._add_object(kind, pk, label, tags, keep_sorted=True)
+            self._cache.clear()
+
+    def remove(self, kind, pk):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove_object(kind, pk)
+            self._cache.clear()
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """Return up to ``limit`` suggestions for ``prefix`` as a tuple of dicts"""
+        prefix = normalize(prefix)[:MAX_PREFIX_LENGTH]
+        if not prefix:
+            return ()
+        self._ensure_loaded()
+        with self._lock:
+            cached = self._cache.get((prefix, limit))
+            if cached is not None:
+                self._cache.move_to_end((prefix, limit))
+                return cached
+            start = bisect_left(self._entries, (prefix,))
+            end = bisect_left(self._entries, (prefix + '\uffff',))
+            seen = set()
+            matches = []
+            for key, kind, pk in self._entries[start:end]:
+                if (kind, pk) in seen:
+                    continue
+                seen.add((kind, pk))
+                matches.append((kind, pk, self._labels[(kind, pk)]))
+                if len(matches) >= limit:
+                    break
+            suggestions = tuple(_serialize(kind, pk, label) for kind, pk, label in matches)
+            self._cache[(prefix, limit)] = suggestions
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return suggestions
+
+
+def _serialize(kind, pk, label):
+    if kind == DESTINATION:
+        url = reverse('home:destination_detail', args=[pk])
+    elif kind == VLOG:
+        url = reverse('home:vlog_detail', args=[pk])
+    else:
+        url = f"{reverse('home:vlogs')}?{urlencode({'q': label})}"
+    return {'type': kind, 'label': label, 'url': url}
+
+
+suggest_index = PrefixIndex()
@@ -1,3 +1,1541 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from collections import namedtuple
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import db, urls
+from .models import (
+    Destination, FoodItem, TravelVlog, Trip, TripDay, Review, UserProfile, VlogUpload, VideoJob, VlogSearch,
+)
+from . import counters
+from .counters import ViewCounter
+from .profiling import profiler
+from . import search
+from .search import search_destinations, search_reviews, search_vlogs
+from .pagination import CursorPaginator
+from .itinerary import ACTIVITY_CATALOG, generate_trip_days, get_engine
+from .loadtest import DEFAULT_MIX, LoadTest
+from .seeding import Seeder
+from . import stats
+from .stats import get_vlog_totals
+from .suggest import suggest_index
+from .uploads import UploadError, part_path, start_upload, write_chunk
+from .video import WorkerPool, binary, claim, requeue_stale, run_job
+from .assistant import Knowledge, Matcher, assistant
+from . import semantic
+from . import recommend
+from .recommend import recommender
+from .trending import update_scores
+
+# "SCAN home_trip" reads every row; "SCAN t USING [COVERING] INDEX i" walks an
+# index in order and "SEARCH" seeks into one, both fine. Scans of subqueries
+# and FTS tables are not table scans and are filtered out by name.
+FULL_SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?!.*\bUSING\b)')
+
+
+def make_destination(name, **fields):
+    values = {
+        'tagline': f"Visit {name}",
+        'description': f"{name} has beaches, temples and markets",
+        'type': 'Beach, Family',
+        'budget': 'Medium',
+        'best_time': 'October to March',
+        'state_image': 'https://example.com/image.jpg',
+        'stay_cost': 2000,
+        'food_cost': 800,
+        'transport_cost': 500,
+        'activities_cost': 1200,
+    }
+    values.update(fields)
+    return Destination.objects.create(name=name, **values)
+
+
+def make_vlog(destination, author, title='Beach hopping', **fields):
+    return TravelVlog.objects.create(
+        title=title, description="A week on the coast", destination=destination,
+        type=fields.pop('type', 'adventure'), author=author, **fields,
+    )
+
+
+class TempMediaRootMixin:
+    """Point MEDIA_ROOT at a temporary directory for the whole test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+
+@override_settings(VLOG_VIEW_FLUSH_INTERVAL=0)
+class QueryPlanTests(TestCase):
+    """Every query behind every page must be answered from an index, never a full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', password='secret', is_staff=True)
+        cls.destinations = [
+            make_destination(name, budget=budget)
+            for name, budget in [('Goa', 'Low'), ('Manali', 'Medium'), ('Jaipur', 'High')]
+        ]
+        for destination in cls.destinations:
+            FoodItem.objects.create(destination=destination, dish='Thali', price='₹150', is_vegetarian=True)
+        cls.vlogs = [
+            TravelVlog.objects.create(
+                title=f"Beach hopping in {destination.name}", description="A week on the coast",
+                destination=destination, type='adventure', author=cls.user,
+                views=10 * i, likes=i, tags=['beach'], featured=i % 2 == 0,
+            )
+            for i, destination in enumerate(cls.destinations)
+        ]
+        today = datetime.date.today()
+        cls.trip = Trip.objects.create(
+            user=cls.user, destination=cls.destinations[0], title="Goa getaway",
+            start_date=today, end_date=today + datetime.timedelta(days=2), duration_days=3,
+            daily_budget=4000, total_budget=12000, travel_type='solo', interests=['food'],
+        )
+        cls.review = Review.objects.create(
+            user=cls.user, destination=cls.destinations[0], rating=4, title="Lovely",
+            content="Great beaches", visit_date=today, travel_type='Solo', recommended_budget='Medium',
+        )
+
+    def setUp(self):
+        for alias in ('default', 'views'):
+            caches[alias].clear()
+        # The shared recommendation arrays are a deliberate whole-table read, refreshed every
+        # RECOMMENDATION_MODEL_TIMEOUT; the per-user queries behind the home page are still checked
+        if recommend.available():
+            recommend.recommender.model(recommend._version())
+
+    def public_routes(self):
+        destination, vlog = self.destinations[0], self.vlogs[0]
+        return [
+            ('home:index', [], {}),
+            ('home:destinations', [], {}),
+            ('home:destinations', [], {'budget': 'Low'}),
+            ('home:destinations', [], {'type': 'Beach', 'sort': 'rating'}),
+            ('home:destinations', [], {'q': 'goa', 'min_rating': '3'}),
+            ('home:destination_detail', [destination.pk], {}),
+            ('home:vlogs', [], {}),
+            ('home:vlogs', [], {'sort': 'popular'}),
+            ('home:vlogs', [], {'sort': 'liked', 'type': 'adventure'}),
+            ('home:vlogs', [], {'sort': 'trending'}),
+            ('home:vlogs', [], {'sort': 'oldest', 'q': 'beach'}),
+            ('home:vlog_detail', [vlog.pk], {}),
+            ('home:search', [], {'q': 'beach'}),
+            ('home:search_suggest', [], {'q': 'go'}),
+            ('home:destination_data', [destination.pk], {}),
+            ('home:destination_feed', [], {'sort': 'rating', 'count': '1'}),
+            ('home:vlog_feed', [], {'sort': 'popular', 'count': '1'}),
+        ]
+
+    def private_routes(self):
+        vlog = self.vlogs[0]
+        return [
+            ('home:trip_feed', [], {}),
+            ('home:trip_planner', [], {}),
+            ('home:my_trips', [], {}),
+            ('home:trip_detail', [self.trip.pk], {}),
+            ('home:profile', [], {}),
+            ('home:edit_profile', [], {}),
+            ('home:edit_review', [self.review.pk], {}),
+            ('home:upload_vlog', [], {}),
+            ('home:edit_vlog', [vlog.pk], {}),
+            ('home:ai_guide', [], {}),
+            ('home:contact', [], {}),
+            ('home:view_cache_stats', [], {}),
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def virtual_tables(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE sql LIKE 'CREATE VIRTUAL TABLE%'")
+            return {row[0] for row in cursor.fetchall()}
+
+    def full_scans(self, queries):
+        tables = set(connection.introspection.table_names()) - self.virtual_tables()
+        scans = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for detail in self.explain(sql):
+                match = FULL_SCAN_RE.match(detail)
+                if match and match.group('table') in tables:
+                    scans.append((match.group('table'), sql))
+        return scans
+
+    def test_routes_use_indexes(self):
+        self.client.force_login(self.user)
+        for name, args, params in self.public_routes() + self.private_routes():
+            with self.subTest(route=name, params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name, args=args), params)
+                self.assertEqual(response.status_code, 200)
+                scans = self.full_scans(queries.captured_queries)
+                self.assertFalse(scans, "\n".join(f"full scan of {table}: {sql}" for table, sql in scans))
+
+    def test_anonymous_routes_use_indexes(self):
+        for name, args, params in self.public_routes():
+            with self.subTest(route=name, params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(reverse(name, args=args), params)
+                scans = self.full_scans(queries.captured_queries)
+                self.assertFalse(scans, "\n".join(f"full scan of {table}: {sql}" for table, sql in scans))
+
+
+# Seed sizes for the budget suite, e.g. PERF_DESTINATIONS=10000 PERF_VLOGS=1000000
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+SEED_SIZES = {
+    'users': _env_int('PERF_USERS', 50),
+    'destinations': _env_int('PERF_DESTINATIONS', 200),
+    'vlogs': _env_int('PERF_VLOGS', 2000),
+    'reviews': _env_int('PERF_REVIEWS', 2000),
+    'trips': _env_int('PERF_TRIPS', 500),
+}
+SEED_BATCH_SIZE = 2000
+# Multiplies every time budget, for slow CI machines
+TIME_BUDGET_SCALE = float(os.environ.get('PERF_TIME_SCALE', 1))
+REPORT_PATH = os.environ.get('PERF_REPORT', os.path.join(settings.BASE_DIR, 'perf_report.json'))
+
+VLOG_TYPES = [value for value, _ in TravelVlog.VLOG_TYPES]
+
+# name: URL name, method, args/data built from the seeded rows, user is
+# None / 'user' / 'staff', and the budgets for one uncached request
+Route = namedtuple('Route', ['name', 'method', 'args', 'data', 'user', 'max_queries', 'max_ms'])
+
+
+def _batched_create(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == SEED_BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+@override_settings(VLOG_VIEW_FLUSH_INTERVAL=0)
+class QueryBudgetTests(TempMediaRootMixin, TestCase):
+    """Every route answers within a fixed query count and wall time, whatever the data size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        sizes = SEED_SIZES
+        password = make_password('secret')
+        _batched_create(User, (
+            User(username=f'perf{i}', password=password) for i in range(sizes['users'])
+        ))
+        cls.staff = User.objects.create_user('perf-staff', password='secret', is_staff=True)
+        user_ids = list(User.objects.filter(username__startswith='perf').values_list('id', flat=True))
+
+        _batched_create(Destination, (
+            Destination(
+                name=f"Destination {i}", tagline="Sun, sand and temples",
+                description=f"Destination {i} has beaches, forts and markets",
+                type=['Beach', 'Mountain', 'City', 'Heritage'][i % 4], budget=['Low', 'Medium', 'High'][i % 3],
+                best_time='October to March', state_image='https://example.com/image.jpg',
+                stay_cost=2000, food_cost=800, transport_cost=500, activities_cost=1200,
+            )
+            for i in range(sizes['destinations'])
+        ))
+        destination_ids = list(Destination.objects.values_list('id', flat=True))
+        _batched_create(FoodItem, (
+            FoodItem(destination_id=destination_id, dish=f"Dish {n}", price='₹80–150', is_vegetarian=n % 2 == 0)
+            for destination_id in destination_ids
+            for n in range(3)
+        ))
+
+        _batched_create(TravelVlog, (
+            TravelVlog(
+                title=f"Beach hopping {i}", description="A week on the coast",
+                destination_id=destination_ids[i % len(destination_ids)], type=VLOG_TYPES[i % len(VLOG_TYPES)],
+                author_id=user_ids[i % len(user_ids)], views=(i * 7919) % 10007, likes=(i * 104729) % 1009,
+                tags=['beach', f'tag{i % 50}'], featured=i % 10 == 0,
+            )
+            for i in range(sizes['vlogs'])
+        ))
+
+        # One review per (user, destination) pair at most
+        review_count = min(sizes['reviews'], len(user_ids) * len(destination_ids))
+        today = datetime.date.today()
+        _batched_create(Review, (
+            Review(
+                user_id=user_ids[i % len(user_ids)],
+                destination_id=destination_ids[(i // len(user_ids)) % len(destination_ids)],
+                rating=i % 5 + 1, title=f"Review {i}", content="Great beaches and food",
+                visit_date=today, travel_type='Solo', recommended_budget='Medium',
+            )
+            for i in range(review_count)
+        ))
+
+        _batched_create(Trip, (
+            Trip(
+                user_id=user_ids[i % len(user_ids)], destination_id=destination_ids[i % len(destination_ids)],
+                title=f"Trip {i}", start_date=today, end_date=today + datetime.timedelta(days=2),
+                duration_days=3, daily_budget=4000, total_budget=12000, travel_type='solo',
+                interests=['food'], status=['planned', 'completed'][i % 2],
+            )
+            for i in range(sizes['trips'])
+        ))
+        # The budget user gets a full page of trips, with days, and reviews
+        cls.user = User.objects.get(pk=user_ids[0])
+        cls.trip = Trip.objects.filter(user=cls.user).first() or Trip.objects.create(
+            user=cls.user, destination_id=destination_ids[0], title="Trip", start_date=today,
+            end_date=today + datetime.timedelta(days=2), duration_days=3, daily_budget=4000,
+            total_budget=12000, travel_type='solo', interests=['food'],
+        )
+        TripDay.objects.bulk_create([
+            TripDay(trip=cls.trip, day_number=day, title=f"Day {day}", description="", activities=['Walk'])
+            for day in range(1, cls.trip.duration_days + 1)
+        ])
+        UserProfile.objects.create(user=cls.user)
+        cls.review = Review.objects.filter(user=cls.user).first()
+        cls.destination = Destination.objects.get(pk=destination_ids[0])
+        cls.vlog = TravelVlog.objects.filter(destination=cls.destination).first()
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = []
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'seed_sizes': SEED_SIZES,
+            'time_budget_scale': TIME_BUDGET_SCALE,
+            'routes': cls.results,
+        }
+        with open(REPORT_PATH, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+        super().tearDownClass()
+
+    def setUp(self):
+        for alias in ('default', 'views'):
+            caches[alias].clear()
+
+    def routes(self):
+        destination, vlog, trip, review = self.destination, self.vlog, self.trip, self.review
+        capture_id = profiler.add_capture('home:index', '/', 1.0, "1 function calls in 0.001 seconds")
+        open_upload = start_upload(self.user, 'open.mp4', 8, 'video/mp4')
+        ready_upload = start_upload(self.user, 'ready.mp4', 4, 'video/mp4')
+        write_chunk(ready_upload, 0, io.BytesIO(b'clip'), 4)
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'vlogs'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'vlogs', 'budget.mp4'), 'wb') as video:
+            video.write(b'\0' * 1024)
+        return [
+            Route('index', 'get', [], {}, None, 6, 500),
+            Route('logout', 'post', [], {}, 'user', 6, 300),
+            Route('register', 'get', [], {}, None, 2, 300),
+            Route('destinations', 'get', [], {'budget': 'Low', 'sort': 'rating'}, None, 4, 500),
+            Route('destination_detail', 'get', [destination.pk], {}, None, 6, 500),
+            Route('vlogs', 'get', [], {'sort': 'popular', 'type': 'adventure'}, None, 4, 1000),
+            Route('upload_vlog', 'get', [], {}, 'user', 6, 500),
+            Route('vlog_detail', 'get', [vlog.pk], {}, None, 6, 500),
+            Route('edit_vlog', 'get', [vlog.pk], {}, 'staff', 6, 500),
+            Route('profile', 'get', [], {}, 'user', 8, 500),
+            Route('edit_profile', 'get', [], {}, 'user', 6, 300),
+            Route('create_review', 'get', [], {}, 'user', 6, 500),
+            Route('edit_review', 'get', [review.pk], {}, 'user', 6, 500),
+            Route('delete_review', 'get', [review.pk], {}, 'user', 6, 300),
+            Route('contact', 'get', [], {}, None, 2, 300),
+            Route('ai_guide', 'get', [], {}, None, 2, 300),
+            Route('ai_chat', 'post', [], {'message': 'budget tips'}, None, 3, 300),
+            Route('search', 'get', [], {'q': 'beach'}, None, 6, 1000),
+            Route('search_suggest', 'get', [], {'q': 'beach'}, None, 4, 1000),
+            Route('destination_data', 'get', [destination.pk], {}, None, 2, 300),
+            Route('like_vlog', 'post', [vlog.pk], {'action': 'like'}, 'user', 10, 300),
+            Route('create_upload', 'post', [], {
+                'filename': 'trip.mp4', 'size': 1024, 'content_type': 'video/mp4',
+            }, 'user', 4, 300),
+            Route('upload_session', 'get', [open_upload.token], {}, 'user', 4, 300),
+            Route('complete_upload', 'post', [ready_upload.token], {}, 'user', 4, 300),
+            Route('view_cache_stats', 'get', [], {}, 'staff', 4, 300),
+            Route('profiling_stats', 'get', [], {}, 'staff', 4, 300),
+            Route('profiling_capture', 'get', [capture_id], {}, 'staff', 4, 300),
+            Route('destination_feed', 'get', [], {'sort': 'rating', 'count': '1'}, None, 4, 500),
+            Route('vlog_feed', 'get', [], {'sort': 'liked', 'count': '1'}, None, 4, 1000),
+            Route('trip_feed', 'get', [], {}, 'user', 6, 300),
+            Route('trip_planner', 'get', [], {}, 'user', 6, 1000),
+            Route('generate_itinerary', 'post', [], {
+                'destination': destination.pk, 'duration': 5, 'budget': 'Medium', 'interests[]': ['food'],
+            }, 'user', 10, 500),
+            Route('serve_media', 'get', ['vlogs/budget.mp4'], {}, None, 0, 300),
+            Route('my_trips', 'get', [], {}, 'user', 6, 300),
+            Route('trip_detail', 'get', [trip.pk], {}, 'user', 6, 300),
+            Route('mark_trip_completed', 'post', [trip.pk], {}, 'user', 12, 300),
+            Route('create_trip', 'get', [], {}, 'user', 4, 500),
+        ]
+
+    def measure(self, route):
+        if route.user == 'staff':
+            self.client.force_login(self.staff)
+        elif route.user == 'user':
+            self.client.force_login(self.user)
+        else:
+            self.client.logout()
+        path = reverse(f'home:{route.name}', args=route.args)
+        request = getattr(self.client, route.method)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(path, route.data)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return response, len(queries), elapsed_ms
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names - {route.name for route in self.routes()}, set())
+
+    def test_route_budgets(self):
+        for route in self.routes():
+            with self.subTest(route=route.name):
+                response, query_count, elapsed_ms = self.measure(route)
+                max_ms = route.max_ms * TIME_BUDGET_SCALE
+                self.results.append({
+                    'route': route.name,
+                    'method': route.method.upper(),
+                    'status': response.status_code,
+                    'queries': query_count,
+                    'max_queries': route.max_queries,
+                    'wall_ms': round(elapsed_ms, 2),
+                    'max_ms': max_ms,
+                    'passed': query_count <= route.max_queries and elapsed_ms <= max_ms,
+                })
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(query_count, route.max_queries, f"{route.name} ran {query_count} queries")
+                self.assertLessEqual(elapsed_ms, max_ms, f"{route.name} took {elapsed_ms:.0f} ms")
+
+
+class VlogTotalsTests(TestCase):
+    """Cached vlog list totals are refreshed when a vlog is saved or deleted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('vlogger', password='x')
+        cls.destination = make_destination('Goa')
+        cls.vlog = make_vlog(cls.destination, cls.user, views=10, likes=1)
+
+    def setUp(self):
+        # Totals cached by other tests under the same filters
+        caches['default'].clear()
+
+    def totals(self):
+        return get_vlog_totals(TravelVlog.objects.all())
+
+    def test_saving_refreshes_the_totals(self):
+        self.assertEqual(self.totals(), {'total_vlogs': 1, 'total_views': 10, 'total_likes': 1})
+        with self.assertNumQueries(0):
+            self.totals()
+        self.vlog.views = 25
+        self.vlog.save()
+        self.assertEqual(self.totals(), {'total_vlogs': 1, 'total_views': 25, 'total_likes': 1})
+        make_vlog(self.destination, self.user, views=5)
+        self.assertEqual(self.totals(), {'total_vlogs': 2, 'total_views': 30, 'total_likes': 1})
+
+    def test_deleting_refreshes_the_totals(self):
+        self.assertEqual(self.totals()['total_vlogs'], 1)
+        self.vlog.delete()
+        self.assertEqual(self.totals(), {'total_vlogs': 0, 'total_views': 0, 'total_likes': 0})
+
+    def test_an_evicted_version_does_not_revive_old_totals(self):
+        self.assertEqual(self.totals()['total_views'], 10)
+        TravelVlog.objects.update(views=40)
+        caches['default'].delete(stats.VLOG_TOTALS_VERSION_KEY)
+        self.assertEqual(self.totals()['total_views'], 40)
+
+
+class ViewCounterTests(TestCase):
+    """Vlog views are written through or buffered and flushed in batches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('vlogger', password='x')
+        cls.vlog = make_vlog(make_destination('Goa'), cls.user, views=10)
+
+    def setUp(self):
+        # Long enough that no timer fires during a test
+        self.counter = ViewCounter(flush_interval=60)
+        self.addCleanup(self.counter.flush)
+
+    def views(self):
+        return TravelVlog.objects.values_list('views', flat=True).get(pk=self.vlog.pk)
+
+    def view_page(self):
+        return self.client.get(reverse('home:vlog_detail', args=[self.vlog.pk])).context['vlog'].views
+
+    @override_settings(VLOG_VIEW_FLUSH_INTERVAL=0)
+    def test_write_through_counts_the_current_view(self):
+        self.assertEqual(self.view_page(), 11)
+        self.assertEqual(self.view_page(), 12)
+        self.assertEqual(self.views(), 12)
+
+    @override_settings(VLOG_VIEW_FLUSH_INTERVAL=60)
+    def test_buffered_views_are_shown_before_they_are_written(self):
+        self.addCleanup(counters.view_counter.flush)
+        self.assertEqual(self.view_page(), 11)
+        self.assertEqual(self.view_page(), 12)
+        self.assertEqual(self.views(), 10)
+        # The exit hook writes what is still buffered
+        counters._flush_on_exit()
+        self.assertEqual(self.views(), 12)
+        self.assertEqual(counters.view_counter.pending(self.vlog.pk), 0)
+
+    def test_flush_writes_one_update_per_amount(self):
+        other = make_vlog(self.vlog.destination, self.user, views=0)
+        for vlog_id in (self.vlog.pk, self.vlog.pk, other.pk):
+            self.counter.increment(vlog_id)
+        self.assertEqual(self.counter.pending(self.vlog.pk), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries), 2)
+        self.assertEqual(self.views(), 12)
+        self.assertEqual(TravelVlog.objects.get(pk=other.pk).views, 1)
+        self.assertEqual(self.counter.flush(), 0)
+
+    def test_flush_replaces_the_scheduled_timer(self):
+        self.counter.increment(self.vlog.pk)
+        timer = self.counter._timer
+        self.counter.flush()
+        self.assertTrue(timer.finished.is_set())
+        self.counter.increment(self.vlog.pk)
+        self.assertIsNot(self.counter._timer, timer)
+
+    def test_failed_flush_keeps_the_counts(self):
+        self.counter.increment(self.vlog.pk, 3)
+        with mock.patch.object(self.counter, '_write', side_effect=RuntimeError("database is locked")):
+            with self.assertRaises(RuntimeError):
+                self.counter.flush()
+        self.assertEqual(self.counter.pending(self.vlog.pk), 3)
+        self.assertIsNotNone(self.counter._timer)
+        self.counter.flush()
+        self.assertEqual(self.views(), 13)
+
+
+class VlogLikeTests(TestCase):
+    """Liking is idempotent and keeps the like counter in step with the like rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('fan', password='x')
+        cls.vlog = make_vlog(make_destination('Goa'), User.objects.create_user('vlogger', password='x'))
+
+    def test_liking_twice_counts_once(self):
+        self.assertTrue(self.vlog.like(self.user))
+        self.assertFalse(self.vlog.like(self.user))
+        self.assertEqual(self.vlog.likes, 1)
+        self.assertEqual(self.vlog.vlog_likes.count(), 1)
+
+    def test_unliking_without_a_like_is_a_no_op(self):
+        self.assertFalse(self.vlog.unlike(self.user))
+        self.assertEqual(self.vlog.likes, 0)
+        self.vlog.like(self.user)
+        self.assertTrue(self.vlog.unlike(self.user))
+        self.assertFalse(self.vlog.unlike(self.user))
+        self.assertEqual(self.vlog.likes, 0)
+
+    def test_toggling_flips_the_count(self):
+        other = User.objects.create_user('other', password='x')
+        self.vlog.like(other)
+        self.assertTrue(self.vlog.toggle_like(self.user))
+        self.assertEqual(self.vlog.likes, 2)
+        self.assertFalse(self.vlog.toggle_like(self.user))
+        self.assertEqual(self.vlog.likes, 1)
+        self.assertEqual(TravelVlog.objects.get(pk=self.vlog.pk).likes, self.vlog.vlog_likes.count())
+
+    async def test_async_versions(self):
+        self.assertTrue(await self.vlog.alike(self.user))
+        self.assertFalse(await self.vlog.alike(self.user))
+        self.assertFalse(await self.vlog.atoggle_like(self.user))
+        self.assertFalse(await self.vlog.aunlike(self.user))
+        self.assertTrue(await self.vlog.atoggle_like(self.user))
+        self.assertEqual(self.vlog.likes, 1)
+
+
+class SearchIndexTests(TestCase):
+    """The FTS5 triggers keep the indexes in step with inserts, updates and deletes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', password='x')
+        cls.goa = make_destination('Goa', tagline="Sun and sand", description="Beaches and shacks")
+
+    def names(self, query, ranked=True):
+        return [d.name for d in search_destinations(Destination.objects.order_by('name'), query, ranked)]
+
+    def test_inserts_and_updates_are_indexed(self):
+        manali = make_destination('Manali', tagline="Snow peaks", description="Treks and cafes")
+        self.assertEqual(self.names('snow'), ['Manali'])
+        Destination.objects.filter(pk=manali.pk).update(tagline="Apple orchards")
+        self.assertEqual(self.names('snow'), [])
+        self.assertEqual(self.names('apple'), ['Manali'])
+        # Prefix matches, in the queryset's order when unranked
+        self.assertEqual(self.names('bea'), ['Goa'])
+        self.assertEqual(self.names('a', ranked=False), ['Goa', 'Manali'])
+
+    def test_deletes_leave_the_index(self):
+        vlog = make_vlog(self.goa, self.user, title="Surfing lessons", tags=['surf'])
+        review = Review.objects.create(
+            user=self.user, destination=self.goa, rating=5, title="Sunsets", content="Quiet beaches",
+            visit_date=datetime.date(2024, 1, 1), travel_type='Solo', recommended_budget='Low',
+        )
+        self.assertEqual(list(search_vlogs(TravelVlog.objects.all(), 'surf')), [vlog])
+        self.assertEqual(list(search_reviews(Review.objects.all(), 'quiet')), [review])
+        vlog.delete()
+        review.delete()
+        self.assertEqual(list(search_vlogs(TravelVlog.objects.all(), 'surf')), [])
+        self.assertEqual(list(search_reviews(Review.objects.all(), 'quiet')), [])
+        self.assertEqual(VlogSearch.objects.count(), 0)
+
+    def test_ranked_by_bm25(self):
+        make_destination('Varkala', tagline="Beach cliffs", description="Beach beach beach")
+        results = search_destinations(Destination.objects.all(), 'beach')
+        self.assertEqual([d.name for d in results], ['Varkala', 'Goa'])
+        self.assertLess(results[0].search_rank, results[1].search_rank)
+
+    def test_falls_back_without_fts5(self):
+        with mock.patch.object(search, 'sqlite_has_fts5', return_value=False):
+            self.assertFalse(search.fts_enabled())
+            self.assertEqual(self.names('shacks'), ['Goa'])
+
+
+class SuggestTests(TestCase):
+    """Search-as-you-type suggestions follow the destinations and vlogs as they change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('vlogger', password='x')
+        cls.goa = make_destination('Goa')
+        cls.vlog = make_vlog(cls.goa, cls.user, title="Beach hopping", tags=['Beach Shacks'])
+
+    def setUp(self):
+        # Built from other tests' rolled back data
+        suggest_index.load()
+
+    def labels(self, prefix):
+        return [suggestion['label'] for suggestion in suggest_index.suggest(prefix)]
+
+    def test_prefixes_match_any_word_and_tags(self):
+        self.assertEqual(self.labels('Hop'), ["Beach hopping"])
+        self.assertEqual(self.labels('beach'), ["Beach hopping", "Beach Shacks"])
+        self.assertEqual(self.labels('go'), ["Goa"])
+        self.assertEqual(self.labels('  '), [])
+
+    def test_changes_reach_cached_answers(self):
+        self.assertEqual(self.labels('hop'), ["Beach hopping"])
+        self.vlog.title = "Island hopping"
+        self.vlog.save()
+        self.assertEqual(self.labels('hop'), ["Island hopping"])
+        make_destination('Gokarna')
+        self.assertEqual(self.labels('go'), ["Goa", "Gokarna"])
+        self.vlog.delete()
+        self.assertEqual(self.labels('hop'), [])
+        self.assertEqual(self.labels('shacks'), [])
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('home:search_suggest'), {'q': 'goa'})
+        self.assertEqual(response.json()['suggestions'], [
+            {'type': 'destination', 'label': 'Goa', 'url': reverse('home:destination_detail', args=[self.goa.pk])},
+        ])
+
+
+class ItineraryTests(TestCase):
+    """Trip days are planned within the budget and written in one insert"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='x')
+        # Daily cost 4,500, of which activities 1,200 and food 800
+        cls.goa = make_destination('Goa')
+        FoodItem.objects.create(destination=cls.goa, dish='Fish Curry', price='₹300', is_vegetarian=False)
+        FoodItem.objects.create(destination=cls.goa, dish='Veg Thali', price='₹100–200', is_vegetarian=True)
+
+    def setUp(self):
+        get_engine().invalidate()
+
+    def make_trip(self, daily_budget, days=3, **fields):
+        start = datetime.date(2025, 1, 1)
+        values = {'travel_type': 'adventure', 'interests': ['adventure']}
+        values.update(fields)
+        return Trip.objects.create(
+            user=self.user, destination=self.goa, title="Goa trip", start_date=start,
+            end_date=start + datetime.timedelta(days=days - 1), duration_days=days,
+            daily_budget=daily_budget, total_budget=daily_budget * days, **values,
+        )
+
+    def activity_costs(self, days):
+        costs = {activity.name: 1200 * activity.cost_share for activity in ACTIVITY_CATALOG}
+        return [sum(costs.get(item, 0) for item in day['activities']) for day in days]
+
+    def test_days_are_written_in_one_insert(self):
+        trip = self.make_trip(4500, days=5)
+        with CaptureQueriesContext(connection) as queries:
+            days = generate_trip_days(trip)
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([day['day'] for day in days], [1, 2, 3, 4, 5])
+        self.assertEqual(list(trip.days.values_list('title', flat=True)), [day['title'] for day in days])
+
+    def test_low_budgets_shrink_the_activity_allowance(self):
+        # 1,125 of 4,500 a day: a quarter of the 1,200 activity allowance
+        cheap = generate_trip_days(self.make_trip(1125))
+        full = generate_trip_days(self.make_trip(4500))
+        self.assertTrue(all(cost <= 300 for cost in self.activity_costs(cheap)))
+        self.assertTrue(all(cost <= 1200 for cost in self.activity_costs(full)))
+        self.assertGreater(sum(self.activity_costs(full)), sum(self.activity_costs(cheap)))
+        self.assertIn("Trekking and hiking", cheap[0]['activities'])
+
+    def test_vegetarian_trips_get_vegetarian_dishes(self):
+        days = generate_trip_days(self.make_trip(4500, interests=['vegetarian']))
+        dishes = [item for day in days for item in day['activities'] if item.startswith('Try ')]
+        self.assertEqual(set(dishes), {"Try Veg Thali (₹100–200)"})
+
+    def test_destination_and_food_changes_reach_the_engine(self):
+        engine = get_engine()
+        engine.plan_days(self.make_trip(4500))
+        self.assertIn(self.goa.pk, engine._tables)
+        self.goa.activities_cost = 0
+        self.goa.save()
+        self.assertNotIn(self.goa.pk, engine._tables)
+        self.assertEqual(engine.get_table(self.goa).activities_cost, 0)
+
+        FoodItem.objects.create(destination=self.goa, dish='Bebinca', price='₹50', is_vegetarian=True)
+        self.assertNotIn(self.goa.pk, engine._tables)
+        days = engine.plan_days(self.make_trip(4500, interests=['vegetarian']))
+        self.assertIn("Try Bebinca (₹50)", [item for _, _, activities in days for item in activities])
+
+    def post_itinerary(self):
+        self.client.force_login(self.user)
+        return self.client.post(reverse('home:generate_itinerary'), {
+            'destination': self.goa.pk, 'duration': 3, 'budget': 'Medium', 'interests[]': ['food'],
+        }).json()
+
+    def test_itinerary_view_saves_the_trip_with_its_days(self):
+        data = self.post_itinerary()
+        self.assertTrue(data['success'])
+        self.assertEqual(Trip.objects.get(pk=data['trip_id']).days.count(), 3)
+
+    def test_trip_is_not_kept_when_its_days_fail(self):
+        with mock.patch.object(TripDay.objects, 'bulk_create', side_effect=RuntimeError("disk full")):
+            data = self.post_itinerary()
+        self.assertFalse(data['success'])
+        self.assertFalse(Trip.objects.exists())
+
+
+class DestinationFilterTests(TestCase):
+    """Destination list filters ignore values they cannot use"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_destination('Goa', average_rating=Decimal('4.50'), review_count=2)
+        make_destination('Manali', average_rating=Decimal('3.00'), review_count=1)
+
+    def setUp(self):
+        caches['views'].clear()
+
+    def names(self, **params):
+        response = self.client.get(reverse('home:destinations'), params)
+        self.assertEqual(response.status_code, 200)
+        return [destination.name for destination in response.context['destinations']]
+
+    def test_min_rating(self):
+        self.assertEqual(self.names(min_rating='4'), ['Goa'])
+        self.assertEqual(self.names(min_rating='3.0'), ['Goa', 'Manali'])
+
+    def test_invalid_min_rating_is_ignored(self):
+        for value in ('nan', 'NaN', 'Infinity', '-inf', 'snan', 'abc', '-1', '6', '1e400'):
+            with self.subTest(min_rating=value):
+                self.assertEqual(self.names(min_rating=value), ['Goa', 'Manali'])
+
+
+class ProfileStatsTests(TestCase):
+    """Profile trip and review stats follow the Trip and Review writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', password='x')
+        cls.goa = make_destination('Goa')
+        cls.manali = make_destination('Manali')
+
+    def make_trip(self, user=None, status='planned'):
+        start = datetime.date(2025, 1, 1)
+        return Trip.objects.create(
+            user=user or self.user, destination=self.goa, title="Goa trip", start_date=start, end_date=start,
+            duration_days=1, daily_budget=3000, total_budget=3000, travel_type='solo', status=status,
+        )
+
+    def make_review(self, rating, destination=None):
+        return Review.objects.create(
+            user=self.user, destination=destination or self.goa, rating=rating, title="Trip", content="Fun",
+            visit_date=datetime.date(2025, 1, 1), travel_type='Solo', recommended_budget='Low',
+        )
+
+    def stats(self, user=None):
+        return UserProfile.objects.values_list('trips_taken', 'total_reviews', 'rating_sum', 'average_rating').get(
+            user=user or self.user
+        )
+
+    def test_new_profiles_start_from_existing_data(self):
+        self.make_trip(status='completed')
+        self.make_trip()
+        self.make_review(4)
+        self.make_review(5, self.manali)
+        UserProfile.objects.create(user=self.user)
+        self.assertEqual(self.stats(), (1, 2, 9, Decimal('4.50')))
+
+    def test_review_changes_adjust_the_stats(self):
+        UserProfile.objects.create(user=self.user)
+        review = self.make_review(4)
+        self.make_review(3, self.manali)
+        self.assertEqual(self.stats(), (0, 2, 7, Decimal('3.50')))
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.stats(), (0, 2, 4, Decimal('2.00')))
+
+        other = User.objects.create_user('friend', password='x')
+        UserProfile.objects.create(user=other)
+        review.user = other
+        review.save()
+        self.assertEqual(self.stats(), (0, 1, 3, Decimal('3.00')))
+        self.assertEqual(self.stats(other), (0, 1, 1, Decimal('1.00')))
+        review.delete()
+        self.assertEqual(self.stats(other), (0, 0, 0, Decimal('0.00')))
+
+    def test_only_completed_trips_are_taken(self):
+        UserProfile.objects.create(user=self.user)
+        trip = self.make_trip()
+        self.assertEqual(self.stats()[0], 0)
+        trip.status = 'completed'
+        trip.save()
+        self.assertEqual(self.stats()[0], 1)
+        trip.status = 'cancelled'
+        trip.save()
+        self.assertEqual(self.stats()[0], 0)
+        self.make_trip(status='completed').delete()
+        self.assertEqual(self.stats()[0], 0)
+
+    def test_profile_page(self):
+        self.make_trip(status='completed')
+        self.make_trip()
+        self.make_review(4)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home:profile'))
+        self.assertContains(response, "Trips Planned")
+        self.assertContains(response, "Destinations Visited")
+        self.assertEqual(len(response.context['trips']), 2)
+        self.assertEqual(response.context['trips_count'], 2)
+        self.assertEqual(response.context['reviews_count'], 1)
+
+
+class PageCacheTests(TestCase):
+    """Cached anonymous pages pick up counters written with update()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('fan', password='x')
+        cls.goa = make_destination('Goa')
+        cls.vlog = make_vlog(cls.goa, cls.user, views=10)
+
+    def setUp(self):
+        caches['views'].clear()
+
+    def feed(self):
+        return self.client.get(reverse('home:vlog_feed')).json()['results'][0]
+
+    def test_likes_reach_the_cached_list(self):
+        self.assertEqual(self.feed()['likes'], 0)
+        with self.assertNumQueries(0):
+            self.feed()
+        self.vlog.like(self.user)
+        self.assertEqual(self.feed()['likes'], 1)
+        self.vlog.unlike(self.user)
+        self.assertEqual(self.feed()['likes'], 0)
+
+    def test_view_flushes_keep_the_cached_list(self):
+        self.assertEqual(self.feed()['views'], 10)
+        counter = ViewCounter(flush_interval=60)
+        counter.increment(self.vlog.pk, 5)
+        counter.flush()
+        # Counts catch up when the page expires, not on every flush
+        with self.assertNumQueries(0):
+            self.assertEqual(self.feed()['views'], 10)
+        caches['views'].clear()
+        self.assertEqual(self.feed()['views'], 15)
+
+    def test_ratings_reach_the_cached_destination_list(self):
+        def rating():
+            response = self.client.get(reverse('home:destination_feed'))
+            return response.json()['results'][0]['average_rating']
+
+        self.assertEqual(Decimal(str(rating())), 0)
+        Destination.adjust_rating(self.goa.pk, 1, 4)
+        self.assertEqual(Decimal(str(rating())), 4)
+
+        # No review is behind that rating; reconciling takes it back out of the cached page
+        call_command('reconcile_destination_ratings', stdout=io.StringIO())
+        self.assertEqual(Decimal(str(rating())), 0)
+
+    def test_reconciled_likes_reach_the_cached_list(self):
+        TravelVlog.objects.update(likes=7)
+        self.assertEqual(self.feed()['likes'], 7)
+        call_command('reconcile_vlog_likes', stdout=io.StringIO())
+        self.assertEqual(self.feed()['likes'], 0)
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages walk every row once in both directions, ties included"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('vlogger', password='x')
+        goa = make_destination('Goa')
+        # Ties on views and on the upload date are broken by id
+        for views in (5, 5, 5, 3, 3, 1, 0):
+            make_vlog(goa, user, views=views)
+
+    def walk(self, ordering, per_page=2):
+        paginator = CursorPaginator(TravelVlog.objects.all(), ordering, per_page)
+        pages, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([vlog.pk for vlog in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        # And back from the last page
+        back = [pages[-1]]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            back.insert(0, [vlog.pk for vlog in page])
+        return pages, back
+
+    def test_walks_forward_and_back(self):
+        for ordering in (['-views', '-id'], ['views', 'id'], ['upload_date', 'id'], ['-upload_date', '-id']):
+            with self.subTest(ordering=ordering):
+                expected = list(TravelVlog.objects.order_by(*ordering).values_list('pk', flat=True))
+                pages, back = self.walk(ordering)
+                self.assertEqual([pk for page in pages for pk in page], expected)
+                self.assertEqual(back, pages)
+                self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_feed_cursors(self):
+        response = self.client.get(reverse('home:vlog_feed'), {'sort': 'popular', 'count': '1'})
+        data = response.json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual([vlog['views'] for vlog in data['results']], [5, 5, 5, 3, 3, 1, 0])
+        self.assertIsNone(data['next_cursor'])
+        self.assertIsNone(data['previous_cursor'])
+
+    def test_tampered_cursors_are_not_found(self):
+        paginator = CursorPaginator(TravelVlog.objects.all(), ['-views', '-id'], 2)
+        valid = paginator.page().next_cursor
+        for cursor in ('garbage', valid[:-2], paginator.encode_cursor([5], 'n'),
+                       paginator.encode_cursor([5, 1], 'x'), paginator.encode_cursor(['many', 1], 'n')):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('home:vlog_feed'), {'sort': 'popular', 'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('home:vlog_feed'), {'sort': 'popular', 'cursor': valid})
+        self.assertEqual([vlog['views'] for vlog in response.json()['results']], [5, 3, 3, 1, 0])
+
+
+class SeedDataTests(TestCase):
+    def test_generated_timestamps_are_kept(self):
+        call_command('seed_data', users=5, destinations=4, vlogs=30, trips=10, reviews=30, stdout=io.StringIO())
+        today = timezone.now().date()
+        for model, field in ((TravelVlog, 'upload_date'), (Trip, 'created_at'), (Review, 'created_at')):
+            with self.subTest(model=model.__name__):
+                dates = [value if field == 'upload_date' else timezone.localtime(value).date()
+                         for value in model.objects.values_list(field, flat=True)]
+                self.assertTrue(dates)
+                self.assertLess(min(dates), today)
+                self.assertTrue(model._meta.get_field(field).auto_now_add)
+
+    def test_like_counts_match_the_like_rows(self):
+        call_command('seed_data', users=5, destinations=4, vlogs=30, trips=0, reviews=0, stdout=io.StringIO())
+        self.assertTrue(TravelVlog.objects.filter(likes__gt=0).exists())
+        counted = TravelVlog.objects.annotate(rows=Count('vlog_likes')).filter(likes=F('rows')).count()
+        self.assertEqual(counted, 30)
+        self.assertLessEqual(max(TravelVlog.objects.values_list('likes', flat=True)), 5)
+
+    def test_conflicting_reviews_keep_their_timestamp(self):
+        user = User.objects.create_user('seeder')
+        goa = make_destination('Goa')
+        created_at = timezone.now() - datetime.timedelta(days=30)
+        Review.objects.bulk_create([Review(user=user, destination=goa, rating=4, title='t', content='c',
+                                           visit_date=created_at.date(), travel_type='Solo')])
+        Review.objects.update(created_at=created_at)
+        again = Review(user=user, destination=goa, rating=2, title='t', content='c',
+                       visit_date=created_at.date(), travel_type='Solo', created_at=created_at - datetime.timedelta(days=5))
+        Seeder(0, 'Seed', 1.1, 10).write(Review, [again], timestamp='created_at',
+                                         key=('user', 'destination'), ignore_conflicts=True)
+        self.assertEqual(Review.objects.get().created_at, created_at)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['views'].clear()
+        profiler.reset()
+        self.addCleanup(profiler.reset)
+        self.goa = make_destination('Goa')
+        self.staff = User.objects.create_user('staff', is_staff=True)
+
+    def assertTimed(self, response, route):
+        self.assertEqual(re.findall(r'(\w+);dur=[\d.]+', response['Server-Timing']), ['total', 'db', 'tpl', 'app'])
+        queries = int(re.search(r'desc="(\d+) queries', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+        stats = profiler.snapshot()['routes'][route]
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(stats['queries_mean'], queries)
+
+    def test_sync_views_are_timed(self):
+        response = self.client.get(reverse('home:destination_detail', args=[self.goa.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTimed(response, 'home:destination_detail')
+        self.assertGreater(profiler.snapshot()['routes']['home:destination_detail']['template_ms_mean'], 0)
+        self.assertNotIn('X-Profile-Capture', response)
+
+    async def test_async_views_are_timed(self):
+        response = await self.async_client.get(reverse('home:destination_data', args=[self.goa.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTimed(response, 'home:destination_data')
+
+    async def test_staff_can_force_a_capture(self):
+        url = reverse('home:destination_data', args=[self.goa.pk])
+        response = await self.async_client.get(url, {'_profile': 1})
+        self.assertNotIn('X-Profile-Capture', response)
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(url, {'_profile': 1})
+        capture = profiler.get_capture(int(response['X-Profile-Capture']))
+        self.assertEqual(capture['route'], 'home:destination_data')
+
+
+# The client thread uses its own connection, which only sees committed rows. One
+# thread: the shared in-memory test database reports "table is locked" rather
+# than waiting on concurrent writers
+class LoadTestTests(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['views'].clear()
+        user = User.objects.create_user('loadtester')
+        for name in ('Goa', 'Manali', 'Jaipur'):
+            make_vlog(make_destination(name), user)
+
+    def test_wsgi_driver_runs_every_endpoint(self):
+        load_test = LoadTest(driver='wsgi', concurrency=1, requests=40, warmup=5, users=1, seed=1)
+        summary = load_test.run().summary()
+        self.assertEqual(summary['requests'], 40)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(set(summary['endpoints']), set(DEFAULT_MIX))
+        self.assertGreater(sum(row['queries_per_request'] for row in summary['endpoints'].values()), 0)
+        # The logged-in sessions it made are gone again
+        self.assertFalse(Session.objects.exists())
+
+
+class SqlitePragmaTests(TestCase):
+    def test_wal_is_opt_in(self):
+        self.assertNotIn('journal_mode', db.get_pragmas())
+        self.assertNotIn('synchronous', db.get_pragmas())
+        with self.settings(SQLITE_WAL=True):
+            pragmas = db.get_pragmas()
+        self.assertEqual((pragmas['journal_mode'], pragmas['synchronous']), ('WAL', 'NORMAL'))
+        self.assertEqual(pragmas['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+@override_settings(VIDEO_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TempMediaRootMixin, TestCase):
+    """The resumable upload protocol, from opening a session to attaching the file to a vlog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('uploader', password='x')
+        cls.destination = make_destination('Goa')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def open_upload(self, content):
+        response = self.client.post(reverse('home:create_upload'), {
+            'filename': '../My Trip.mp4', 'size': len(content), 'content_type': 'video/mp4',
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()['upload']
+
+    def put_chunk(self, token, content, start, checksum=None):
+        end = start + len(content) - 1
+        headers = {'Content-Range': f'bytes {start}-{end}/{self.size}'}
+        headers['X-Chunk-SHA256'] = checksum or hashlib.sha256(content).hexdigest()
+        return self.client.put(
+            reverse('home:upload_session', args=[token]), content,
+            content_type='application/octet-stream', headers=headers,
+        )
+
+    def test_interrupted_upload_resumes_from_last_chunk(self):
+        content = b'safar-vlog'
+        self.size = len(content)
+        upload = self.open_upload(content)
+        self.assertEqual(self.put_chunk(upload['token'], content[:4], 0).json()['upload']['received'], 4)
+
+        # The connection drops halfway through the second chunk
+        session = VlogUpload.objects.get(token=upload['token'])
+        with self.assertRaises(UploadError):
+            write_chunk(session, 4, io.BytesIO(content[4:6]), 4)
+        self.assertEqual(part_path(session).stat().st_size, 4)
+
+        status = self.client.get(reverse('home:upload_session', args=[upload['token']])).json()['upload']
+        self.assertEqual(status['received'], 4)
+        self.assertEqual(self.put_chunk(upload['token'], content[4:8], 4).status_code, 200)
+        self.assertEqual(self.put_chunk(upload['token'], content[8:], 8).status_code, 200)
+
+        response = self.client.post(reverse('home:complete_upload', args=[upload['token']]))
+        self.assertEqual(response.json()['upload']['status'], 'complete')
+        session.refresh_from_db()
+        self.assertRegex(session.file, r'^vlogs/My_Trip(_\w+)?\.mp4$')
+        self.assertFalse(part_path(session).exists())
+        with open(os.path.join(settings.MEDIA_ROOT, session.file), 'rb') as assembled:
+            self.assertEqual(assembled.read(), content)
+
+    def test_bad_chunks_are_rejected(self):
+        content = b'12345678'
+        self.size = len(content)
+        upload = self.open_upload(content)
+        response = self.put_chunk(upload['token'], content[:4], 0, checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['upload']['received'], 0)
+        # Out of order: the server answers with the offset to resume from
+        response = self.put_chunk(upload['token'], content[4:], 4)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['upload']['received'], 0)
+        response = self.client.post(reverse('home:complete_upload', args=[upload['token']]))
+        self.assertEqual(response.status_code, 409)
+
+    def test_other_users_cannot_see_an_upload(self):
+        self.size = 4
+        upload = self.open_upload(b'abcd')
+        self.client.force_login(User.objects.create_user('someone', password='x'))
+        response = self.client.get(reverse('home:upload_session', args=[upload['token']]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_vlog_form_takes_the_upload_token(self):
+        content = b'abcd'
+        self.size = len(content)
+        upload = self.open_upload(content)
+        self.put_chunk(upload['token'], content, 0)
+        self.client.post(reverse('home:complete_upload', args=[upload['token']]))
+
+        response = self.client.post(reverse('home:upload_vlog'), {
+            'title': 'Goa by scooter', 'description': 'Beaches', 'destination': self.destination.pk,
+            'type': 'adventure', 'tags': 'beach', 'upload_token': upload['token'],
+        })
+        self.assertEqual(response.status_code, 302)
+        vlog = TravelVlog.objects.get(title='Goa by scooter')
+        session = VlogUpload.objects.get(token=upload['token'])
+        self.assertEqual(session.vlog, vlog)
+        self.assertEqual(vlog.video_file.name, session.file)
+
+
+class MediaServingTests(TempMediaRootMixin, TestCase):
+    """Byte ranges and conditional requests on uploaded media"""
+
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'vlogs'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'vlogs', 'clip.mp4'), 'wb') as video:
+            video.write(self.content)
+        self.url = reverse('home:serve_media', args=['vlogs/clip.mp4'])
+
+    def get(self, url=None, **headers):
+        response = self.client.get(url or self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+
+    def test_byte_ranges(self):
+        response, body = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(self.get(Range='bytes=1000-')[1], self.content[1000:])
+        self.assertEqual(self.get(Range='bytes=-24')[1], self.content[-24:])
+
+        response, _ = self.get(Range='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_conditional_requests(self):
+        response, _ = self.get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get(If_None_Match=etag)[0].status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=last_modified)[0].status_code, 304)
+        # A Range for an older version of the file gets the whole current file
+        response, body = self.get(Range='bytes=0-9', If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag)[0].status_code, 206)
+
+    def test_private_and_missing_files_are_not_served(self):
+        upload = start_upload(User.objects.create_user('uploader', password='x'), 'a.mp4', 4)
+        partial = os.path.relpath(part_path(upload), settings.MEDIA_ROOT)
+        self.assertEqual(self.get(reverse('home:serve_media', args=[partial]))[0].status_code, 404)
+        self.assertEqual(self.get(reverse('home:serve_media', args=['vlogs/missing.mp4']))[0].status_code, 404)
+        self.assertEqual(self.get(reverse('home:serve_media', args=['../settings.py']))[0].status_code, 404)
+
+
+class VideoJobTests(TempMediaRootMixin, TestCase):
+    """Uploads queue a processing job; workers claim jobs one at a time and record the outcome"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='x')
+        cls.destination = make_destination('Goa')
+
+    def make_vlog(self, name='vlogs/clip.mp4'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TravelVlog.objects.create(
+                title='Goa', description='Beaches', destination=self.destination,
+                type='adventure', author=self.user, video_file=name,
+            )
+
+    def test_saving_a_video_queues_one_job(self):
+        vlog = self.make_vlog()
+        self.assertEqual(list(vlog.video_jobs.values_list('source', 'status')), [('vlogs/clip.mp4', 'queued')])
+        # Saving without a new file queues nothing; replacing the file does
+        with self.captureOnCommitCallbacks(execute=True):
+            vlog.title = 'Goa again'
+            vlog.save()
+        self.assertEqual(vlog.video_jobs.count(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            vlog.video_file = 'vlogs/other.mp4'
+            vlog.save()
+        self.assertEqual(vlog.video_jobs.filter(status='queued').count(), 2)
+
+    def test_jobs_are_claimed_once(self):
+        vlog = self.make_vlog()
+        job = claim('worker-1')
+        self.assertEqual((job.vlog, job.status, job.attempts), (vlog, 'running', 1))
+        self.assertIsNone(claim('worker-2'))
+
+        # A worker that died leaves its job running until the timeout puts it back
+        VideoJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim('worker-2').pk, job.pk)
+
+    @override_settings(VIDEO_JOB_MAX_ATTEMPTS=2)
+    def test_stale_jobs_out_of_attempts_fail(self):
+        self.make_vlog()
+        job = claim('worker')
+        VideoJob.objects.filter(pk=job.pk).update(attempts=2, started_at=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', "The worker stopped answering"))
+
+    @override_settings(FFMPEG_BINARY='/nonexistent/ffmpeg')
+    def test_jobs_are_skipped_without_ffmpeg(self):
+        vlog = self.make_vlog()
+        run_job(claim('worker'))
+        self.assertEqual(vlog.video_jobs.get().status, 'skipped')
+        vlog.refresh_from_db()
+        self.assertIsNone(vlog.duration)
+
+    def test_replaced_files_are_not_processed(self):
+        vlog = self.make_vlog()
+        job = claim('worker')
+        TravelVlog.objects.filter(pk=vlog.pk).update(video_file='vlogs/newer.mp4')
+        job.vlog.refresh_from_db()
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.vlog.renditions, {})
+
+    def test_vlogs_deleted_while_processing_leave_no_files(self):
+        vlog = self.make_vlog()
+        job = claim('worker')
+
+        def process_then_delete(vlog):
+            default_storage.save(f'vlogs/derived/{vlog.pk}/poster.jpg', ContentFile(b'jpeg'))
+            TravelVlog.objects.filter(pk=vlog.pk).delete()
+            return {'duration': '00:03'}
+
+        with mock.patch('home.video.process_vlog', process_then_delete):
+            run_job(job)
+        self.assertFalse(VideoJob.objects.exists())
+        self.assertFalse(default_storage.exists(f'vlogs/derived/{vlog.pk}'))
+
+    def test_jobs_deleted_while_claimed_are_passed_over(self):
+        vlog = self.make_vlog()
+        default_storage.save(f'vlogs/derived/{vlog.pk}/poster.jpg', ContentFile(b'jpeg'))
+        select_related = VideoJob.objects.select_related
+
+        def delete_first(*fields):
+            TravelVlog.objects.filter(pk=vlog.pk).delete()
+            return select_related(*fields)
+
+        with mock.patch.object(VideoJob.objects, 'select_related', delete_first):
+            self.assertIsNone(claim('worker'))
+        self.assertFalse(default_storage.exists(f'vlogs/derived/{vlog.pk}'))
+
+    def test_workers_outlive_crashing_jobs(self):
+        self.make_vlog()
+        self.make_vlog('vlogs/second.mp4')
+        with mock.patch('home.video.run_job', side_effect=RuntimeError("boom")), \
+                self.assertLogs('home.video', 'ERROR') as logs:
+            pool = WorkerPool(burst=True)
+            pool.work(0)
+        self.assertEqual(pool.processed, 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertFalse(VideoJob.objects.filter(status='queued').exists())
+
+    @override_settings(VIDEO_JOB_TIMEOUT=0)
+    def test_workers_requeue_crashed_jobs_while_polling(self):
+        self.make_vlog()
+        pool = WorkerPool(poll_interval=0, burst=True)
+        with mock.patch('home.video.run_job', side_effect=RuntimeError("boom")), \
+                self.assertLogs('home.video', 'ERROR'):
+            pool.work(0)
+        # Retried until out of attempts, then failed rather than queued again
+        job = VideoJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(pool.processed, 3)
+
+    @skipUnless(binary('ffmpeg') and binary('ffprobe'), "needs ffmpeg and ffprobe")
+    @override_settings(VIDEO_RENDITIONS=((360, '400k'),))
+    def test_processing_fills_in_the_vlog(self):
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'vlogs'))
+        subprocess.run([
+            binary('ffmpeg'), '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=duration=3:size=640x480:rate=10',
+            '-pix_fmt', 'yuv420p', os.path.join(settings.MEDIA_ROOT, 'vlogs', 'clip.mp4'),
+        ], check=True)
+        vlog = self.make_vlog()
+        run_job(claim('worker'))
+        vlog.refresh_from_db()
+        self.assertEqual(vlog.video_jobs.get().status, 'done')
+        self.assertEqual(vlog.duration, '00:03')
+        self.assertTrue(vlog.thumbnail.endswith('poster.jpg'))
+        self.assertEqual(list(vlog.renditions), ['360'])
+        self.assertEqual(vlog.get_video_sources()[0][1], 360)
+
+
+class AssistantTests(TestCase):
+    """The AI guide answers from the destinations, dishes and reviews in the database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.goa = make_destination('Goa', type='Beach, Honeymoon', best_time='October to March', bad_time='Monsoon')
+        cls.manali = make_destination('Manali', type='Mountain', best_time='March to June', stay_cost=900)
+        FoodItem.objects.create(destination=cls.goa, dish='Fish Curry', price='₹300', is_vegetarian=False)
+        FoodItem.objects.create(destination=cls.goa, dish='Veg Thali', price='₹150', is_vegetarian=True)
+
+    def setUp(self):
+        # Snapshots from other tests' rolled back data
+        assistant.invalidate()
+
+    def test_matcher_prefers_the_longest_phrase(self):
+        matcher = Matcher({'veg': [('diet', 'veg')], 'non veg': [('diet', 'nonveg')], 'goa': [('place', 1)]})
+        self.assertEqual(matcher.find('non veg food in goa'.split()), [('diet', 'nonveg'), ('place', 1)])
+        self.assertEqual(matcher.find('veg in goa'.split()), [('diet', 'veg'), ('place', 1)])
+
+    def test_grounded_answers(self):
+        self.assertEqual(assistant.reply("Veg food in Goa?"), "Try these vegetarian dishes in Goa: Veg Thali (₹150).")
+        self.assertIn("Goa (₹4,500/day)", assistant.reply("Cheapest destination in winter"))
+        self.assertNotIn("Manali", assistant.reply("Cheapest destination in winter"))
+        self.assertTrue(assistant.reply("Is Goa good in the monsoon?").startswith("Monsoon is not a good time for Goa."))
+        self.assertIn("Manali", assistant.reply("mountain trip under 5k"))
+
+    def test_replies_follow_data_changes(self):
+        self.assertIn("don't know any vegetarian dishes in Manali", assistant.reply("veg food in manali"))
+        FoodItem.objects.create(destination=self.manali, dish='Siddu', price='₹80', is_vegetarian=True)
+        self.assertEqual(assistant.reply("veg food in manali"), "Try these vegetarian dishes in Manali: Siddu (₹80).")
+
+    def test_chat_endpoint(self):
+        response = self.client.post(reverse('home:ai_chat'), {'message': 'How much does Manali cost?'})
+        self.assertIn("A day in Manali costs about ₹3,400", response.json()['response'])
+        with self.assertNumQueries(0):
+            self.client.post(reverse('home:ai_chat'), {'message': 'how much does manali cost'})
+
+    def test_changes_during_a_reload_are_not_lost(self):
+        load = Knowledge.load
+
+        def load_with_a_concurrent_save():
+            knowledge = load()
+            # The save must not wait for this reload, nor be overwritten by it
+            saver = threading.Thread(target=assistant.invalidate)
+            saver.start()
+            saver.join(5)
+            self.assertFalse(saver.is_alive())
+            return knowledge
+
+        with mock.patch.object(Knowledge, 'load', side_effect=load_with_a_concurrent_save):
+            assistant.knowledge()
+        self.assertFalse(assistant.loaded)
+        self.assertIn("Goa", assistant.reply("Cheapest destination in winter"))
+        self.assertTrue(assistant.loaded)
+
+
+@skipUnless(semantic.available(), "needs NumPy")
+class SemanticSearchTests(TestCase):
+    """The semantic index finds what keywords miss and is rebuilt incrementally"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        index_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        cls.enterClassContext(override_settings(SEMANTIC_INDEX_DIR=index_dir))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reviewer', password='x')
+        cls.hideaway = make_destination('Gokarna', description="A secluded shore for honeymoon trips")
+        cls.city = make_destination('Mumbai', description="Busy markets, nightlife and street food")
+
+    def test_search_finds_related_words(self):
+        semantic.semantic_index.build()
+        response = self.client.get(reverse('home:search'), {'q': 'quiet beach for couples'})
+        self.assertEqual(response.context['results']['destinations'], [self.hideaway])
+
+    def test_builds_only_embed_changes(self):
+        self.assertEqual(semantic.semantic_index.build(full=True)['added'], 2)
+        Review.objects.create(
+            user=self.user, destination=self.city, rating=4, title='Loud', content='Crowded but fun',
+            visit_date=datetime.date(2024, 1, 1), travel_type='Solo', recommended_budget='Low',
+        )
+        Destination.objects.filter(pk=self.city.pk).update(description="Quiet sea views")
+        self.assertEqual(
+            semantic.semantic_index.build(),
+            {'added': 1, 'updated': 1, 'removed': 0, 'unchanged': 1},
+        )
+        self.assertEqual(semantic.semantic_index.search('calm ocean', semantic.DESTINATION, 1)[0][0], self.city.pk)
+        self.city.delete()
+        self.assertEqual(semantic.semantic_index.build()['removed'], 2)
+        self.assertEqual(semantic.semantic_index.search('calm ocean', semantic.DESTINATION)[0][0], self.hideaway.pk)
+
+
+@skipUnless(recommend.available(), "needs NumPy")
+class RecommendationTests(TestCase):
+    """Home page recommendations follow the profile, favorites and reviews"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', password='x')
+        cls.profile = UserProfile.objects.create(user=cls.user, preferred_budget='Low', travel_types=['family'])
+        cls.cheap_family = make_destination('Puri', type='Family, Beach', budget='Low')
+        cls.luxury_family = make_destination('Udaipur', type='Family, Heritage', budget='High')
+        cls.cheap_trek = make_destination('Kasol', type='Mountain, Adventure', budget='Low')
+        cls.other_trek = make_destination('Bir', type='Mountain, Adventure', budget='Low')
+
+    def setUp(self):
+        recommender.invalidate()
+
+    def test_profile_preferences_rank_destinations(self):
+        self.assertEqual(recommender.for_user(self.user.pk, 2), [self.cheap_family.pk, self.luxury_family.pk])
+        self.profile.travel_types = ['adventure']
+        self.profile.save()
+        self.assertEqual(set(recommender.for_user(self.user.pk, 2)), {self.cheap_trek.pk, self.other_trek.pk})
+
+    def test_favorites_and_reviews_are_not_recommended_again(self):
+        self.profile.favorite_destinations.add(self.cheap_family)
+        Review.objects.create(
+            user=self.user, destination=self.luxury_family, rating=5, title='Lovely', content='Lakes',
+            visit_date=datetime.date(2024, 1, 1), travel_type='Family', recommended_budget='High',
+        )
+        recommended = recommender.for_user(self.user.pk)
+        self.assertNotIn(self.cheap_family.pk, recommended)
+        self.assertNotIn(self.luxury_family.pk, recommended)
+
+    def test_co_favorites_break_ties(self):
+        other = UserProfile.objects.create(user=User.objects.create_user('friend', password='x'))
+        other.favorite_destinations.add(self.cheap_family, self.other_trek)
+        recommender.invalidate()
+        self.profile.favorite_destinations.add(self.cheap_family)
+        self.profile.travel_types = []
+        self.profile.save()
+        recommended = recommender.for_user(self.user.pk)
+        self.assertLess(recommended.index(self.other_trek.pk), recommended.index(self.cheap_trek.pk))
+
+    def test_home_page_shows_recommendations(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home:index'))
+        self.assertContains(response, "Recommended for You")
+        self.assertEqual(response.context['featured_destinations'][0], self.cheap_family)
+
+
+class TrendingTests(TestCase):
+    """sort=trending favours recent activity over lifetime totals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('vlogger', password='x')
+        destination = make_destination('Goa')
+        cls.classic, cls.rising = [
+            TravelVlog.objects.create(
+                title=title, description="A week on the coast", destination=destination,
+                type='adventure', author=user, views=views, likes=likes,
+            )
+            for title, views, likes in [("All-time favourite", 5000, 300), ("New this week", 40, 2)]
+        ]
+        # Uploaded a year ago; update() skips auto_now_add
+        TravelVlog.objects.filter(pk=cls.classic.pk).update(upload_date=datetime.date.today() - datetime.timedelta(days=365))
+
+    def trending_titles(self):
+        response = self.client.get(reverse('home:vlog_feed'), {'sort': 'trending'})
+        return [vlog['title'] for vlog in response.json()['results']]
+
+    def test_recent_activity_outranks_lifetime_totals(self):
+        update_scores()
+        self.assertEqual(self.trending_titles(), ["New this week", "All-time favourite"])
+        # A burst of views on the old vlog since the last update brings it back up
+        TravelVlog.objects.filter(pk=self.classic.pk).update(views=F('views') + 500)
+        update_scores()
+        self.assertEqual(self.trending_titles(), ["All-time favourite", "New this week"])
+
+    def test_scores_decay_between_updates(self):
+        now = timezone.now()
+        update_scores(now=now)
+        first = TravelVlog.objects.get(pk=self.rising.pk).trending_score
+        update_scores(now=now + datetime.timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS))
+        self.assertAlmostEqual(TravelVlog.objects.get(pk=self.rising.pk).trending_score, first / 2, places=3)
@@ -0,0 +1,118 @@
+"""Time-decayed trending ranking for travel vlogs.
+
+``views`` and ``likes`` are lifetime counters, so sorting by them keeps the
+same old vlogs on top forever. A trending score instead weighs what happened
+recently. Each vlog carries exponentially decayed view and like counts: on
+every update the previous value is scaled by ``0.5 ** (elapsed / half_life)``
+and the views and likes gained since the last update (the counters minus
+``trending_seen_*``) are added on top. That needs no per-hit history, only the
+counters the site already keeps, and it is an exact exponential decay over
+the update interval. A freshness term that halves over the same half-life
+gives new uploads a chance before they have an audience:
+
+    score = w_views * decayed_views + w_likes * decayed_likes + w_fresh * 0.5 ** (age / half_life)
+
+Scores are materialized into the indexed ``trending_score`` column by
+``manage.py update_trending_scores``, which is meant to run every few
+minutes from cron. Listing vlogs with ``sort=trending`` is then one indexed
+``ORDER BY`` like the other sorts, with no scoring on the request path.
+
+The first update of a vlog has no history to go on, so its lifetime counts
+are decayed as if they all came in on its upload date.
+"""
+from datetime import datetime, time as datetime_time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cache as view_cache
+from .models import TravelVlog
+
+DEFAULT_HALF_LIFE_HOURS = 48
+DEFAULT_WEIGHTS = {'views': 1.0, 'likes': 10.0, 'fresh': 50.0}
+BATCH_SIZE = 1000
+
+FIELDS = [
+    'trending_score', 'trending_views', 'trending_likes',
+    'trending_seen_views', 'trending_seen_likes', 'trending_updated_at',
+]
+
+
+def half_life():
+    """Half-life of views, likes and freshness, in seconds"""
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS) * 3600
+
+
+def decay(seconds):
+    """What one unit is worth after ``seconds``"""
+    return 0.5 ** (max(seconds, 0) / half_life())
+
+
+def uploaded_at(upload_date):
+    return timezone.make_aware(datetime.combine(upload_date, datetime_time.min))
+
+
+def rescore(vlog, now, weights):
+    """Decay ``vlog``'s counts up to ``now``, add what is new and set its score"""
+    age = (now - uploaded_at(vlog.upload_date)).total_seconds()
+    if vlog.trending_updated_at is None:
+        factor = decay(age)
+        vlog.trending_views = vlog.views * factor
+        vlog.trending_likes = vlog.likes * factor
+    else:
+        factor = decay((now - vlog.trending_updated_at).total_seconds())
+        # Likes can be taken back and counters reconciled down; never below zero
+        vlog.trending_views = max(vlog.trending_views * factor + vlog.views - vlog.trending_seen_views, 0)
+        vlog.trending_likes = max(vlog.trending_likes * factor + vlog.likes - vlog.trending_seen_likes, 0)
+    vlog.trending_seen_views = vlog.views
+    vlog.trending_seen_likes = vlog.likes
+    vlog.trending_updated_at = now
+    vlog.trending_score = (
+        weights['views'] * vlog.trending_views
+        + weights['likes'] * vlog.trending_likes
+        + weights['fresh'] * decay(age)
+    )
+    return vlog
+
+
+def _update_statement():
+    table = connection.ops.quote_name(TravelVlog._meta.db_table)
+    columns = ', '.join(f'{connection.ops.quote_name(field)} = %s' for field in FIELDS)
+    return f'UPDATE {table} SET {columns} WHERE id = %s'
+
+
+def update_scores(batch_size=BATCH_SIZE, now=None):
+    """Rescore every vlog in primary key batches; returns how many were scored"""
+    now = now or timezone.now()
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+    statement = _update_statement()
+    last_id = 0
+    scored = 0
+    while True:
+        batch = list(
+            TravelVlog.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .only('pk', 'views', 'likes', 'upload_date', *FIELDS)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        rows = []
+        for vlog in batch:
+            rescore(vlog, now, weights)
+            rows.append([
+                TravelVlog._meta.get_field(field).get_db_prep_save(getattr(vlog, field), connection)
+                for field in FIELDS
+            ] + [vlog.pk])
+        # One prepared UPDATE per row; bulk_update spends far longer building its CASE expressions
+        # than SQLite spends writing. Only the trending columns are written, so view and like
+        # increments landing meanwhile are kept
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(statement, rows)
+        scored += len(batch)
+
+    if scored:
+        # Raw updates send no signals; the trending list pages are stale now
+        view_cache.invalidate('vlogs')
+    return scored
@@ -0,0 +1,212 @@
+"""Chunked, resumable vlog video uploads.
+
+A client opens an upload session with the file name and size, then sends the
+file in order as raw ``PUT`` bodies of at most ``chunk_size`` bytes, each
+with its byte offset and, optionally, the SHA-256 of the chunk. Chunks are
+streamed from the request straight into a partial file next to
+``MEDIA_ROOT`` and fsynced, so neither the upload handlers nor the view ever
+hold a chunk in memory. The session's ``received`` offset only moves forward
+once a chunk is on disk and matches its checksum; an interrupted upload
+asks for the session and resumes from that offset, and whatever a failed
+chunk left behind is cut off before the next write.
+
+Completing the session checks the size (and the whole-file SHA-256 when the
+client gave one) and renames the partial file into ``vlogs/``, so a 500MB
+video is never copied. Storages without local paths get a streamed copy
+instead. The finished session is then handed to ``VlogUploadForm`` in place
+of a ``video_file``.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import VlogUpload
+
+DEFAULT_MAX_SIZE = 500 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+STREAM_BLOCK_SIZE = 64 * 1024
+UPLOAD_TO = 'vlogs/'
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A request the upload session cannot accept; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_size():
+    return getattr(settings, 'VIDEO_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def chunk_size():
+    return getattr(settings, 'VIDEO_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def upload_dir():
+    return Path(getattr(settings, 'VIDEO_UPLOAD_DIR', Path(settings.MEDIA_ROOT) / 'vlog_uploads'))
+
+
+def part_path(upload):
+    """The partial file of an upload session"""
+    return upload_dir() / f'{upload.token.hex}.part'
+
+
+def parse_content_range(header):
+    """``bytes 0-1023/4096`` -> (0, 1023, 4096)"""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError("Chunks need a 'Content-Range: bytes start-end/size' header.")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError("Content-Range ends before it starts.")
+    return start, end, total
+
+
+def _check_sha256(value):
+    value = (value or '').strip().lower()
+    if value and not SHA256_RE.match(value):
+        raise UploadError("Checksums must be hex SHA-256 digests.")
+    return value
+
+
+def start_upload(user, filename, size, content_type='', sha256=''):
+    """Open an upload session for a file of ``size`` bytes"""
+    filename = os.path.basename((filename or '').replace('\\', '/'))
+    if not filename:
+        raise UploadError("A file name is required.")
+    if content_type and not content_type.startswith('video/'):
+        raise UploadError("Invalid file type. Please upload a video.")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("The file size must be a number of bytes.")
+    if size <= 0:
+        raise UploadError("The file is empty.")
+    if size > max_size():
+        raise UploadError(f"Video file too large (max {max_size() // (1024 * 1024)}MB).")
+
+    upload = VlogUpload.objects.create(
+        user=user, filename=filename[:255], size=size,
+        chunk_size=chunk_size(), sha256=_check_sha256(sha256),
+    )
+    upload_dir().mkdir(parents=True, exist_ok=True)
+    part_path(upload).touch()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length, sha256=''):
+    """Append ``length`` bytes read from ``stream`` at ``offset``; returns the new offset"""
+    if upload.status != 'open':
+        raise UploadError("The upload is already complete.", status=409)
+    if offset != upload.received:
+        raise UploadError(f"Expected the chunk at offset {upload.received}.", status=409)
+    if length <= 0 or length > upload.chunk_size:
+        raise UploadError(f"Chunks must be between 1 and {upload.chunk_size} bytes.")
+    if offset + length > upload.size:
+        raise UploadError("The chunk runs past the end of the file.")
+    expected = _check_sha256(sha256)
+
+    path = part_path(upload)
+    digest = hashlib.sha256()
+    written = 0
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, 'r+b') as part:
+        # Drop whatever an interrupted chunk left past the last good offset
+        part.truncate(offset)
+        part.seek(offset)
+        while written < length:
+            block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            digest.update(block)
+            part.write(block)
+            written += len(block)
+        if written != length:
+            part.truncate(offset)
+            raise UploadError(f"Received {written} of {length} bytes.")
+        if expected and digest.hexdigest() != expected:
+            part.truncate(offset)
+            raise UploadError("The chunk does not match its checksum.")
+        part.flush()
+        os.fsync(part.fileno())
+
+    # Only the writer that still sees the expected offset moves it forward
+    moved = VlogUpload.objects.filter(pk=upload.pk, status='open', received=offset).update(
+        received=offset + length, updated_at=timezone.now(),
+    )
+    if not moved:
+        upload.refresh_from_db(fields=['received', 'status'])
+        raise UploadError(f"Expected the chunk at offset {upload.received}.", status=409)
+    upload.received = offset + length
+    return upload.received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload):
+    """Verify the received file and move it into vlog storage; returns the storage name"""
+    if upload.status == 'complete':
+        return upload.file
+    if upload.received != upload.size:
+        raise UploadError(f"Received {upload.received} of {upload.size} bytes.", status=409)
+    path = part_path(upload)
+    if not path.exists() or path.stat().st_size != upload.size:
+        raise UploadError("The partial file is missing or truncated; start the upload again.", status=410)
+    if upload.sha256 and file_sha256(path) != upload.sha256:
+        raise UploadError("The file does not match its checksum; start the upload again.")
+
+    name = default_storage.get_available_name(UPLOAD_TO + get_valid_filename(upload.filename))
+    try:
+        target = Path(default_storage.path(name))
+    except NotImplementedError:
+        # Remote storage: stream the file across in the storage's own chunks
+        with open(path, 'rb') as part:
+            name = default_storage.save(name, File(part))
+        path.unlink()
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+
+    upload.status = 'complete'
+    upload.file = name
+    upload.save(update_fields=['status', 'file', 'updated_at'])
+    return name
+
+
+def abort_upload(upload):
+    """Forget an upload that no vlog uses, with its partial or assembled file"""
+    if upload.status == 'open':
+        part_path(upload).unlink(missing_ok=True)
+    elif upload.vlog_id is None and upload.file:
+        default_storage.delete(upload.file)
+    upload.delete()
+
+
+def purge_stale_uploads(older_than):
+    """Remove uploads untouched since ``older_than`` that no vlog uses; returns how many"""
+    stale = list(VlogUpload.objects.filter(
+        Q(status='open') | Q(status='complete', vlog__isnull=True),
+        updated_at__lt=older_than,
+    ))
+    for upload in stale:
+        abort_upload(upload)
+    return len(stale)
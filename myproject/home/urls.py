@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -42,8 +43,21 @@ urlpatterns = [
     path('search/', views.search, name='search'),
 
     # AJAX endpoints
+    path('api/search/suggest/', views.search_suggest, name='search_suggest'),
     path('api/destinations/<int:destination_id>/', views.get_destination_data, name='destination_data'),
     path('api/vlogs/<int:vlog_id>/like/', views.like_vlog, name='like_vlog'),
+    path('api/uploads/', views.create_upload, name='create_upload'),
+    path('api/uploads/<uuid:token>/', views.upload_session, name='upload_session'),
+    path('api/uploads/<uuid:token>/complete/', views.complete_upload, name='complete_upload'),
+    path('api/cache-stats/', views.view_cache_stats, name='view_cache_stats'),
+    path('api/profiling/', views.profiling_stats, name='profiling_stats'),
+    path('api/profiling/<int:capture_id>/', views.profiling_capture, name='profiling_capture'),
+    path('api/destinations/', views.DestinationListView.as_view(json_feed=True), name='destination_feed'),
+    path('api/vlogs/', views.VlogListView.as_view(json_feed=True), name='vlog_feed'),
+    path('api/trips/', views.TripListView.as_view(json_feed=True), name='trip_feed'),
+
+    # Uploaded media, with Range support
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", views.serve_media, name='serve_media'),
 
     # Trip planning views
     path('trip-planner/', views.trip_planner, name='trip_planner'),
@@ -0,0 +1,318 @@
+"""Background processing of uploaded vlog videos.
+
+Saving a vlog with a new ``video_file`` queues a ``VideoJob`` row once the
+transaction commits; that insert is all the upload request pays for. The
+queue is the database table itself, so no broker is needed: workers started
+with ``manage.py video_worker`` claim the oldest queued job with a
+conditional ``UPDATE`` (only one worker can flip a row from queued to
+running) and run it in a pool of threads, which spend their time waiting on
+ffmpeg subprocesses.
+
+A job probes the video with ffprobe for its duration and size, grabs a
+poster frame for ``thumbnail`` (unless the author set one), tiles evenly
+spaced frames into a sprite sheet for scrubbing previews, and encodes H.264
+renditions at the ``VIDEO_RENDITIONS`` heights below the source height. The
+results are saved to storage under ``vlogs/derived/<vlog id>/`` and written
+to the vlog in one ``save(update_fields=...)``, so the usual signals drop the
+cached pages.
+
+Without ffmpeg on the path jobs are marked ``skipped`` rather than failed.
+Failed jobs are retried up to ``VIDEO_JOB_MAX_ATTEMPTS`` times. Workers
+check every poll interval for jobs left running for ``VIDEO_JOB_TIMEOUT``
+seconds, by a crash or a dead worker, and queue them again under the same
+limit.
+Deleting a vlog deletes its jobs; a worker that finds its job gone removes
+the files it derived for that vlog, and a job that crashes is logged without
+taking its worker thread down.
+"""
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TravelVlog, VideoJob
+
+DEFAULT_RENDITIONS = ((720, '2500k'), (480, '1000k'), (360, '600k'))
+DEFAULT_TIMEOUT = 60 * 60
+DEFAULT_MAX_ATTEMPTS = 3
+SPRITE_COLUMNS = 5
+SPRITE_ROWS = 5
+SPRITE_TILE_WIDTH = 160
+POSTER_WIDTH = 640
+DERIVED_DIR = 'vlogs/derived'
+
+logger = logging.getLogger(__name__)
+
+
+class SkipJob(Exception):
+    """The job cannot run in this environment; not worth retrying"""
+
+
+# ffmpeg
+
+def binary(name):
+    """Path of ffmpeg or ffprobe, from FFMPEG_BINARY / FFPROBE_BINARY or the PATH"""
+    configured = getattr(settings, f'{name.upper()}_BINARY', name)
+    return shutil.which(configured)
+
+
+def timeout():
+    return getattr(settings, 'VIDEO_JOB_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def max_attempts():
+    return getattr(settings, 'VIDEO_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+
+def run(args):
+    result = subprocess.run(args, capture_output=True, timeout=timeout())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()[-2000:])
+    return result.stdout
+
+
+def probe(path):
+    """(duration in seconds, width, height) of the first video stream"""
+    output = run([
+        binary('ffprobe'), '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'format=duration:stream=width,height', '-of', 'json', path,
+    ])
+    info = json.loads(output)
+    stream = (info.get('streams') or [{}])[0]
+    return float(info['format']['duration']), int(stream.get('width', 0)), int(stream.get('height', 0))
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+def make_poster(path, out, duration):
+    run([
+        binary('ffmpeg'), '-v', 'error', '-y', '-ss', f'{duration * 0.1:.2f}', '-i', path,
+        '-frames:v', '1', '-vf', f'scale={POSTER_WIDTH}:-2', out,
+    ])
+
+
+def make_sprite(path, out, duration):
+    frames = SPRITE_COLUMNS * SPRITE_ROWS
+    run([
+        binary('ffmpeg'), '-v', 'error', '-y', '-i', path,
+        '-vf', f'fps={frames / max(duration, 1):.6f},scale={SPRITE_TILE_WIDTH}:-2,tile={SPRITE_COLUMNS}x{SPRITE_ROWS}',
+        '-frames:v', '1', out,
+    ])
+
+
+def make_rendition(path, out, height, bitrate):
+    run([
+        binary('ffmpeg'), '-v', 'error', '-y', '-i', path,
+        # yuv420p: browsers do not play the 4:4:4 H.264 libx264 picks for some sources
+        '-vf', f'scale=-2:{height}', '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+        '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate,
+        '-c:a', 'aac', '-b:a', '96k', '-movflags', '+faststart', out,
+    ])
+
+
+def _store(local_path, name):
+    default_storage.delete(name)
+    with open(local_path, 'rb') as derived:
+        return default_storage.save(name, File(derived))
+
+
+def process_vlog(vlog):
+    """Probe and derive files for ``vlog.video_file``; returns the field updates"""
+    if not binary('ffmpeg') or not binary('ffprobe'):
+        raise SkipJob("ffmpeg and ffprobe were not found")
+    source = vlog.video_file.path
+    duration, width, height = probe(source)
+    prefix = f'{DERIVED_DIR}/{vlog.pk}'
+    updates = {'duration': format_duration(duration)}
+
+    with tempfile.TemporaryDirectory() as work:
+        poster = os.path.join(work, 'poster.jpg')
+        make_poster(source, poster, duration)
+        poster_name = _store(poster, f'{prefix}/poster.jpg')
+        if not vlog.thumbnail:
+            updates['thumbnail'] = default_storage.url(poster_name)
+
+        sprite = os.path.join(work, 'sprite.jpg')
+        make_sprite(source, sprite, duration)
+        updates['sprite'] = _store(sprite, f'{prefix}/sprite.jpg')
+
+        renditions = {}
+        for rendition_height, bitrate in getattr(settings, 'VIDEO_RENDITIONS', DEFAULT_RENDITIONS):
+            if height and rendition_height >= height:
+                continue
+            out = os.path.join(work, f'{rendition_height}p.mp4')
+            make_rendition(source, out, rendition_height, bitrate)
+            renditions[str(rendition_height)] = _store(out, f'{prefix}/{rendition_height}p.mp4')
+        updates['renditions'] = renditions
+    return updates
+
+
+def delete_derived(vlog_id):
+    """Remove the files ``process_vlog`` stored for a vlog"""
+    prefix = f'{DERIVED_DIR}/{vlog_id}'
+    try:
+        _, files = default_storage.listdir(prefix)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f'{prefix}/{name}')
+    default_storage.delete(prefix)
+
+
+# Queue
+
+def enqueue(vlog):
+    """Queue processing of the vlog's current video file, unless it already is"""
+    job, _ = VideoJob.objects.get_or_create(vlog=vlog, source=vlog.video_file.name, status='queued')
+    return job
+
+
+def requeue_stale():
+    """Put back running jobs whose worker stopped answering; returns how many
+
+    A job that has used up its attempts is failed instead, so one that keeps
+    crashing its worker is not retried forever.
+    """
+    now = timezone.now()
+    stale = VideoJob.objects.filter(status='running', started_at__lt=now - timedelta(seconds=timeout()))
+    with transaction.atomic():
+        stale.filter(attempts__gte=max_attempts()).update(
+            status='failed', error="The worker stopped answering", finished_at=now,
+        )
+        return stale.update(status='queued')
+
+
+def claim(worker):
+    """Take the oldest queued job for ``worker``, or None when the queue is empty"""
+    while True:
+        queued = VideoJob.objects.filter(status='queued').order_by('id').values_list('id', 'vlog_id').first()
+        if queued is None:
+            return None
+        job_id, vlog_id = queued
+        claimed = VideoJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            try:
+                return VideoJob.objects.select_related('vlog').get(pk=job_id)
+            except VideoJob.DoesNotExist:
+                # The vlog was deleted in between, and its jobs with it
+                delete_derived(vlog_id)
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    if not VideoJob.objects.filter(pk=job.pk).update(status=status, error=error, finished_at=job.finished_at):
+        raise VideoJob.DoesNotExist(f"Video job {job.pk} was deleted")
+
+
+def run_job(job):
+    """Process one claimed job and record the outcome"""
+    try:
+        _run_job(job)
+    except (TravelVlog.DoesNotExist, VideoJob.DoesNotExist):
+        # The vlog was deleted while it was processed, taking the job with it
+        delete_derived(job.vlog_id)
+
+
+def _run_job(job):
+    vlog = job.vlog
+    if vlog.video_file.name != job.source:
+        # Replaced since it was queued; the new file has its own job
+        return _finish(job, 'done', "The video file changed before processing")
+    try:
+        updates = process_vlog(vlog)
+    except SkipJob as exc:
+        return _finish(job, 'skipped', str(exc))
+    except Exception as exc:
+        return _finish(job, 'queued' if job.attempts < max_attempts() else 'failed', f"{type(exc).__name__}: {exc}")
+
+    with transaction.atomic():
+        vlog = TravelVlog.objects.select_for_update().get(pk=vlog.pk)
+        if vlog.video_file.name == job.source:
+            for field, value in updates.items():
+                setattr(vlog, field, value)
+            vlog.save(update_fields=list(updates))
+        _finish(job, 'done')
+
+
+class WorkerPool:
+    """``threads`` workers claiming jobs until stopped, or until the queue is empty in burst mode"""
+
+    def __init__(self, threads=2, poll_interval=5.0, burst=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+        self.next_requeue = 0.0
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+
+    def requeue(self):
+        """``requeue_stale`` at most once per poll interval across the pool's threads"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.next_requeue:
+                return
+            self.next_requeue = now + self.poll_interval
+        requeue_stale()
+
+    def work(self, number):
+        worker = f'{self.name}:{number}'
+        try:
+            while not self.stopping.is_set():
+                self.requeue()
+                job = claim(worker)
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                try:
+                    run_job(job)
+                except Exception:
+                    # Keep the thread; requeue_stale retries or fails the job once it times out
+                    logger.exception("Video job %s crashed", job.pk)
+                with self.lock:
+                    self.processed += 1
+        finally:
+            connections.close_all()
+
+    def run(self):
+        workers = [threading.Thread(target=self.work, args=(n,), daemon=True) for n in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(0.5)
+        except KeyboardInterrupt:
+            self.stopping.set()
+            for worker in workers:
+                worker.join()
+        return self.processed
+
+    def stop(self):
+        self.stopping.set()
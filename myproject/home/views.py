@@ -1,20 +1,40 @@
+from asgiref.sync import sync_to_async
+from django import forms
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.forms import UserCreationForm
-from django.db.models import Q, Avg, Count
+from django.db.models import Count
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_safe
+from django.conf import settings
 from .models import (
     Destination, FoodItem, TravelVlog, UserProfile,
-    Trip, TripDay, Review, ContactMessage
+    Trip, TripDay, Review, ContactMessage, VlogUpload
 )
 from .forms import TripForm, ReviewForm, ContactForm, UserProfileForm, VlogUploadForm
+from .stats import get_vlog_totals, ainvalidate_vlog_totals
+from .counters import view_counter
+from .search import search_destinations, search_vlogs, search_reviews
+from .suggest import suggest_index, DEFAULT_LIMIT
+from .itinerary import create_trip_with_days
+from .cache import cached_view
+from .pagination import CursorPaginationMixin
+from . import cache as view_cache, uploads
+from .profiling import profiler
+from .media import media_response
+from .assistant import assistant
+from .semantic import semantic_index, hybrid_search, DESTINATION, VLOG, REVIEW
+from .recommend import recommender
 
 
 def custom_logout(request):
@@ -37,14 +57,21 @@ def register(request):
 
 
 # Home Page View
+@cached_view('index', tags=('index',))
 def index(request):
     """Home page with featured destinations and vlogs"""
-    featured_destinations = Destination.objects.all()[:6]
-    featured_vlogs = TravelVlog.objects.filter(featured=True)[:4]
+    featured_destinations = []
+    if request.user.is_authenticated:
+        featured_destinations = recommender.destinations_for(request.user.pk, 6)
+    recommended = bool(featured_destinations)
+    if not recommended:
+        featured_destinations = Destination.objects.all()[:6]
+    featured_vlogs = TravelVlog.objects.filter(featured=True).select_related('author')[:4]
     recent_reviews = Review.objects.select_related('user', 'destination').order_by('-created_at')[:3]
 
     context = {
         'featured_destinations': featured_destinations,
+        'recommended': recommended,
         'featured_vlogs': featured_vlogs,
         'recent_reviews': recent_reviews,
     }
@@ -52,25 +79,34 @@ def index(request):
 
 
 # Destination Views
-class DestinationListView(ListView):
+@method_decorator(
+    cached_view('destinations', tags=('destinations',), params=('q', 'budget', 'type', 'min_rating', 'sort', 'cursor', 'count')),
+    name='dispatch'
+)
+class DestinationListView(CursorPaginationMixin, ListView):
     """List all destinations with search and filtering"""
     model = Destination
     template_name = 'home/destinations.html'
     context_object_name = 'destinations'
     paginate_by = 12
 
+    # Sort param -> keyset ordering, always ending in a unique column
+    sort_orderings = {
+        'name': ['name', 'id'],
+        'rating': ['-average_rating', '-review_count', 'name', 'id'],
+    }
+
+    min_rating_field = forms.DecimalField(min_value=0, max_value=5)
+
     def get_queryset(self):
         queryset = super().get_queryset()
         search_query = self.request.GET.get('q')
         budget_filter = self.request.GET.get('budget')
         type_filter = self.request.GET.get('type')
+        min_rating = self.request.GET.get('min_rating')
 
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(tagline__icontains=search_query)
-            )
+            queryset = search_destinations(queryset, search_query, ranked=False)
 
         if budget_filter:
             queryset = queryset.filter(budget=budget_filter)
@@ -78,16 +114,43 @@ class DestinationListView(ListView):
         if type_filter:
             queryset = queryset.filter(type__icontains=type_filter)
 
-        return queryset
+        if min_rating:
+            # Rejects 'nan', 'Infinity' and out of range values, which are ignored
+            try:
+                queryset = queryset.filter(average_rating__gte=self.min_rating_field.clean(min_rating))
+            except ValidationError:
+                pass
+
+        return queryset.order_by(*self.get_cursor_ordering())
+
+    def get_cursor_ordering(self):
+        sort_by = self.request.GET.get('sort', 'name')
+        return self.sort_orderings.get(sort_by, self.sort_orderings['name'])
+
+    def serialize_object(self, destination):
+        return {
+            'id': destination.pk,
+            'name': destination.name,
+            'tagline': destination.tagline,
+            'type': destination.type,
+            'budget': destination.budget,
+            'average_rating': destination.average_rating,
+            'review_count': destination.review_count,
+            'image': destination.state_image,
+            'url': reverse('home:destination_detail', args=[destination.pk]),
+        }
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
         context['budget_filter'] = self.request.GET.get('budget', '')
         context['type_filter'] = self.request.GET.get('type', '')
+        context['min_rating'] = self.request.GET.get('min_rating', '')
+        context['sort_by'] = self.request.GET.get('sort', 'name')
         return context
 
 
+@method_decorator(cached_view('destination_detail', tags=('destination:{pk}',)), name='dispatch')
 class DestinationDetailView(DetailView):
     """Detailed view of a destination"""
     model = Destination
@@ -96,14 +159,14 @@ class DestinationDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        destination = self.get_object()
+        destination = self.object
 
         # Get related data
         context['food_items'] = destination.food_items.all()
-        context['vlogs'] = destination.vlogs.all()[:6]
+        context['vlogs'] = destination.vlogs.select_related('author')[:6]
         context['reviews'] = destination.reviews.select_related('user').order_by('-created_at')[:5]
-        context['average_rating'] = destination.reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        context['review_count'] = destination.reviews.count()
+        context['average_rating'] = destination.average_rating
+        context['review_count'] = destination.review_count
 
         # Calculate costs
         context['total_daily_cost'] = destination.get_total_daily_cost()
@@ -112,26 +175,37 @@ class DestinationDetailView(DetailView):
 
 
 # Travel Vlog Views
-class VlogListView(ListView):
+@method_decorator(
+    cached_view('vlogs', tags=('vlogs',), params=('q', 'type', 'destination', 'sort', 'cursor', 'count')),
+    name='dispatch'
+)
+class VlogListView(CursorPaginationMixin, ListView):
     """List all travel vlogs with filtering"""
     model = TravelVlog
     template_name = 'home/vlogs.html'
     context_object_name = 'vlogs'
     paginate_by = 12
+    approximate_count = True
+
+    # Sort param -> keyset ordering, always ending in a unique column
+    sort_orderings = {
+        'latest': ['-upload_date', '-id'],
+        'popular': ['-views', '-id'],
+        'liked': ['-likes', '-id'],
+        # Materialized by manage.py update_trending_scores (see home/trending.py)
+        'trending': ['-trending_score', '-id'],
+        'oldest': ['upload_date', 'id'],
+    }
 
-    def get_queryset(self):
+    def get_filtered_queryset(self):
+        """Apply the search and filter params, without sorting"""
         queryset = super().get_queryset().select_related('destination', 'author')
         search_query = self.request.GET.get('q')
         type_filter = self.request.GET.get('type')
         destination_filter = self.request.GET.get('destination')
-        sort_by = self.request.GET.get('sort', 'latest')
 
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(tags__icontains=search_query)
-            )
+            queryset = search_vlogs(queryset, search_query, ranked=False)
 
         if type_filter:
             queryset = queryset.filter(type=type_filter)
@@ -139,50 +213,71 @@ class VlogListView(ListView):
         if destination_filter:
             queryset = queryset.filter(destination__name__icontains=destination_filter)
 
-        # Sorting
-        if sort_by == 'popular':
-            queryset = queryset.order_by('-views')
-        elif sort_by == 'liked':
-            queryset = queryset.order_by('-likes')
-        elif sort_by == 'oldest':
-            queryset = queryset.order_by('upload_date')
-        else:  # latest
-            queryset = queryset.order_by('-upload_date')
-
         return queryset
 
+    def get_cursor_ordering(self):
+        sort_by = self.request.GET.get('sort', 'latest')
+        return self.sort_orderings.get(sort_by, self.sort_orderings['latest'])
+
+    def get_queryset(self):
+        return self.get_filtered_queryset().order_by(*self.get_cursor_ordering())
+
+    def serialize_object(self, vlog):
+        return {
+            'id': vlog.pk,
+            'title': vlog.title,
+            'type': vlog.type,
+            'destination': vlog.destination.name,
+            'author': vlog.author.username,
+            'views': vlog.views,
+            'likes': vlog.likes,
+            'upload_date': vlog.upload_date,
+            'featured': vlog.featured,
+            'url': reverse('home:vlog_detail', args=[vlog.pk]),
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        search_query = self.request.GET.get('q', '')
+        type_filter = self.request.GET.get('type', '')
+        destination_filter = self.request.GET.get('destination', '')
         context.update({
-            'search_query': self.request.GET.get('q', ''),
-            'type_filter': self.request.GET.get('type', ''),
-            'destination_filter': self.request.GET.get('destination', ''),
+            'search_query': search_query,
+            'type_filter': type_filter,
+            'destination_filter': destination_filter,
             'sort_by': self.request.GET.get('sort', 'latest'),
-            'total_vlogs': self.get_queryset().count(),
-            'total_views': sum(vlog.views for vlog in self.get_queryset()),
-            'total_likes': sum(vlog.likes for vlog in self.get_queryset()),
         })
+        if not self.json_feed:
+            context.update(get_vlog_totals(
+                self.get_filtered_queryset(), search_query, type_filter, destination_filter
+            ))
         return context
 
 
 class VlogDetailView(DetailView):
     """Detailed view of a vlog"""
     model = TravelVlog
+    queryset = TravelVlog.objects.select_related('destination', 'author')
     template_name = 'home/vlog_detail.html'
     context_object_name = 'vlog'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        vlog = self.get_object()
+        vlog = self.object
 
-        # Increment view count
-        vlog.views += 1
-        vlog.save(update_fields=['views'])
+        # Increment view count; the counter writes it back in batches. Buffered hits, this
+        # one included, are not in the row yet; a written-through hit is, but after it was read
+        view_counter.increment(vlog.pk)
+        vlog.views += view_counter.pending(vlog.pk) if view_counter.flush_interval > 0 else 1
 
         # Get related vlogs
         context['related_vlogs'] = TravelVlog.objects.filter(
             destination=vlog.destination
         ).exclude(id=vlog.id)[:4]
+        context['user_liked'] = (
+            self.request.user.is_authenticated
+            and vlog.vlog_likes.filter(user=self.request.user).exists()
+        )
 
         return context
 
@@ -194,6 +289,9 @@ class VlogCreateView(LoginRequiredMixin, CreateView):
     template_name = 'home/vlog_form.html'
     success_url = reverse_lazy('home:vlogs')
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'user': self.request.user}
+
     def form_valid(self, form):
         form.instance.author = self.request.user
         messages.success(self.request, 'Vlog uploaded successfully!')
@@ -207,6 +305,9 @@ class VlogUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'home/vlog_form.html'
     success_url = reverse_lazy('home:vlogs')
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'user': self.request.user}
+
     def test_func(self):
         # Only allow staff/admin users to edit
         return self.request.user.is_staff
@@ -230,6 +331,9 @@ class VlogCreateView(LoginRequiredMixin, CreateView):
     template_name = 'home/vlog_form.html'
     success_url = reverse_lazy('home:vlogs')
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'user': self.request.user}
+
     def form_valid(self, form):
         form.instance.author = self.request.user
         messages.success(self.request, 'Vlog uploaded successfully!')
@@ -243,6 +347,9 @@ class VlogUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'home/vlog_form.html'
     success_url = reverse_lazy('home:vlogs')
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'user': self.request.user}
+
     def test_func(self):
         # Only allow staff/admin users to edit
         return self.request.user.is_staff
@@ -273,7 +380,7 @@ def trip_planner(request):
 
 
 @login_required
-def generate_itinerary(request):
+async def generate_itinerary(request):
     """AJAX view to generate trip itinerary"""
     if request.method == 'POST':
         destination_id = request.POST.get('destination')
@@ -296,11 +403,12 @@ def generate_itinerary(request):
         interests = request.POST.getlist('interests[]')
 
         try:
-            destination = Destination.objects.get(id=destination_id)
+            user = await request.auser()
+            destination = await Destination.objects.aget(id=destination_id)
 
-            # Create trip
-            trip = Trip.objects.create(
-                user=request.user,
+            # Create the trip and its days in one transaction, which the async ORM cannot open
+            trip, trip_days = await sync_to_async(create_trip_with_days)(
+                user=user,
                 destination=destination,
                 title=f"{travel_type.title()} Trip to {destination.name}",
                 start_date=timezone.now().date(),
@@ -312,19 +420,6 @@ def generate_itinerary(request):
                 status='planned'
             )
 
-            # Generate itinerary days
-            generate_trip_days(trip)
-
-            # Serialize trip days for frontend
-            trip_days = []
-            for day in trip.days.all():
-                trip_days.append({
-                    'day': day.day_number,
-                    'title': day.title,
-                    'description': day.description,
-                    'activities': day.activities
-                })
-
             return JsonResponse({
                 'success': True,
                 'trip_id': trip.id,
@@ -344,62 +439,28 @@ def generate_itinerary(request):
     return JsonResponse({'success': False, 'message': 'Invalid request'})
 
 
-def generate_trip_days(trip):
-    """Generate sample itinerary for trip days"""
-    activities = {
-        'family': [
-            "Visit local temples and cultural sites",
-            "Enjoy traditional cuisine at local restaurants",
-            "Relax at beaches/resorts",
-            "Shopping at local markets",
-            "Nature walks and sightseeing"
-        ],
-        'solo': [
-            "Explore hidden gems and local spots",
-            "Try adventure activities",
-            "Visit cafes and work remotely",
-            "Cultural immersion activities",
-            "Photography and journaling"
-        ],
-        'couple': [
-            "Romantic dinners and sunsets",
-            "Spa treatments and relaxation",
-            "Private boat rides or tours",
-            "Photography sessions",
-            "Local festival participation"
-        ],
-        'adventure': [
-            "Trekking and hiking",
-            "Water sports and activities",
-            "Wildlife safaris",
-            "Camping experiences",
-            "Extreme sports"
-        ]
-    }
-
-    base_activities = activities.get(trip.travel_type, activities['family'])
-
-    for day in range(1, trip.duration_days + 1):
-        day_activities = base_activities[:3]  # 3 activities per day
-
-        TripDay.objects.create(
-            trip=trip,
-            day_number=day,
-            title=f"Day {day} in {trip.destination.name}",
-            description=f"Explore the beauty of {trip.destination.name}",
-            activities=day_activities
-        )
-
-
-class TripListView(LoginRequiredMixin, ListView):
+class TripListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """List user's trips"""
     model = Trip
     template_name = 'home/my_trips.html'
     context_object_name = 'trips'
     paginate_by = 10
+    cursor_ordering = ['-created_at', '-id']
 
     def get_queryset(self):
-        return Trip.objects.filter(user=self.request.user).prefetch_related('destination')
+        return Trip.objects.filter(user=self.request.user).select_related('destination')
+
+    def serialize_object(self, trip):
+        return {
+            'id': trip.pk,
+            'title': trip.title,
+            'destination': trip.destination.name,
+            'start_date': trip.start_date,
+            'end_date': trip.end_date,
+            'status': trip.status,
+            'total_budget': trip.total_budget,
+            'url': reverse('home:trip_detail', args=[trip.pk]),
+        }
 
 
 class TripDetailView(LoginRequiredMixin, DetailView):
@@ -417,16 +478,20 @@ class TripDetailView(LoginRequiredMixin, DetailView):
 def profile(request):
     """User profile page"""
     user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-    trips = Trip.objects.filter(user=request.user)
+    if created:
+        user_profile.refresh_from_db()
+    trips = list(Trip.objects.filter(user=request.user))
     reviews = Review.objects.filter(user=request.user).select_related('destination')
 
+    # Review stats are maintained incrementally on the profile; every trip is
+    # listed, so counting the planned ones needs no query of its own
     context = {
         'user_profile': user_profile,
         'trips': trips,
         'reviews': reviews,
-        'trips_count': trips.count(),
-        'reviews_count': reviews.count(),
-        'average_rating': reviews.aggregate(Avg('rating'))['rating__avg'] or 0,
+        'trips_count': len(trips),
+        'reviews_count': user_profile.total_reviews,
+        'average_rating': user_profile.average_rating,
     }
     return render(request, 'home/profile.html', context)
 
@@ -508,27 +573,10 @@ def ai_guide(request):
     return render(request, 'home/ai_guide.html')
 
 
-def ai_chat(request):
+async def ai_chat(request):
     """AJAX endpoint for AI chat"""
     if request.method == 'POST':
-        message = request.POST.get('message', '').lower()
-
-        # Simple AI responses based on keywords
-        responses = {
-            'budget': "For budget travel, consider staying in guesthouses, using local transport, and eating at local restaurants. Daily costs can be kept under ₹2,000-3,000 depending on the destination.",
-            'food': "Indian cuisine varies by region. Try local specialties like Kerala seafood, Rajasthan dal baati, or Goa pork vindaloo. Most places offer vegetarian options too!",
-            'weather': "Best time to visit depends on the destination. Generally, October-February is good for most places, avoiding monsoon season.",
-            'safety': "Travel safely by staying in well-lit areas, using registered transport, and keeping valuables secure. Most tourist destinations are very safe.",
-            'visa': "Check visa requirements based on your nationality. Most countries offer e-visa or visa-on-arrival for Indians.",
-        }
-
-        response = "I'm here to help with your travel questions! Ask me about destinations, budgets, food, weather, or safety tips."
-
-        for keyword, reply in responses.items():
-            if keyword in message:
-                response = reply
-                break
-
+        response = await assistant.areply(request.POST.get('message', ''))
         return JsonResponse({'response': response})
 
     return JsonResponse({'error': 'Invalid request'})
@@ -541,25 +589,16 @@ def search(request):
     results = {}
 
     if query:
-        # Search destinations
-        results['destinations'] = Destination.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(tagline__icontains=query)
-        )[:5]
-
-        # Search vlogs
-        results['vlogs'] = TravelVlog.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(tags__icontains=query)
-        ).select_related('destination', 'author')[:5]
-
-        # Search reviews
-        results['reviews'] = Review.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query)
-        ).select_related('user', 'destination')[:5]
+        # One ranked full-text query per model, blended with the semantic index when it is built
+        semantic_hits = semantic_index.search_kinds(query, (DESTINATION, VLOG, REVIEW))
+        destinations = Destination.objects.all()
+        results['destinations'] = hybrid_search(
+            destinations, search_destinations(destinations, query), semantic_hits[DESTINATION], 5
+        )
+        vlogs = TravelVlog.objects.select_related('destination', 'author')
+        results['vlogs'] = hybrid_search(vlogs, search_vlogs(vlogs, query), semantic_hits[VLOG], 5)
+        reviews = Review.objects.select_related('user', 'destination')
+        results['reviews'] = hybrid_search(reviews, search_reviews(reviews, query), semantic_hits[REVIEW], 5)
 
     return render(request, 'home/search_results.html', {
         'query': query,
@@ -568,10 +607,21 @@ def search(request):
 
 
 # AJAX Views for dynamic content
-def get_destination_data(request, destination_id):
+def search_suggest(request):
+    """AJAX endpoint for search-as-you-type suggestions"""
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), 20)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    suggestions = suggest_index.suggest(query, limit)
+    return JsonResponse({'query': query, 'suggestions': list(suggestions)})
+
+
+async def get_destination_data(request, destination_id):
     """AJAX endpoint to get destination data"""
     try:
-        destination = Destination.objects.get(id=destination_id)
+        destination = await Destination.objects.aget(id=destination_id)
         data = {
             'id': destination.id,
             'name': destination.name,
@@ -587,17 +637,141 @@ def get_destination_data(request, destination_id):
 
 
 @login_required
-def like_vlog(request, vlog_id):
+async def like_vlog(request, vlog_id):
     """AJAX endpoint to like/unlike a vlog"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
     try:
-        vlog = TravelVlog.objects.get(id=vlog_id)
-        # In a real app, you'd have a many-to-many relationship for likes
-        vlog.likes += 1
-        vlog.save(update_fields=['likes'])
-        return JsonResponse({'success': True, 'likes': vlog.likes})
+        vlog = await TravelVlog.objects.aget(id=vlog_id)
     except TravelVlog.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Vlog not found'})
 
+    # "like" and "unlike" are idempotent; anything else toggles
+    user = await request.auser()
+    action = request.POST.get('action')
+    if action == 'like':
+        await vlog.alike(user)
+        liked = True
+    elif action == 'unlike':
+        await vlog.aunlike(user)
+        liked = False
+    else:
+        liked = await vlog.atoggle_like(user)
+    await ainvalidate_vlog_totals()
+
+    return JsonResponse({'success': True, 'likes': vlog.likes, 'liked': liked})
+
+
+def _upload_data(upload):
+    return {
+        'token': str(upload.token),
+        'filename': upload.filename,
+        'size': upload.size,
+        'chunk_size': upload.chunk_size,
+        'received': upload.received,
+        'status': upload.status,
+    }
+
+
+def _upload_error(exc):
+    return JsonResponse({'success': False, 'error': str(exc)}, status=exc.status)
+
+
+@login_required
+def create_upload(request):
+    """AJAX endpoint to open a chunked, resumable video upload"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    try:
+        upload = uploads.start_upload(
+            request.user,
+            filename=request.POST.get('filename'),
+            size=request.POST.get('size'),
+            content_type=request.POST.get('content_type', ''),
+            sha256=request.POST.get('sha256', ''),
+        )
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    return JsonResponse({'success': True, 'upload': _upload_data(upload)}, status=201)
+
+
+@login_required
+def upload_session(request, token):
+    """AJAX endpoint for one upload: GET its progress, PUT the next chunk, DELETE to abort"""
+    try:
+        upload = VlogUpload.objects.get(token=token, user=request.user)
+    except VlogUpload.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Upload not found'}, status=404)
+
+    try:
+        if request.method == 'PUT':
+            # The chunk is read straight from the request stream; never touch request.body
+            start, end, total = uploads.parse_content_range(request.headers.get('Content-Range'))
+            if total != upload.size:
+                raise uploads.UploadError("Content-Range does not match the size of the upload.")
+            if int(request.META.get('CONTENT_LENGTH') or 0) != end - start + 1:
+                raise uploads.UploadError("Content-Length does not match Content-Range.")
+            uploads.write_chunk(upload, start, request, end - start + 1, request.headers.get('X-Chunk-SHA256'))
+        elif request.method == 'DELETE':
+            uploads.abort_upload(upload)
+            return JsonResponse({'success': True})
+        elif request.method != 'GET':
+            return JsonResponse({'success': False, 'error': 'Invalid request'})
+    except uploads.UploadError as exc:
+        upload.refresh_from_db(fields=['received', 'status'])
+        return JsonResponse(
+            {'success': False, 'error': str(exc), 'upload': _upload_data(upload)}, status=exc.status
+        )
+    return JsonResponse({'success': True, 'upload': _upload_data(upload)})
+
+
+@login_required
+def complete_upload(request, token):
+    """AJAX endpoint to assemble a fully received upload into vlog storage"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    try:
+        upload = VlogUpload.objects.get(token=token, user=request.user)
+    except VlogUpload.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Upload not found'}, status=404)
+    try:
+        uploads.complete_upload(upload)
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    return JsonResponse({'success': True, 'upload': _upload_data(upload)})
+
+
+@require_safe
+def serve_media(request, path):
+    """Uploaded media with byte ranges and conditional requests, for seeking in videos"""
+    return media_response(request, path)
+
+
+@staff_member_required
+def view_cache_stats(request):
+    """Hit/miss counters of the page cache in this process"""
+    return JsonResponse({'success': True, 'views': view_cache.stats()})
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Per-route timing histograms and the list of profile captures"""
+    return JsonResponse({
+        'success': True,
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        **profiler.snapshot(),
+    })
+
+
+@staff_member_required
+def profiling_capture(request, capture_id):
+    """One cProfile capture as plain text"""
+    capture = profiler.get_capture(capture_id)
+    if capture is None:
+        raise Http404("No such capture")
+    header = f"{capture['route']} {capture['path']} {capture['wall_ms']:.1f} ms\n\n"
+    return HttpResponse(header + capture['stats'], content_type='text/plain; charset=utf-8')
+
 
 # Error handlers
 def handler404(request, exception):
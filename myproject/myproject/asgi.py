@@ -3,6 +3,16 @@ ASGI config for myproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server, one event loop per worker process, e.g.::
+
+    uvicorn myproject.asgi:application --workers 2
+
+The JSON endpoints (destination data, likes, AI chat, itinerary generation)
+are async views and hold many requests in flight per worker; the page views
+are sync and run in a thread. Database connections are per request thread
+under ASGI, so CONN_MAX_AGE does not carry a connection over to the next
+request. ``manage.py benchmark_async`` compares this path with WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
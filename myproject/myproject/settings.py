@@ -46,6 +46,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'home.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,6 +72,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myproject.wsgi.application'
+ASGI_APPLICATION = 'myproject.asgi.application'
 
 
 # Database
@@ -80,9 +82,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; checked before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds to wait for a lock before raising "database is locked"
+            'timeout': 20,
+            # Take the write lock at BEGIN so a transaction never fails to upgrade
+            # a read lock half way through
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# WAL journaling for every SQLite connection (home/db.py WAL_PRAGMAS). It is
+# stored in the database file, so turning it on converts db.sqlite3 for good
+# and leaves -wal/-shm files next to it; enable it for deployments, not for the
+# checked-in development database
+SQLITE_WAL = False
+
+# Overrides of the pragmas applied to every SQLite connection (home/db.py
+# DEFAULT_PRAGMAS); None disables one
+SQLITE_PRAGMAS = {
+    'busy_timeout': 20000,
+}
+
+
+# Cache
+# Page cache entries live in the 'views' cache. Local memory is per process;
+# switch it to django.core.cache.backends.filebased.FileBasedCache to share
+# pages and invalidations between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'views': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'views',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+VIEW_CACHE_ALIAS = 'views'
+VIEW_CACHE_TIMEOUT = 120
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -129,3 +173,55 @@ LOGOUT_URL = 'logout'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads never sit in memory: multipart files spool to a temp file and
+# chunked vlog uploads (home/uploads.py) stream into a partial file
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+VIDEO_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+VIDEO_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Partial files go to MEDIA_ROOT/vlog_uploads unless VIDEO_UPLOAD_DIR is set; keep
+# them on the same filesystem as MEDIA_ROOT so assembling an upload is a rename
+
+# Video processing (home/video.py); run the workers with manage.py video_worker.
+# ffmpeg and ffprobe come from the PATH unless FFMPEG_BINARY / FFPROBE_BINARY are set
+VIDEO_RENDITIONS = ((720, '2500k'), (480, '1000k'), (360, '600k'))
+# Seconds one ffmpeg run may take; a running job older than this is queued again
+VIDEO_JOB_TIMEOUT = 60 * 60
+VIDEO_JOB_MAX_ATTEMPTS = 3
+
+# AI guide chat (home/assistant.py)
+# Seconds before the destination facts are reloaded even without a local change,
+# so processes that did not see the write catch up
+ASSISTANT_MAX_AGE = 5 * 60
+
+# Semantic search (home/semantic.py); needs NumPy, build it with manage.py build_semantic_index.
+# The index defaults to BASE_DIR/semantic_index unless SEMANTIC_INDEX_DIR is set
+SEMANTIC_SEARCH_DIMENSIONS = 1024
+# Share of the blended score that comes from the semantic match rather than the keyword rank
+SEMANTIC_SEARCH_WEIGHT = 0.5
+# Weaker semantic matches are ignored
+SEMANTIC_SEARCH_MIN_SCORE = 0.1
+
+# Home page recommendations (home/recommend.py); need NumPy, else the plain list is shown
+# Seconds a user's recommendations and the shared destination arrays are kept
+RECOMMENDATION_TIMEOUT = 60 * 10
+RECOMMENDATION_MODEL_TIMEOUT = 60 * 10
+RECOMMENDATION_WEIGHTS = {'type': 0.4, 'budget': 0.25, 'co_favorite': 0.2, 'rating': 0.15}
+
+# Trending vlogs (home/trending.py); refresh the scores with manage.py update_trending_scores
+# Hours over which recent views, likes and a new upload's boost lose half their weight
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WEIGHTS = {'views': 1.0, 'likes': 10.0, 'fresh': 50.0}
+
+# Vlog view counter
+# Seconds between batched writes of buffered vlog views; 0 writes every hit through
+VLOG_VIEW_FLUSH_INTERVAL = 5
+
+# Request profiling (home/profiling.py)
+# Off by default; when off the middleware drops out of the chain at startup
+PROFILING_ENABLED = False
+# Share of requests also run under cProfile; staff can force one with ?_profile=1
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_MAX_CAPTURES = 50
+# Requests per route kept for the rolling histograms
+PROFILING_WINDOW = 1000